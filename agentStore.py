@@ -0,0 +1,137 @@
+import numpy as np
+
+# One fixed-dtype column per attribute; 24 bytes per animal
+FIELDS = (('x', np.float64), ('y', np.float64), ('energy', np.int64))
+MIN_CAPACITY = 64
+
+
+class AgentView:
+    # Looks like an Animal but reads and writes row `index` of the store, so
+    # Sheep/Wolf methods work unchanged on a subclass like
+    # class SheepView(AgentView, Sheep). Rows move when the store compacts,
+    # so views only stay valid until the next compact().
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def x(self):
+        return float(self.store.columns['x'][self.index])
+
+    @x.setter
+    def x(self, value):
+        self.store.columns['x'][self.index] = value
+
+    @property
+    def y(self):
+        return float(self.store.columns['y'][self.index])
+
+    @y.setter
+    def y(self, value):
+        self.store.columns['y'][self.index] = value
+
+    @property
+    def energy(self):
+        return int(self.store.columns['energy'][self.index])
+
+    @energy.setter
+    def energy(self, value):
+        self.store.columns['energy'][self.index] = value
+
+
+class AgentStore:
+    # Animals of one kind as columns over preallocated buffers. The first n
+    # rows are the live animals in list order; births are appended in
+    # batches and deaths are compacted away in place, so the buffers are only
+    # reallocated when the population outgrows them.
+    def __init__(self, capacity=MIN_CAPACITY, view=AgentView):
+        self.n = 0
+        self.view = view
+        self.columns = {name: np.empty(max(capacity, 1), dtype=dtype) for name, dtype in FIELDS}
+
+    @classmethod
+    def from_arrays(cls, x, y, energy, view=AgentView):
+        store = cls(max(len(x), MIN_CAPACITY), view)
+        store.add(x, y, energy)
+        return store
+
+    @property
+    def capacity(self):
+        return len(self.columns['x'])
+
+    # Live rows; these are views, so writing to them updates the store
+    @property
+    def x(self):
+        return self.columns['x'][:self.n]
+
+    @property
+    def y(self):
+        return self.columns['y'][:self.n]
+
+    @property
+    def energy(self):
+        return self.columns['energy'][:self.n]
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        if not -self.n <= index < self.n:
+            raise IndexError(index)
+        return self.view(self, index % self.n)
+
+    def __iter__(self):
+        for index in range(self.n):
+            yield self.view(self, index)
+
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    def reserve(self, n):
+        if n <= self.capacity:
+            return
+        # Grow by doubling so a run of births costs amortized O(1) per animal
+        capacity = max(n, 2 * self.capacity)
+        for name, column in self.columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.n] = column[:self.n]
+            self.columns[name] = grown
+
+    def add(self, x, y, energy):
+        # Batched births; all three arrays have one entry per newborn
+        count = len(x)
+        self.reserve(self.n + count)
+        start, self.n = self.n, self.n + count
+        self.columns['x'][start:self.n] = x
+        self.columns['y'][start:self.n] = y
+        self.columns['energy'][start:self.n] = energy
+
+    def extend(self, animals):
+        # Adds Animal-like objects, e.g. the newborns of reproduce_sheep
+        animals = list(animals)
+        self.add([a.x for a in animals], [a.y for a in animals], [a.energy for a in animals])
+
+    def reproduce(self, chance, width, height, rng):
+        # Every animal gives birth with probability chance. Parent and child
+        # each keep half the parent's energy and the child lands anywhere.
+        parents = rng.random(self.n) < chance
+        births = int(np.count_nonzero(parents))
+        if births == 0:
+            return 0
+        energy = self.energy
+        child_energy = energy[parents] // 2
+        energy[parents] = child_energy
+        self.add(rng.uniform(0, width, births), rng.uniform(0, height, births), child_energy)
+        return births
+
+    def compact(self, keep):
+        # Drops the rows where keep is False. Survivors keep their order, so
+        # "first sheep in the list" rules behave as they did with lists.
+        survivors = int(np.count_nonzero(keep))
+        if survivors == self.n:
+            return
+        for column in self.columns.values():
+            column[:survivors] = column[:self.n][keep]
+        self.n = survivors
@@ -0,0 +1,190 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import traceback
+
+import lv
+from ensemble import replicate_seeds
+from simulation import Config, Simulation
+from sweep import ABM_SPECIES, ODE_INITIAL, ODE_SPECIES
+
+# Usage: python batch.py abm --ticks 5000 --replicates 8 --set GRASS_ENERGY_GAIN=5 --output runs.csv
+#        python batch.py ode --t-end 2000 --dt 0.5 --config params.json --format jsonl
+# Headless runs of the agent model or the lv.py ODE. Rows are produced by
+# generators and written as they come, one per tick (or per dt of ODE time),
+# so memory stays flat however long the run. A run stops at the first row
+# where a species is extinct unless --run-to-end is given. Replicates of
+# the agent model run in worker processes; each replicate's rows come out
+# in order and depend only on its seed, but replicates interleave.
+BLOCK_ROWS = 1000  # rows a worker sends at a time
+QUEUE_BLOCKS = 16  # blocks in flight between the workers and the writer
+
+
+def abm_rows(config, seed, n_ticks, run=0, stop_on_extinction=True):
+    sim = Simulation(config, seed=seed)
+    counts = sim.counts()
+    yield dict(run=run, tick=sim.tick, **dict(zip(ABM_SPECIES, counts)))
+    for _ in range(n_ticks):
+        if stop_on_extinction and min(counts) == 0:
+            return
+        sim.step()
+        counts = sim.counts()
+        yield dict(run=run, tick=sim.tick, **dict(zip(ABM_SPECIES, counts)))
+
+
+def ode_rows(params, conditions, t_end, dt, threshold=1.0, stop_on_extinction=True):
+    # Samples every dt of lv's solution, integrated a chunk at a time
+    events = [lv.extinction_event(species, threshold) for species in range(3)] if stop_on_extinction else None
+    for t, solution, _ in lv.integrate_chunks(t_end, dt, conditions, params, events):
+        for time, values in zip(t.tolist(), solution.tolist()):
+            yield dict(t=time, **dict(zip(ODE_SPECIES, values)))
+
+
+def produce(queue, config, runs, n_ticks, stop_on_extinction):
+    # Worker: streams the rows of its (run, seed) pairs to queue in blocks,
+    # then None; a failure is sent as its traceback
+    try:
+        for run, seed in runs:
+            block = []
+            for row in abm_rows(config, seed, n_ticks, run, stop_on_extinction):
+                block.append(row)
+                if len(block) == BLOCK_ROWS:
+                    queue.put(block)
+                    block = []
+            queue.put(block)
+    except Exception:
+        queue.put(traceback.format_exc())
+    queue.put(None)
+
+
+def replicate_rows(config, seeds, n_ticks, stop_on_extinction=True, workers=None):
+    # Rows of every replicate, run = its index in seeds
+    runs = list(enumerate(seeds))
+    if workers is None:
+        workers = min(len(runs), os.cpu_count() or 1)
+    if workers <= 1:
+        for run, seed in runs:
+            yield from abm_rows(config, seed, n_ticks, run, stop_on_extinction)
+        return
+
+    import multiprocessing
+    context = multiprocessing.get_context()
+    queue = context.Queue(QUEUE_BLOCKS)
+    processes = [context.Process(target=produce, args=(queue, config, runs[i::workers], n_ticks, stop_on_extinction),
+                                 daemon=True) for i in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        running = len(processes)
+        while running:
+            block = queue.get()
+            if block is None:
+                running -= 1
+            elif isinstance(block, str):
+                raise RuntimeError(f"A replicate failed:\n{block}")
+            else:
+                yield from block
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+
+def write_csv(rows, file):
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(file, fieldnames=list(row), lineterminator='\n')
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def write_jsonl(rows, file):
+    for row in rows:
+        file.write(json.dumps(row) + '\n')
+
+
+WRITERS = {'csv': write_csv, 'jsonl': write_jsonl}
+
+
+def parse_value(text):
+    # Numbers, true/false and null as JSON, anything else as a string
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def load_params(path, assignments):
+    # The config file (a JSON object) with NAME=VALUE flags on top
+    params = {}
+    if path is not None:
+        with open(path) as file:
+            params.update(json.load(file))
+    for assignment in assignments:
+        name, sep, value = assignment.partition('=')
+        if not sep:
+            raise ValueError(f"Expected NAME=VALUE, got {assignment!r}")
+        params[name] = parse_value(value)
+    return params
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the wolf-sheep-grass models headless and stream the populations.")
+    parser.add_argument('model', choices=['abm', 'ode'], help="the agent model or the lv.py ODE")
+    parser.add_argument('--config', help="JSON object of model constants (abm) or of a..g, x0, y0, z0 (ode)")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE', help="override one constant")
+    parser.add_argument('--ticks', type=int, default=1000, help="abm ticks to run")
+    parser.add_argument('--replicates', type=int, default=1, help="abm runs, seeded from --base-seed")
+    parser.add_argument('--base-seed', type=int, default=0)
+    parser.add_argument('--seed', type=int, nargs='+', help="abm runs with exactly these seeds instead")
+    parser.add_argument('--workers', type=int, help="processes for the replicates, default one per CPU")
+    parser.add_argument('--t-end', type=float, default=lv.t0, help="ode time horizon")
+    parser.add_argument('--dt', type=float, default=1.0, help="ode time between rows")
+    parser.add_argument('--threshold', type=float, default=1.0, help="ode level counted as extinct")
+    parser.add_argument('--run-to-end', action='store_true', help="keep going after a species dies out")
+    parser.add_argument('--format', choices=list(WRITERS), help="default from the output suffix, else csv")
+    parser.add_argument('--output', default='-', help="file to write, - for stdout")
+    return parser
+
+
+def model_rows(args, params):
+    stop = not args.run_to_end
+    if args.model == 'abm':
+        config = Config(**params)
+        seeds = args.seed if args.seed else replicate_seeds(args.replicates, args.base_seed)
+        return replicate_rows(config, seeds, args.ticks, stop, args.workers)
+    conditions = [params.pop(name, default) for name, default in zip(ODE_INITIAL, lv.initial_conditions)]
+    return ode_rows(lv.parameters(**params), conditions, args.t_end, args.dt, args.threshold, stop)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        params = load_params(args.config, args.set)
+        rows = model_rows(args, params)
+    except (OSError, ValueError, TypeError) as error:
+        parser.error(str(error))
+
+    fmt = args.format or ('jsonl' if args.output.endswith(('.jsonl', '.json')) else 'csv')
+    file = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        WRITERS[fmt](rows, file)
+        file.flush()
+    except BrokenPipeError:
+        # The reader (e.g. head) has had enough. Point stdout at devnull so
+        # that the flush at exit doesn't raise again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        rows.close()
+        if file is not sys.stdout:
+            file.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
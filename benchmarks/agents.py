@@ -0,0 +1,129 @@
+import math
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from agentStore import AgentStore
+from simulation import Config, Simulation
+
+# Usage: python -m benchmarks.agents [max_exponent]
+SIZES = [10 ** k for k in range(3, 7)]
+OBJECT_LIMIT = 10 ** 6
+TICKS = 20
+WIDTH = 800
+CELL_SIZE = 16
+BIRTH_CHANCE = 0.05
+DEATH_CHANCE = 0.05  # keeps the population roughly level while it churns
+
+
+# The Animal class main() used before the agent store
+class Critter:
+    def __init__(self, x, y, energy):
+        self.x = x
+        self.y = y
+        self.energy = energy
+
+    def move_freely(self):
+        angle = random.uniform(0, 2 * math.pi)
+        self.x = (self.x + math.cos(angle) * CELL_SIZE) % WIDTH
+        self.y = (self.y + math.sin(angle) * CELL_SIZE) % WIDTH
+
+
+def bytes_per_agent(make, n):
+    tracemalloc.start()
+    agents = make(n)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del agents
+    return size / n
+
+
+def make_objects(n):
+    return [Critter(random.uniform(0, WIDTH), random.uniform(0, WIDTH), random.randint(0, 40)) for _ in range(n)]
+
+
+def make_store(n, rng=np.random.default_rng()):
+    return AgentStore.from_arrays(rng.uniform(0, WIDTH, n), rng.uniform(0, WIDTH, n), rng.integers(0, 41, n))
+
+
+# One tick of movement, deaths and births for each representation
+def object_tick(agents):
+    for a in agents:
+        a.move_freely()
+        a.energy -= 1
+    agents = [a for a in agents if random.random() >= DEATH_CHANCE]
+    newborns = []
+    for parent in agents:
+        if random.random() < BIRTH_CHANCE:
+            child_energy = parent.energy // 2
+            newborns.append(Critter(random.uniform(0, WIDTH), random.uniform(0, WIDTH), child_energy))
+            parent.energy = child_energy
+    return agents + newborns
+
+
+# The filter-and-concatenate arrays Simulation used before the agent store
+def array_tick(state, rng):
+    x, y, energy = state
+    angle = rng.uniform(0, 2 * math.pi, len(x))
+    x = (x + np.cos(angle) * CELL_SIZE) % WIDTH
+    y = (y + np.sin(angle) * CELL_SIZE) % WIDTH
+    energy = energy - 1
+    keep = rng.random(len(x)) >= DEATH_CHANCE
+    x, y, energy = x[keep], y[keep], energy[keep]
+    parents = rng.random(len(x)) < BIRTH_CHANCE
+    n = int(np.count_nonzero(parents))
+    child_energy = energy[parents] // 2
+    energy[parents] = child_energy
+    return (np.concatenate([x, rng.uniform(0, WIDTH, n)]), np.concatenate([y, rng.uniform(0, WIDTH, n)]),
+            np.concatenate([energy, child_energy]))
+
+
+def store_tick(agents, rng):
+    angle = rng.uniform(0, 2 * math.pi, len(agents))
+    agents.x[:] = (agents.x + np.cos(angle) * CELL_SIZE) % WIDTH
+    agents.y[:] = (agents.y + np.sin(angle) * CELL_SIZE) % WIDTH
+    agents.energy[:] -= 1
+    agents.compact(rng.random(len(agents)) >= DEATH_CHANCE)
+    agents.reproduce(BIRTH_CHANCE, WIDTH, WIDTH, rng)
+    return agents
+
+
+def ticks_per_second(tick, state, *args):
+    start = time.perf_counter()
+    for _ in range(TICKS):
+        state = tick(state, *args)
+    return TICKS / (time.perf_counter() - start)
+
+
+def simulation_ticks_per_second(n):
+    sim = Simulation(Config(INITIAL_SHEEP=n - n // 3, INITIAL_WOLVES=n // 3, GRID_SIZE=200), seed=n)
+    start = time.perf_counter()
+    sim.run(TICKS)
+    return TICKS / (time.perf_counter() - start)
+
+
+def main(max_exponent=6):
+    rng = np.random.default_rng(0)
+    print(f"{'agents':>10} {'objects B/agent':>16} {'store B/agent':>14} "
+          f"{'objects tick/s':>15} {'arrays tick/s':>14} {'store tick/s':>13} {'Simulation tick/s':>18}")
+    for n in SIZES:
+        if n > 10 ** max_exponent:
+            break
+        if n <= OBJECT_LIMIT:
+            object_bytes = f"{bytes_per_agent(make_objects, n):16.1f}"
+            object_rate = f"{ticks_per_second(object_tick, make_objects(n)):15.2f}"
+        else:
+            object_bytes, object_rate = f"{'-':>16}", f"{'-':>15}"
+        store_bytes = bytes_per_agent(make_store, n)
+        array_rate = ticks_per_second(array_tick, (rng.uniform(0, WIDTH, n), rng.uniform(0, WIDTH, n),
+                                                   rng.integers(0, 41, n)), rng)
+        store_rate = ticks_per_second(store_tick, make_store(n, rng), rng)
+        print(f"{n:>10} {object_bytes} {store_bytes:14.1f} {object_rate} {array_rate:14.2f} {store_rate:13.2f} "
+              f"{simulation_ticks_per_second(n):18.2f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,70 @@
+import sys
+import time
+
+import numpy as np
+
+from simulation import Config, Simulation
+from tickKernel import COMPILED
+
+# Usage: python -m benchmarks.engines [max_exponent] [replicates]
+SIZES = [10 ** k for k in range(2, 7)]
+LOOP_LIMIT = 10 ** 4  # the uncompiled kernel takes minutes beyond this
+TICKS = 20
+EQUIVALENCE_TICKS = 300
+WARMUP = 50  # ticks left out of the equivalence means
+
+
+def engines():
+    return ['numpy', 'jit', 'loop'] if COMPILED else ['numpy', 'loop']
+
+
+def ticks_per_second(engine, n):
+    config = Config(INITIAL_SHEEP=n - n // 3, INITIAL_WOLVES=n // 3, GRID_SIZE=max(50, int(n ** 0.5) // 2))
+    sim = Simulation(config, seed=n, engine=engine)
+    if engine == 'jit':
+        sim.run(1)  # compile outside the timing
+    start = time.perf_counter()
+    sim.run(TICKS)
+    return TICKS / (time.perf_counter() - start)
+
+
+def replicate_means(engine, replicates, config=None):
+    # Mean sheep, wolves and grass over each replicate, one row per seed
+    means = np.empty((replicates, 3))
+    for seed in range(replicates):
+        counts = Simulation(config, seed=seed, engine=engine).run(EQUIVALENCE_TICKS)
+        means[seed] = counts[WARMUP:].mean(axis=0)
+    return means
+
+
+def welch_t(a, b):
+    se = np.sqrt(a.var(axis=0, ddof=1) / len(a) + b.var(axis=0, ddof=1) / len(b))
+    return (a.mean(axis=0) - b.mean(axis=0)) / np.where(se > 0, se, 1)
+
+
+def check_equivalence(replicates=16):
+    # Each engine against the numpy reference; |t| above 3 on any column
+    # means the engines simulate different models
+    reference = replicate_means('numpy', replicates)
+    print(f"{'engine':>8} {'sheep':>16} {'wolves':>16} {'grass':>16} {'max |t|':>8}")
+    for engine in engines():
+        means = reference if engine == 'numpy' else replicate_means(engine, replicates)
+        t = welch_t(means, reference)
+        cells = ' '.join(f"{m:9.1f} ± {s:4.1f}" for m, s in zip(means.mean(axis=0), means.std(axis=0, ddof=1)))
+        print(f"{engine:>8} {cells} {np.abs(t).max():8.2f}")
+
+
+def main(max_exponent=6, replicates=16):
+    check_equivalence(replicates)
+    print()
+    print(f"{'animals':>10} " + ' '.join(f"{engine + ' tick/s':>14}" for engine in engines()))
+    for n in SIZES:
+        if n > 10 ** max_exponent:
+            break
+        rates = [f"{ticks_per_second(engine, n):14.2f}" if engine != 'loop' or n <= LOOP_LIMIT else f"{'-':>14}"
+                 for engine in engines()]
+        print(f"{n:>10} " + ' '.join(rates))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+import time
+
+from frameLog import FrameLog, FrameRecorder
+from simulation import Config, Simulation
+
+# Usage: python -m benchmarks.frames [max_grid_size]
+# Cost of writing a frame log next to the tick it records, its size, and how
+# much faster it plays back than the model runs
+GRID_SIZES = (50, 200, 1000)
+TICKS = 100
+DENSITY = 0.13  # animals per cell, a quarter of them wolves
+
+
+def main(max_grid_size=1000):
+    print(f"{'grid':>6} {'step ms':>8} {'record ms':>10} {'KB/frame':>9} {'raw KB':>7} {'replay ms':>10} {'speed-up':>9}")
+    for grid_size in GRID_SIZES:
+        if grid_size > max_grid_size:
+            break
+        n = int(grid_size * grid_size * DENSITY)
+        sim = Simulation(Config(WIDTH=grid_size * 16, GRID_SIZE=grid_size, INITIAL_SHEEP=n - n // 4,
+                                INITIAL_WOLVES=n // 4), seed=1)
+        path = os.path.join(tempfile.mkdtemp(), 'bench.frames')
+        step = record = 0.0
+        raw = 0
+        with FrameRecorder(path) as recorder:
+            for _ in range(TICKS):
+                start = time.perf_counter()
+                sim.step()
+                middle = time.perf_counter()
+                recorder.record(sim)
+                step += middle - start
+                record += time.perf_counter() - middle
+                # The same frame as packed grass and float32 x, y and int32 energy
+                raw += sim.grass.bits.nbytes + 12 * (len(sim.sheep) + len(sim.wolves))
+        log = FrameLog(path)
+        start = time.perf_counter()
+        for frame in log:
+            pass
+        replay = time.perf_counter() - start
+        log.close()
+        size = os.path.getsize(path)
+        os.remove(path)
+        print(f"{grid_size:>6} {step / TICKS * 1e3:8.2f} {record / TICKS * 1e3:10.2f} {size / TICKS / 1024:9.1f} "
+              f"{raw / TICKS / 1024:7.1f} {replay / TICKS * 1e3:10.2f} {step / replay:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
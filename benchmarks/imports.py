@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+
+# Usage: python -m benchmarks.imports [repeats]
+# Import cost of the model modules, each in a fresh interpreter. numpy is
+# imported first and timed apart, since everything needs it anyway; what is
+# left must stay within BUDGET times the numpy import, so the check holds on
+# slow and fast machines alike, and must not pull in any of HEAVY. Exits 1 on
+# a breach; tests/test_imports.py runs the same check.
+MODULES = ('simulation', 'wolfSheepGrass', 'testGraphy', 'lv', 'sweep', 'ensemble', 'recorder',
+           'checkpoint', 'tiledSimulation', 'profiler', 'batch', 'calibration', 'simServer',
+           'frameLog')
+BUDGET = 0.35  # of the numpy import time, per module on top of numpy
+HEAVY = ('pygame', 'matplotlib', 'scipy', 'numba')
+REPEATS = 5
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import numpy
+middle = time.perf_counter()
+import {module}
+end = time.perf_counter()
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(middle - start, end - middle, ','.join(heavy))
+"""
+
+
+def import_time(module):
+    # (numpy seconds, module seconds, heavy modules loaded) of one fresh import
+    probe = PROBE.format(module=module, heavy=HEAVY)
+    # No display, so a module that opens one at import fails here too
+    env = dict(os.environ, DISPLAY='', SDL_VIDEODRIVER='offscreen')
+    output = subprocess.run([sys.executable, '-c', probe], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    # The probe's line comes last, after anything the imports print
+    numpy_time, own, heavy = output.splitlines()[-1].split(' ')
+    return float(numpy_time), float(own), heavy
+
+
+def measure(module, repeats=REPEATS):
+    # Fastest of repeats fresh imports, which is the least noisy
+    runs = [import_time(module) for _ in range(repeats)]
+    return min(run[0] for run in runs), min(run[1] for run in runs), runs[0][2]
+
+
+def main(repeats=REPEATS):
+    failed = False
+    print(f"{'module':>16} {'numpy ms':>9} {'own ms':>8} {'budget':>7}")
+    for module in MODULES:
+        numpy_time, own, heavy = measure(module, repeats)
+        verdict = 'ok'
+        if own > BUDGET * numpy_time:
+            verdict = 'OVER'
+        if heavy:
+            verdict = f"loads {heavy}"
+        failed = failed or verdict != 'ok'
+        print(f"{module:>16} {numpy_time * 1e3:9.1f} {own * 1e3:8.1f} {BUDGET * numpy_time * 1e3:7.0f}  {verdict}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(arg) for arg in sys.argv[1:])))
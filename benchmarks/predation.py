@@ -0,0 +1,85 @@
+import random
+import sys
+import time
+
+from simulation import Config, Simulation
+from spatialHash import CellIndex
+
+# Usage: python -m benchmarks.predation [max_exponent]
+SIZES = [10 ** k for k in range(2, 7)]
+SCAN_LIMIT = 10 ** 4  # the O(W*S) scan takes minutes beyond this
+WIDTH = 800
+CELL_SIZE = 16
+
+
+class Critter:
+    __slots__ = ('x', 'y', 'energy')
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.energy = 0
+
+
+def populate(n_animals, seed):
+    rng = random.Random(seed)
+    n_wolves = n_animals // 3
+    sheep = [Critter(rng.uniform(0, WIDTH), rng.uniform(0, WIDTH)) for _ in range(n_animals - n_wolves)]
+    wolves = [Critter(rng.uniform(0, WIDTH), rng.uniform(0, WIDTH)) for _ in range(n_wolves)]
+    return sheep, wolves
+
+
+# The collision block main() used before the cell index
+def scan_predation(sheep, wolves):
+    for w in wolves:
+        sheep_in_same_cell = [s for s in sheep if int(s.x // CELL_SIZE) == int(w.x // CELL_SIZE) and int(s.y // CELL_SIZE) == int(w.y // CELL_SIZE)]
+        if sheep_in_same_cell:
+            chosen_sheep = random.choice(sheep_in_same_cell)
+            w.energy += 1
+            sheep.remove(chosen_sheep)
+    return sheep
+
+
+def hash_predation(sheep, wolves):
+    sheep_by_cell = CellIndex(sheep, CELL_SIZE)
+    eaten = set()
+    for w in wolves:
+        chosen_sheep = sheep_by_cell.pop_random(w.x, w.y)
+        if chosen_sheep is not None:
+            w.energy += 1
+            eaten.add(id(chosen_sheep))
+    return [s for s in sheep if id(s) not in eaten]
+
+
+def array_predation(n_animals, seed):
+    # Seconds of Simulation.predation alone and of a whole Simulation.step,
+    # each on a fresh world from seed, so the phase is seen next to the tick
+    n_wolves = n_animals // 3
+    config = Config(WIDTH=WIDTH, INITIAL_SHEEP=n_animals - n_wolves, INITIAL_WOLVES=n_wolves)
+    predation = timed(Simulation(config, seed=seed).predation)
+    step = timed(Simulation(config, seed=seed).step)
+    return predation, step
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main(max_exponent=6):
+    # Seconds spent in the predation step of one tick, and in the whole tick
+    # of the array model
+    print(f"{'animals':>10} {'scan (s)':>12} {'cell index (s)':>15} {'Simulation (s)':>15} {'whole step (s)':>15}")
+    for n in SIZES:
+        if n > 10 ** max_exponent:
+            break
+        sheep, wolves = populate(n, seed=n)
+        scan = f"{timed(scan_predation, list(sheep), wolves):12.4f}" if n <= SCAN_LIMIT else f"{'-':>12}"
+        hashed = timed(hash_predation, list(sheep), wolves)
+        vectorized, step = array_predation(n, seed=n)
+        print(f"{n:>10} {scan} {hashed:15.4f} {vectorized:15.4f} {step:15.4f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,210 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from simulation import Config, Simulation
+
+# Usage: python -m benchmarks.suite [--scales small medium] [--kinds step render ode]
+#            [--output results.json] [--baseline benchmarks/baseline.json] [--threshold 0.25] [--save-baseline]
+# Fixed-seed scenarios for the hot paths. Every result has a rate (higher is
+# better) and the peak traced memory; --baseline flags any scenario whose rate
+# dropped, or whose memory grew, by more than --threshold.
+# The render scenarios need pygame and are skipped with a notice without it.
+SEED = 12345
+REPEATS = 3  # the best of these is reported, to keep noise out of the comparison
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+THRESHOLD = 0.25
+MEMORY_SLACK_MB = 1.0  # memory changes below this are never a regression
+
+# name: (GRID_SIZE, INITIAL_SHEEP, INITIAL_WOLVES, ticks per repeat)
+SCALES = {
+    'small': (50, 100, 50, 400),
+    'medium': (200, 4000, 1000, 100),
+    'large': (1000, 100000, 30000, 10),
+}
+SEEK_TICKS = 10  # SEEK_TARGETS is far slower per tick
+VIEW_SIZE = (800, 800)
+ODE_BATCH = 64
+
+
+def scenario_config(scale, **params):
+    grid_size, sheep, wolves, _ = SCALES[scale]
+    return Config(WIDTH=grid_size * 16, GRID_SIZE=grid_size, INITIAL_SHEEP=sheep, INITIAL_WOLVES=wolves, **params)
+
+
+def measure(run, repeats=REPEATS):
+    # run() does one repeat and returns (operations, extra); returns the best
+    # rate, the extra of that repeat and the peak memory of a separate traced run
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        operations, extra = run()
+        rate = operations / (time.perf_counter() - start)
+        if best is None or rate > best[0]:
+            best = (rate, extra)
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'rate': best[0], 'peak_mb': peak / 2 ** 20, **best[1]}
+
+
+def bench_step(scale, **params):
+    config = scenario_config(scale, **params)
+    ticks = SEEK_TICKS if config.SEEK_TARGETS else SCALES[scale][3]
+
+    def run():
+        sim = Simulation(config, seed=SEED)
+        phases = dict.fromkeys(sim.PHASES, 0.0)
+        for _ in range(ticks):
+            for phase in sim.PHASES:
+                start = time.perf_counter()
+                getattr(sim, phase)()
+                phases[phase] += time.perf_counter() - start
+            sim.tick += 1
+        # Seconds per tick spent in each phase
+        return ticks, {'phases': {phase: seconds / ticks for phase, seconds in phases.items()},
+                       'counts': [int(n) for n in sim.counts()]}
+
+    return {'unit': 'ticks/s', **measure(run)}
+
+
+def bench_render(scale):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from gridRenderer import GridRenderer
+    from viewport import Viewport
+
+    pygame.font.init()
+    config = scenario_config(scale)
+    sim = Simulation(config, seed=SEED)
+    sim.run(10)
+    surface = pygame.Surface(VIEW_SIZE)
+    frames = 20
+
+    # The same drawing as wolfSheepGrass.draw_world, into an offscreen surface
+    def run():
+        renderer = GridRenderer(config.CELL_SIZE, (1, 100, 32), (150, 75, 0))
+        viewport = Viewport(config.WIDTH, config.GRID_SIZE, (0, 0) + VIEW_SIZE)
+        labels = viewport.scale * viewport.cell_size >= config.CELL_SIZE
+        for _ in range(frames):
+            surface.fill((0, 0, 0))
+            gx0, gx1, gy0, gy1, step = viewport.cells()
+            alive = sim.grass.region(gx0, gx1, gy0, gy1, step)
+            x, y, w, h = viewport.cell_rect(gx0, gy0, alive.shape[0], alive.shape[1], step)
+            renderer.draw_grass(surface, alive, (x, y), (w, h))
+            for ax, ay, energy, color in ((sim.sheep_x, sim.sheep_y, sim.sheep_energy, (255, 255, 255)),
+                                          (sim.wolf_x, sim.wolf_y, sim.wolf_energy, (0, 0, 0))):
+                sx, sy = viewport.to_screen(ax, ay)
+                renderer.draw_animals(surface, sx, sy, color, energy if labels else None)
+        return frames, {}
+
+    return {'unit': 'frames/s', **measure(run)}
+
+
+def bench_ode(batch):
+    import lv
+
+    t = np.linspace(0, lv.t0, lv.PLOT_POINTS)
+    if batch == 1:
+        def run():
+            lv.solve(t)
+            return 1, {}
+    else:
+        rng = np.random.default_rng(SEED)
+        params = np.array(lv.parameters()) * rng.uniform(0.9, 1.1, (batch, len(lv.PARAM_NAMES)))
+
+        def run():
+            lv.solve_batch(t, params)
+            return batch, {}
+
+    return {'unit': 'solves/s', **measure(run)}
+
+
+def scenarios(scales, kinds):
+    # name -> function producing its result
+    table = {}
+    for scale in scales:
+        if 'step' in kinds:
+            table[f'step/{scale}'] = lambda scale=scale: bench_step(scale)
+            table[f'seek/{scale}'] = lambda scale=scale: bench_step(scale, SEEK_TARGETS=True)
+        if 'render' in kinds:
+            table[f'render/{scale}'] = lambda scale=scale: bench_render(scale)
+    if 'ode' in kinds:
+        table['ode/single'] = lambda: bench_ode(1)
+        table[f'ode/batch{ODE_BATCH}'] = lambda: bench_ode(ODE_BATCH)
+    return table
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    # One (name, rate change, memory change, regressed) row per scenario in both
+    rows = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        rate_change = result['rate'] / old['rate'] - 1
+        memory_change = result['peak_mb'] / old['peak_mb'] - 1 if old['peak_mb'] > 0 else 0.0
+        regressed = rate_change < -threshold or (memory_change > threshold and
+                                                 result['peak_mb'] - old['peak_mb'] > MEMORY_SLACK_MB)
+        rows.append((name, rate_change, memory_change, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulation hot paths.")
+    parser.add_argument('--scales', nargs='+', default=['small', 'medium'], choices=list(SCALES))
+    parser.add_argument('--kinds', nargs='+', default=['step', 'render', 'ode'], choices=['step', 'render', 'ode'])
+    parser.add_argument('--output', help="write the results here as JSON")
+    parser.add_argument('--baseline', default=BASELINE, help="results to compare against")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="relative change counted as a regression")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+    kinds = args.kinds
+    if 'render' in kinds and importlib.util.find_spec('pygame') is None:
+        print("pygame is not installed, skipping the render scenarios", file=sys.stderr)
+        kinds = [kind for kind in kinds if kind != 'render']
+
+    results = {}
+    for name, bench in scenarios(args.scales, kinds).items():
+        results[name] = result = bench()
+        phases = ''
+        if 'phases' in result:
+            phases = '  ' + ' '.join(f"{phase}={seconds * 1e3:.2f}ms" for phase, seconds in result['phases'].items())
+        print(f"{name:>16} {result['rate']:12.2f} {result['unit']:<9} {result['peak_mb']:9.1f} MB{phases}")
+
+    report = {'environment': environment(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=1)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=1)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    rows = compare(results, baseline['results'], args.threshold)
+    print(f"\nAgainst {args.baseline} ({baseline['environment']['time']}, threshold {args.threshold:.0%}):")
+    for name, rate_change, memory_change, regressed in rows:
+        flag = 'REGRESSION' if regressed else 'ok'
+        print(f"{name:>16} rate {rate_change:+7.1%}  memory {memory_change:+7.1%}  {flag}")
+    return 1 if any(regressed for *_, regressed in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
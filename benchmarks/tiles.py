@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+
+from simulation import Config, Simulation
+from tiledSimulation import TiledSimulation
+
+# Usage: python -m benchmarks.tiles [max_workers] [grid_size]
+# Strong scaling: the same world and tile layout with more and more workers
+TILES = (8, 8)
+TICKS = 10
+DENSITY = 0.05  # animals per cell, a third of them wolves
+
+
+def ticks_per_second(config, workers):
+    sim = Simulation(config, seed=1)
+    with TiledSimulation(sim, TILES, workers, seed=1) as tiled:
+        tiled.step()  # start-up and first hand-overs outside the timing
+        start = time.perf_counter()
+        tiled.run(TICKS)
+        return TICKS / (time.perf_counter() - start)
+
+
+def main(max_workers=None, grid_size=4096):
+    max_workers = max_workers or os.cpu_count() or 1
+    n = int(grid_size * grid_size * DENSITY)
+    config = Config(WIDTH=grid_size * 16, GRID_SIZE=grid_size, INITIAL_SHEEP=n - n // 3, INITIAL_WOLVES=n // 3)
+    serial = Simulation(config, seed=1)
+    start = time.perf_counter()
+    serial.run(TICKS)
+    base = TICKS / (time.perf_counter() - start)
+    print(f"{grid_size}x{grid_size} cells, {n} animals, {TILES[0]}x{TILES[1]} tiles, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'tick/s':>10} {'speedup':>8} {'efficiency':>11}")
+    print(f"{'serial':>8} {base:10.2f} {1:8.2f} {1:11.2f}")
+    workers = 1
+    while workers <= max_workers:
+        rate = ticks_per_second(config, workers)
+        print(f"{workers:>8} {rate:10.2f} {rate / base:8.2f} {rate / base / workers:11.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
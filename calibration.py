@@ -0,0 +1,148 @@
+import json
+import sys
+import time
+import warnings
+
+import numpy as np
+
+import lv
+from ensemble import run_ensemble
+
+# Fits the parameters a..g of lv.system to the mean populations of many
+# headless agent runs, one tick being one time unit. Parameters are fitted
+# as logs, so they stay positive, and residuals are relative to each
+# species' mean level, so grass, sheep and wolves weigh about the same.
+# Candidate starts are screened all at once with lv.solve_batch; the best
+# few are refined by least squares, whose Jacobian comes from integrating
+# the forward sensitivities d(x, y, z)/d(a..g) along with the solution.
+ABM_TO_ODE = [2, 0, 1]  # run_ensemble's (sheep, wolves, grass) columns in lv's (x, y, z) order
+RATE_RANGE = (1e-3, 0.5)  # per-tick rates the starts are drawn from
+STARTS = 256
+REFINE = 4  # best screened starts handed to least squares
+SCREEN_BATCH = 32  # parameter sets per batched solve
+MARGIN = 2.0  # how far (in log units) the fit may leave the box of starts
+
+
+def abm_means(config=None, seeds=16, n_ticks=300, workers=None, base_seed=0):
+    # Times and mean populations over the replicates, as lv's (x, y, z)
+    counts = run_ensemble(config, seeds, n_ticks, workers, base_seed)
+    return np.arange(n_ticks + 1, dtype=float), counts[:, :, ABM_TO_ODE].mean(axis=0)
+
+
+def equilibrium_starts(data, n, rng):
+    # Parameter sets whose coexistence point matches the mean of the second
+    # half of data: the growth and death rates a, c, f and the per-capita
+    # predation rate e*z are drawn log-uniformly, then b = a / y, g = f / y
+    # and d = (c + e*z) / x
+    x, y, z = data[len(data) // 2:].mean(axis=0)
+    a, c, f, ez = np.exp(rng.uniform(*np.log(RATE_RANGE), (4, n)))
+    return np.column_stack([a, a / y, c, (c + ez) / x, ez / z, f, f / y])
+
+
+def sensitivity_system(state, t, params):
+    # K parameter sets at once: state holds K rows of (x, y, z) followed by
+    # the 3x7 sensitivities S = d(x, y, z)/d(a..g), which obey
+    # S' = J S + d(x, y, z)'/d(a..g)
+    k = len(params)
+    state = state.reshape(k, 24)
+    xyz = state[:, :3].reshape(-1)
+    sensitivities = state[:, 3:].reshape(k, 3, 7)
+    derivatives = np.empty((k, 24))
+    derivatives[:, :3] = lv.batch_system(t, xyz, params).reshape(k, 3)
+    derivatives[:, 3:] = (lv.jacobian_blocks(xyz, params) @ sensitivities +
+                          lv.parameter_jacobian_blocks(xyz, params)).reshape(k, 21)
+    return derivatives.reshape(-1)
+
+
+def solve_sensitivities(t, params, conditions):
+    # (K, len(t), 3) solutions and (K, len(t), 3, 7) sensitivities
+    from scipy.integrate import odeint
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    k = len(params)
+    state = np.zeros((k, 24))
+    state[:, :3] = conditions
+    solution = odeint(sensitivity_system, state.reshape(-1), t, args=(params,)).reshape(len(t), k, 24)
+    solution = solution.transpose(1, 0, 2)
+    return solution[:, :, :3], solution[:, :, 3:].reshape(k, len(t), 3, 7)
+
+
+def screen(t, data, params, batch=SCREEN_BATCH):
+    # Half the sum of squared relative residuals of every parameter set;
+    # sets whose solution blows up get inf
+    scale = data.mean(axis=0)
+    costs = np.empty(len(params))
+    for chunk in np.array_split(np.arange(len(params)), max(1, len(params) // batch)):
+        solution = lv.solve_batch(t, params[chunk], data[0])
+        cost = 0.5 * (((solution - data) / scale) ** 2).sum(axis=(1, 2))
+        costs[chunk] = np.where(np.isfinite(cost), cost, np.inf)
+    return costs
+
+
+def refine(t, data, start, bounds):
+    # Least squares in log parameters from one start
+    from scipy.optimize import least_squares
+    scale = data.mean(axis=0)
+    jacobian = {}
+
+    def residuals(log_params):
+        params = np.exp(log_params)
+        solution, sensitivities = solve_sensitivities(t, params, data[0])
+        # d/d(log p) = p d/dp
+        jacobian['J'] = (sensitivities[0] * params / scale[:, None]).reshape(-1, 7)
+        return ((solution[0] - data) / scale).reshape(-1)
+
+    return least_squares(residuals, np.log(start), jac=lambda log_params: jacobian['J'], bounds=bounds)
+
+
+def fit(t, data, starts=STARTS, refine_best=REFINE, seed=0):
+    # Best fit of lv's a..g to data sampled at t, starting from data[0].
+    # Returns a dict with the parameters, their relative standard errors,
+    # the RMS relative error per species and the cost of every refined start.
+    t = np.asarray(t, dtype=float)
+    data = np.asarray(data, dtype=float)
+    rng = np.random.default_rng(seed)
+    candidates = equilibrium_starts(data, starts, rng)
+    log_candidates = np.log(candidates)
+    bounds = (log_candidates.min(axis=0) - MARGIN, log_candidates.max(axis=0) + MARGIN)
+
+    with warnings.catch_warnings():
+        # Poor candidates make odeint complain; they just score badly
+        warnings.simplefilter('ignore')
+        costs = screen(t, data, candidates)
+        results = [refine(t, data, candidates[i], bounds) for i in np.argsort(costs)[:refine_best]]
+    best = min(results, key=lambda result: result.cost)
+
+    # Linearised standard errors of the log parameters, i.e. relative errors
+    residuals = best.fun.reshape(-1, 3)
+    variance = 2 * best.cost / max(len(best.fun) - 7, 1)
+    covariance = np.linalg.pinv(best.jac.T @ best.jac) * variance
+    return {
+        'params': dict(zip(lv.PARAM_NAMES, np.exp(best.x).tolist())),
+        'relative_stderr': dict(zip(lv.PARAM_NAMES, np.sqrt(np.diag(covariance)).tolist())),
+        'conditions': dict(zip(('x0', 'y0', 'z0'), data[0].tolist())),
+        'rms_relative_error': dict(zip(('grass', 'sheep', 'wolves'), np.sqrt((residuals ** 2).mean(axis=0)).tolist())),
+        'cost': float(best.cost),
+        'refined_costs': [float(result.cost) for result in results],
+        'screened_cost': float(costs.min()),
+    }
+
+
+def main(n_ticks=300, replicates=16, output=None):
+    # Usage: python calibration.py [n_ticks] [replicates] [output.json]
+    # The output can be fed back as batch.py ode --config output.json
+    start = time.perf_counter()
+    t, data = abm_means(seeds=replicates, n_ticks=n_ticks)
+    simulated = time.perf_counter()
+    result = fit(t, data)
+    fitted = time.perf_counter()
+    print(f"{replicates} agent runs of {n_ticks} ticks in {simulated - start:.1f} s, fit in {fitted - simulated:.1f} s")
+    for name, value in result['params'].items():
+        print(f"{name} = {value:.6g}  (+/- {result['relative_stderr'][name]:.0%})")
+    print("RMS relative error: " + ', '.join(f"{name} {error:.1%}" for name, error in result['rms_relative_error'].items()))
+    if output is not None:
+        with open(output, 'w') as file:
+            json.dump({**result['params'], **result['conditions']}, file, indent=1)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]), *sys.argv[3:4])
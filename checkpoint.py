@@ -0,0 +1,148 @@
+import glob
+import json
+import os
+import re
+
+import numpy as np
+
+from simulation import SETUP_CONSTANTS, Config, Simulation
+
+# Layout: MAGIC, 8-byte header length, JSON header, then every state array
+# as raw bytes at an ALIGN-byte offset so it can be mapped in place. The
+# grass is stored packed as GrassField keeps it, with its shape in cells in
+# the header. Files from before that, with an unpacked 'alive' mask and no
+# engine, still load.
+MAGIC = b'WSGCKPT1'
+ALIGN = 64
+AUTO_NAME = re.compile(r'tick(\d+)\.ckpt$')
+
+
+def save_checkpoint(sim, path):
+    arrays = [(name, np.ascontiguousarray(getattr(sim, name))) for name in Simulation.STATE_ARRAYS]
+    entries = []
+    offset = 0
+    for name, array in arrays:
+        entries.append({'name': name, 'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset})
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    header = json.dumps({
+        'tick': int(sim.tick),
+        'config': sim.config.as_dict(),
+        'rng': sim.rng.bit_generator.state,
+        'engine': sim.engine,
+        'grass_shape': list(sim.grass.shape),
+        'arrays': entries,
+    }).encode()
+    start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+    # Write beside the target and rename, so a crash never leaves half a checkpoint
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as file:
+        file.write(MAGIC)
+        file.write(len(header).to_bytes(8, 'little'))
+        file.write(header)
+        for entry, (_, array) in zip(entries, arrays):
+            file.seek(start + entry['offset'])
+            file.write(memoryview(array).cast('B'))
+        file.truncate(start + offset)
+    os.replace(tmp, path)
+
+
+def read_header(path):
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a simulation checkpoint")
+        length = int.from_bytes(file.read(8), 'little')
+        header = json.loads(file.read(length))
+    header['start'] = -(-(len(MAGIC) + 8 + length) // ALIGN) * ALIGN
+    return header
+
+
+def load_checkpoint(path, mmap=True):
+    # With mmap the arrays are copy-on-write views of the file, so nothing is
+    # read until it is touched and the file itself is never modified
+    header = read_header(path)
+    buffer = None
+    if not mmap:
+        with open(path, 'rb') as file:
+            buffer = bytearray(file.read())
+    arrays = {}
+    for entry in header['arrays']:
+        shape = tuple(entry['shape'])
+        offset = header['start'] + entry['offset']
+        if int(np.prod(shape)) == 0:
+            array = np.empty(shape, dtype=entry['dtype'])
+        elif mmap:
+            array = np.memmap(path, dtype=entry['dtype'], mode='c', offset=offset, shape=shape)
+        else:
+            array = np.frombuffer(buffer, dtype=entry['dtype'], count=int(np.prod(shape)), offset=offset).reshape(shape)
+        arrays[entry['name']] = array
+    if 'grass_bits' in arrays:
+        rows, columns = header['grass_shape']
+        if arrays['grass_ticks'].shape != (rows, columns) or arrays['grass_bits'].shape != (rows, -(-columns // 8)):
+            raise ValueError(f"{path} has grass arrays that do not match its {rows} x {columns} grid")
+    return Simulation.from_state(Config(**header['config']), make_rng(header['rng']), header['tick'], arrays,
+                                 header.get('engine', 'numpy'))
+
+
+def make_rng(state):
+    rng = np.random.Generator(getattr(np.random, state['bit_generator'])())
+    rng.bit_generator.state = state
+    return rng
+
+
+def fork(path, n, seed=None, **params):
+    # n copies of a warmed-up run, each with its own RNG stream and optionally
+    # changed model constants. Those in SETUP_CONSTANTS are already built
+    # into the saved state, so changing them here is refused.
+    fixed = sorted(set(params) & set(SETUP_CONSTANTS))
+    if fixed:
+        raise ValueError(f"{', '.join(fixed)} cannot change in a fork; they only take effect in a new run")
+    sims = []
+    for stream in np.random.SeedSequence(seed).spawn(n):
+        sim = load_checkpoint(path)
+        sim.rng = np.random.default_rng(stream)
+        if params:
+            sim.config = sim.config.replace(**params)
+        sims.append(sim)
+    return sims
+
+
+class AutoCheckpoint:
+    # Call after every tick; saves every `every` ticks and keeps the last
+    # `keep`, or all of them if keep <= 0. Checkpoints are ordered by the tick
+    # in their name, so call clear() when a new run starts from tick 0.
+    def __init__(self, directory, every=1000, keep=3):
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, sim):
+        if sim.tick % self.every:
+            return None
+        return self.save(sim)
+
+    def save(self, sim):
+        path = os.path.join(self.directory, f'tick{sim.tick:012d}.ckpt')
+        save_checkpoint(sim, path)
+        if self.keep > 0:
+            for old in self.checkpoints()[:-self.keep]:
+                os.remove(old)
+        return path
+
+    def checkpoints(self):
+        # Oldest first by the tick in the name
+        ticks = {}
+        for path in glob.glob(os.path.join(self.directory, 'tick*.ckpt')):
+            match = AUTO_NAME.search(path)
+            if match:
+                ticks[path] = int(match.group(1))
+        return sorted(ticks, key=ticks.get)
+
+    def clear(self):
+        for path in self.checkpoints():
+            os.remove(path)
+
+    def latest(self):
+        checkpoints = self.checkpoints()
+        return checkpoints[-1] if checkpoints else None
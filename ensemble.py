@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+
+from simulation import Config, Simulation
+
+
+def replicate_seeds(seeds, base_seed=0):
+    # An int asks for that many independent streams spawned from base_seed
+    count = seeds if isinstance(seeds, int) else len(seeds)
+    if count < 1:
+        raise ValueError(f"An ensemble needs at least one replicate, got {count}")
+    if isinstance(seeds, int):
+        return np.random.SeedSequence(base_seed).spawn(seeds)
+    return [np.random.SeedSequence(seed) for seed in seeds]
+
+
+def run_replicate(config, seed, n_ticks):
+    sim = Simulation(config, seed=seed)
+    counts = np.empty((n_ticks + 1, 3), dtype=np.int64)
+    counts[0] = sim.counts()
+    counts[1:] = sim.run(n_ticks)
+    return counts
+
+
+def run_ensemble(config=None, seeds=8, n_ticks=1000, workers=None, base_seed=0):
+    # Returns (len(seeds), n_ticks + 1, 3) counts of sheep, wolves and grass.
+    # Each replicate only depends on its own seed, so the result is the same
+    # for any number of workers.
+    config = config if config is not None else Config()
+    seeds = replicate_seeds(seeds, base_seed)
+    if workers is None:
+        workers = min(len(seeds), os.cpu_count() or 1)
+
+    if workers <= 1:
+        results = [run_replicate(config, seed, n_ticks) for seed in seeds]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_replicate, [config] * len(seeds), seeds, [n_ticks] * len(seeds)))
+    return np.stack(results)
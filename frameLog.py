@@ -0,0 +1,315 @@
+import json
+import mmap
+import struct
+import zlib
+
+import numpy as np
+
+from grassField import GrassField
+
+# Layout: MAGIC, 8-byte header length, JSON header, then one record per
+# recorded tick: RECORD followed by a zlib payload. close() appends the index
+# of all records and a TRAILER pointing at it; a log without one (a crashed
+# run) is indexed by walking the records instead.
+#
+# A payload is the packed grass mask, then the sheep and then the wolves.
+# Positions are fixed point, FIXED_ONE per world width, so moving across the
+# edge of the torus is plain uint32 wraparound. In a keyframe the mask and
+# the animals are stored as they are. Otherwise the mask is XORed with the
+# previous one, and the animals are a keep bit per previous animal (0 for the
+# ones that died), the change in x, y and energy of the survivors, and the
+# newborns, which Simulation always appends after them. All numeric columns
+# are byte-shuffled, so the mostly zero high bytes compress together.
+MAGIC = b'WSGFRAM1'
+RECORD = struct.Struct('<qBIIII')  # tick, flags, sheep, wolves, grass count, payload bytes
+TRAILER = struct.Struct('<Q8s')  # offset of the index, INDEX_TAG
+INDEX_TAG = b'WSGINDEX'
+INDEX = np.dtype([('tick', '<i8'), ('offset', '<i8'), ('keyframe', 'u1'),
+                  ('sheep', '<u4'), ('wolves', '<u4'), ('grass', '<u4')])
+KEYFRAME = 1
+KEYFRAME_EVERY = 100  # ticks; seeking decodes at most this many deltas
+FIXED_ONE = 2 ** 32
+MASK = FIXED_ONE - 1
+LOOKAHEAD = 64  # previous animals tried before the rest count as dead and the new ones as born
+LEVEL = 1  # zlib level; higher barely helps on shuffled deltas
+
+
+def shuffle(values):
+    # Byte planes one after the other: every first byte, every second byte, ...
+    values = np.ascontiguousarray(values)
+    return values.view(np.uint8).reshape(-1, values.itemsize).T.tobytes()
+
+
+def unshuffle(buffer, offset, dtype, count):
+    dtype = np.dtype(dtype)
+    planes = np.frombuffer(buffer, dtype=np.uint8, count=count * dtype.itemsize, offset=offset)
+    return planes.reshape(dtype.itemsize, count).T.copy().view(dtype).reshape(count), offset + count * dtype.itemsize
+
+
+def to_fixed(values, width):
+    return (np.asarray(values, dtype=np.float64) * (FIXED_ONE / width)).astype(np.uint64).astype(np.uint32)
+
+
+def survivors(prev, new, reach):
+    # Keep mask over the previous animals. Survivors keep their order and
+    # move at most reach, and newborns come last, so this walks both lists
+    # in step: it gallops to the end of each run of animals that are still
+    # close, and where one is not, looks ahead for the next previous animal
+    # that is, counting the ones passed over as dead. It runs on Python ints
+    # since runs are short; guessing wrong only costs space.
+    px, py = prev[0].tolist(), prev[1].tolist()
+    nx, ny = new[0].tolist(), new[1].tolist()
+    reach = int(reach)
+    span = 2 * reach
+
+    def near(i, j):
+        return (nx[j] - px[i] + reach) & MASK <= span and (ny[j] - py[i] + reach) & MASK <= span
+
+    keep = bytearray(len(px))
+    i = j = 0
+    while i < len(px) and j < len(nx):
+        if not near(i, j):
+            for skip in range(1, min(LOOKAHEAD, len(px) - i)):
+                if near(i + skip, j):
+                    i += skip
+                    break
+            else:
+                break
+        # near(i + good, j + good) holds; find the first offset where it does not
+        limit = min(len(px) - i, len(nx) - j)
+        good, step = 0, 1
+        while good + step < limit and near(i + good + step, j + good + step):
+            good += step
+            step *= 2
+        bad = min(good + step, limit)
+        while bad - good > 1:
+            middle = (good + bad) // 2
+            if near(i + middle, j + middle):
+                good = middle
+            else:
+                bad = middle
+        keep[i:i + good + 1] = b'\x01' * (good + 1)
+        i += good + 1
+        j += good + 1
+    return np.frombuffer(keep, dtype=bool)
+
+
+class Frame:
+    # One decoded tick; looks enough like a Simulation (grass.region,
+    # sheep_x, ..., counts()) for wolfSheepGrass.draw_world
+    region = GrassField.region
+
+    def __init__(self, tick, bits, animals, grass_count, width):
+        self.tick = tick
+        self.bits = bits
+        self.shape = (bits.shape[0], bits.shape[0])  # the grid is square
+        self.grass_count = grass_count
+        # (x, y, energy) per kind as stored, the base for the next delta
+        self.animals = animals
+        self.scale = width / FIXED_ONE
+
+    # Positions in pixels only for the frames that get drawn
+    @property
+    def sheep_x(self):
+        return self.animals[0][0] * self.scale
+
+    @property
+    def sheep_y(self):
+        return self.animals[0][1] * self.scale
+
+    @property
+    def sheep_energy(self):
+        return self.animals[0][2]
+
+    @property
+    def wolf_x(self):
+        return self.animals[1][0] * self.scale
+
+    @property
+    def wolf_y(self):
+        return self.animals[1][1] * self.scale
+
+    @property
+    def wolf_energy(self):
+        return self.animals[1][2]
+
+    @property
+    def grass(self):
+        return self
+
+    def counts(self):
+        return len(self.animals[0][0]), len(self.animals[1][0]), self.grass_count
+
+
+class FrameRecorder:
+    # Call record(sim) after every tick; the first call writes the header
+    # from that simulation's config. An existing file is never overwritten.
+    def __init__(self, path, keyframe_every=KEYFRAME_EVERY, level=LEVEL):
+        self.path = path
+        self.keyframe_every = keyframe_every
+        self.level = level
+        self.file = None
+        self.index = np.empty(1024, dtype=INDEX)
+        self.records = 0
+        self.previous = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def open(self, sim):
+        c = sim.config
+        self.width = c.WIDTH
+        self.reach = min(int(np.ceil(c.CELL_SIZE * c.MOVEMENT_MULTIPLIER * FIXED_ONE / c.WIDTH)) + 2, FIXED_ONE // 4)
+        header = json.dumps({'config': c.as_dict(), 'keyframe_every': self.keyframe_every}).encode()
+        self.file = open(self.path, 'xb')
+        self.file.write(MAGIC)
+        self.file.write(len(header).to_bytes(8, 'little'))
+        self.file.write(header)
+
+    def record(self, sim):
+        if self.file is None:
+            self.open(sim)
+        bits = sim.grass.bits.copy()
+        animals = [(to_fixed(agents.x, self.width), to_fixed(agents.y, self.width), agents.energy.astype(np.int32))
+                   for agents in (sim.sheep, sim.wolves)]
+        keyframe = self.previous is None or self.records % self.keyframe_every == 0
+        if keyframe:
+            parts = [bits.tobytes()]
+            for columns in animals:
+                parts.extend(shuffle(column) for column in columns)
+        else:
+            previous_bits, previous_animals = self.previous
+            parts = [np.bitwise_xor(bits, previous_bits).tobytes()]
+            for (px, py, pe), (x, y, energy) in zip(previous_animals, animals):
+                keep = survivors((px, py), (x, y), self.reach)
+                kept = int(np.count_nonzero(keep))
+                parts.append(np.packbits(keep).tobytes())
+                parts.extend(shuffle(column) for column in (x[:kept] - px[keep], y[:kept] - py[keep],
+                                                            energy[:kept] - pe[keep]))
+                parts.extend(shuffle(column[kept:]) for column in (x, y, energy))
+        payload = zlib.compress(b''.join(parts), self.level)
+        sheep, wolves, grass = sim.counts()
+        if self.records == len(self.index):
+            self.index = np.resize(self.index, 2 * len(self.index))
+        self.index[self.records] = (sim.tick, self.file.tell(), keyframe, sheep, wolves, grass)
+        self.file.write(RECORD.pack(sim.tick, KEYFRAME if keyframe else 0, sheep, wolves, grass, len(payload)))
+        self.file.write(payload)
+        self.records += 1
+        self.previous = bits, animals
+
+    def close(self):
+        if self.file is None:
+            return
+        offset = self.file.tell()
+        self.file.write(self.index[:self.records].tobytes())
+        self.file.write(TRAILER.pack(offset, INDEX_TAG))
+        self.file.close()
+        self.file = None
+
+
+class FrameLog:
+    # Random access to a recorded run: frame(i) decodes from the last
+    # keyframe at or before i, or carries on from the frame decoded last if
+    # that is closer, so playing forward costs one delta per frame
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a frame log")
+        length = int.from_bytes(self.data[len(MAGIC):len(MAGIC) + 8], 'little')
+        start = len(MAGIC) + 8
+        header = json.loads(self.data[start:start + length])
+        self.config = header['config']
+        self.keyframe_every = header['keyframe_every']
+        self.width = self.config['WIDTH']
+        grid_size = self.config['GRID_SIZE']
+        self.grass_shape = (grid_size, -(-grid_size // 8))
+        self.index = self.read_index(start + length)
+        self.keyframes = np.flatnonzero(self.index['keyframe'])
+        self.position = None
+        self.current = None
+
+    def read_index(self, first):
+        end = len(self.data)
+        if end >= first + TRAILER.size:
+            offset, tag = TRAILER.unpack_from(self.data, end - TRAILER.size)
+            if tag == INDEX_TAG:
+                return np.frombuffer(self.data, dtype=INDEX, count=(end - TRAILER.size - offset) // INDEX.itemsize,
+                                     offset=offset).copy()
+        # No index; walk the records, dropping a last one cut short
+        rows = []
+        offset = first
+        while offset + RECORD.size <= end:
+            tick, flags, sheep, wolves, grass, length = RECORD.unpack_from(self.data, offset)
+            if offset + RECORD.size + length > end:
+                break
+            rows.append((tick, offset, flags & KEYFRAME, sheep, wolves, grass))
+            offset += RECORD.size + length
+        return np.array(rows, dtype=INDEX)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def ticks(self):
+        return self.index['tick']
+
+    def counts(self):
+        # (sheep, wolves, grass) for every frame, without decoding any
+        return np.stack([self.index[name] for name in ('sheep', 'wolves', 'grass')], axis=1)
+
+    def frame(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        keyframe = int(self.keyframes[np.searchsorted(self.keyframes, i, side='right') - 1])
+        if self.position is None or not keyframe <= self.position <= i:
+            self.position, self.current = keyframe, self.decode(keyframe, None)
+        while self.position < i:
+            self.position += 1
+            self.current = self.decode(self.position, self.current)
+        return self.current
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.frame(i)
+
+    def decode(self, i, base):
+        start = int(self.index['offset'][i])
+        tick, flags, sheep, wolves, grass, length = RECORD.unpack_from(self.data, start)
+        payload = zlib.decompress(self.data[start + RECORD.size:start + RECORD.size + length])
+        size = self.grass_shape[0] * self.grass_shape[1]
+        bits = np.frombuffer(payload, dtype=np.uint8, count=size).reshape(self.grass_shape)
+        offset = size
+        animals = []
+        for kind, n in enumerate((sheep, wolves)):
+            if flags & KEYFRAME:
+                columns = []
+                for dtype in (np.uint32, np.uint32, np.int32):
+                    column, offset = unshuffle(payload, offset, dtype, n)
+                    columns.append(column)
+                animals.append(tuple(columns))
+                continue
+            px, py, pe = base.animals[kind]
+            keep = np.unpackbits(np.frombuffer(payload, dtype=np.uint8, count=-(-len(px) // 8), offset=offset),
+                                 count=len(px)).view(bool)
+            offset += -(-len(px) // 8)
+            kept = int(np.count_nonzero(keep))
+            changes = []
+            for dtype in (np.uint32, np.uint32, np.int32):
+                change, offset = unshuffle(payload, offset, dtype, kept)
+                changes.append(change)
+            columns = []
+            for previous, change, dtype in zip((px, py, pe), changes, (np.uint32, np.uint32, np.int32)):
+                born, offset = unshuffle(payload, offset, dtype, n - kept)
+                columns.append(np.concatenate((previous[keep] + change, born)))
+            animals.append(tuple(columns))
+        if not flags & KEYFRAME:
+            bits = np.bitwise_xor(bits, base.bits)
+        return Frame(tick, bits, animals, grass, self.width)
+
+    def close(self):
+        self.data.close()
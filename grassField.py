@@ -0,0 +1,105 @@
+import numpy as np
+
+CHUNK_CELLS = 1 << 22  # cells unpacked at a time, bounds temporary memory on big grids
+
+
+class GrassField:
+    # The grass layer of a grid indexed [x cell, y cell] like grid[i][j]. The
+    # alive mask is bit-packed along y (bits[i, j // 8], most significant bit
+    # first, as np.packbits does) and the regrowth timers are uint8, so a cell
+    # costs 1.125 bytes: a 10,000 x 10,000 grid takes about 113 MB.
+    def __init__(self, alive, ticks, dead_to_live):
+        alive = np.asarray(alive, dtype=bool)
+        self.shape = alive.shape
+        self.bits = np.packbits(alive, axis=1)
+        self.ticks = np.ascontiguousarray(ticks, dtype=timer_dtype(dead_to_live))
+        self.dead_to_live = dead_to_live
+        # Running total of live cells, kept up to date by update() and graze()
+        self.count = int(np.count_nonzero(alive))
+
+    @classmethod
+    def packed(cls, bits, ticks, dead_to_live):
+        # Wraps already packed arrays without copying, e.g. one tile of a
+        # grid in shared memory; ticks gives the shape in cells
+        field = cls.__new__(cls)
+        field.shape = ticks.shape
+        field.bits = bits
+        field.ticks = ticks
+        field.dead_to_live = dead_to_live
+        field.count = sum(int(np.count_nonzero(field.region(rows.start, rows.stop, 0, field.shape[1])))
+                          for rows in field.chunks())
+        return field
+
+    @classmethod
+    def random(cls, grid_size, dead_to_live, rng):
+        # Same start as Cell(random.choice([True, False])) for every cell,
+        # drawn a block of rows at a time
+        field = cls.packed(np.zeros((grid_size, -(-grid_size // 8)), dtype=np.uint8),
+                           np.zeros((grid_size, grid_size), dtype=timer_dtype(dead_to_live)), dead_to_live)
+        for rows in field.chunks():
+            alive = rng.random((rows.stop - rows.start, grid_size)) < 0.5
+            field.ticks[rows] = np.where(alive, 0, rng.integers(0, dead_to_live, size=alive.shape))
+            field.bits[rows] = np.packbits(alive, axis=1)
+            field.count += int(np.count_nonzero(alive))
+        return field
+
+    @property
+    def grid_size(self):
+        return self.shape[0]
+
+    @property
+    def alive(self):
+        # An unpacked copy; writing to it does not change the field
+        return self.region(0, self.shape[0], 0, self.shape[1])
+
+    def region(self, x0, x1, y0, y1, step=1):
+        # Unpacked alive mask of cells [x0, x1) x [y0, y1), taking every
+        # step-th cell for zoomed-out views
+        rows = self.bits[x0:x1:step, y0 // 8:-(-y1 // 8)]
+        alive = np.unpackbits(rows, axis=1).view(bool)
+        return alive[:, y0 % 8:y0 % 8 + (y1 - y0):step]
+
+    def chunks(self):
+        rows = max(1, CHUNK_CELLS // max(self.shape[1], 1))
+        for start in range(0, self.shape[0], rows):
+            yield slice(start, min(start + rows, self.shape[0]))
+
+    def update(self):
+        # Cell.update for every cell: dead cells count up and regrow at dead_to_live.
+        # Live cells always sit at 0, so the compare only picks up regrown ones.
+        for rows in self.chunks():
+            dead = np.unpackbits(self.bits[rows], axis=1, count=self.shape[1])
+            np.bitwise_xor(dead, 1, out=dead)
+            ticks = self.ticks[rows]
+            np.add(ticks, dead, out=ticks)
+            regrown = ticks >= self.dead_to_live
+            np.copyto(ticks, 0, where=regrown)
+            self.bits[rows] |= np.packbits(regrown, axis=1)
+            self.count += int(np.count_nonzero(regrown))
+
+    def graze(self, cells):
+        # cells holds the flat cell index of every sheep, in list order. Returns a
+        # mask of the sheep that ate; as in the sequential loop, only the first
+        # sheep on each live cell does.
+        gx, gy = np.divmod(cells, self.shape[1])
+        byte = gy >> 3
+        mask = (128 >> (gy & 7)).astype(np.uint8)
+        hungry = np.flatnonzero(self.bits[gx, byte] & mask)
+        # np.unique gives each cell's first position in hungry, which is in list order
+        winners = hungry[np.unique(cells[hungry], return_index=True)[1]]
+
+        # Several eaten cells can share a byte, hence the unbuffered .at
+        np.bitwise_and.at(self.bits, (gx[winners], byte[winners]), ~mask[winners])
+        self.ticks[gx[winners], gy[winners]] = 0
+        self.count -= len(winners)
+        ate = np.zeros(len(cells), dtype=bool)
+        ate[winners] = True
+        return ate
+
+    def grass_count(self):
+        # Same scale as count_grass()
+        return self.count // 4
+
+
+def timer_dtype(dead_to_live):
+    return np.uint8 if dead_to_live <= np.iinfo(np.uint8).max else np.uint16
@@ -0,0 +1,85 @@
+import numpy as np
+import pygame
+
+BLIT_LIMIT = 5000  # above this many animals, markers are stamped into the pixels
+LABEL_LIMIT = 2000  # above this many animals, energy labels are skipped
+
+
+class GridRenderer:
+    # Draws the grass layer from an alive mask and animals from position arrays
+    def __init__(self, cell_size, alive_color, dead_color, label_size=15, label_color=(255, 255, 255)):
+        self.cell_size = cell_size
+        self.palette = np.array([dead_color, alive_color], dtype=np.uint8)
+        self.label_size = label_size
+        self.label_color = label_color
+        self.font = None
+        self.glyphs = {}
+        self.markers = {}
+        self.grass = None
+        self.scaled = None
+        radius = max(cell_size // 4, 0)
+        dx, dy = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+        inside = dx ** 2 + dy ** 2 <= radius ** 2
+        self.stamp_x, self.stamp_y = dx[inside], dy[inside]
+
+    def draw_grass(self, window, alive, origin=(0, 0), size=None):
+        # alive is indexed [x, y], the same layout surfarray uses. It is
+        # stretched over size pixels, by default cell_size per cell.
+        grid_w, grid_h = alive.shape
+        if size is None:
+            size = (grid_w * self.cell_size, grid_h * self.cell_size)
+        if self.grass is None or self.grass.get_size() != (grid_w, grid_h):
+            self.grass = pygame.Surface((grid_w, grid_h), depth=24)
+        if self.scaled is None or self.scaled.get_size() != size:
+            self.scaled = pygame.Surface(size, depth=24)
+        pygame.surfarray.blit_array(self.grass, self.palette[alive.view(np.uint8)])
+        pygame.transform.scale(self.grass, self.scaled.get_size(), self.scaled)
+        window.blit(self.scaled, origin)
+
+    def marker(self, color):
+        if color not in self.markers:
+            radius = self.cell_size // 4
+            size = 2 * radius + 1
+            key = (255, 0, 255) if color != (255, 0, 255) else (0, 255, 0)
+            surface = pygame.Surface((size, size))
+            surface.fill(key)
+            surface.set_colorkey(key)
+            pygame.draw.circle(surface, color, (radius, radius), radius)
+            self.markers[color] = surface
+        return self.markers[color]
+
+    def glyph(self, energy):
+        # Energy labels repeat a lot, so each number is rendered once
+        surface = self.glyphs.get(energy)
+        if surface is None:
+            if self.font is None:
+                self.font = pygame.font.SysFont(None, self.label_size)
+            surface = self.glyphs[energy] = self.font.render(str(energy), True, self.label_color)
+        return surface
+
+    def draw_animals(self, window, x, y, color, energy=None):
+        if len(x) == 0:
+            return
+        px = np.asarray(x).astype(np.intp)
+        py = np.asarray(y).astype(np.intp)
+        if len(px) > BLIT_LIMIT:
+            self.stamp(window, px, py, color)
+        else:
+            sprite = self.marker(color)
+            radius = self.cell_size // 4
+            window.blits([(sprite, (i - radius, j - radius)) for i, j in zip(px.tolist(), py.tolist())], False)
+
+        if energy is not None and len(px) <= LABEL_LIMIT:
+            offset = self.cell_size // 2
+            window.blits([(self.glyph(e), (i + offset, j - offset))
+                          for i, j, e in zip(px.tolist(), py.tolist(), np.asarray(energy).tolist())], False)
+
+    def stamp(self, window, px, py, color):
+        # Writes every marker's disc straight into the pixel array in one go
+        width, height = window.get_size()
+        xs = (px[:, None] + self.stamp_x).reshape(-1)
+        ys = (py[:, None] + self.stamp_y).reshape(-1)
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        pixels = pygame.surfarray.pixels3d(window)
+        pixels[xs[inside], ys[inside]] = color
+        del pixels
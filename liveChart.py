@@ -0,0 +1,111 @@
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+HEADROOM = 1.25  # how far past the data the axes grow when it leaves them
+MAX_POINTS = 2000  # points per line handed to matplotlib on a refresh
+
+
+class LiveChart:
+    # Population chart that keeps the last `capacity` ticks in a ring buffer and
+    # repaints only its lines with blitting, at most `fps` times per second
+    def __init__(self, labels, capacity=100000, fps=10, title='Population over Time',
+                 xlabel='Ticks', ylabel='Population', annotate=True):
+        self.figure, self.ax = plt.subplots()
+        self.ax.set_title(title)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+
+        self.capacity = capacity
+        self.values = np.zeros((capacity, len(labels)))
+        self.interval = 1.0 / fps if fps else 0.0
+        self.lines = [self.ax.plot([], [], label=label, animated=True)[0] for label in labels]
+        self.annotations = []
+        if annotate:
+            for line in self.lines:
+                self.annotations.append(self.ax.annotate('', xy=(0, 0), xytext=(5, 5), textcoords="offset points",
+                                                         bbox=dict(boxstyle="round,pad=0.3", edgecolor=line.get_color(), facecolor="white"),
+                                                         animated=True, visible=False))
+        self.ax.legend()
+
+        self.background = None
+        self.figure.canvas.mpl_connect('draw_event', self.on_draw)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.last_refresh = float('-inf')
+        self.ax.set_xlim(0, 100)
+        self.ax.set_ylim(0, 100)
+        for line in self.lines:
+            line.set_data([], [])
+        for annotation in self.annotations:
+            annotation.set_visible(False)
+        self.figure.canvas.draw()
+
+    def on_draw(self, event):
+        # A full redraw (start, rescale, window resize) gives us a new background
+        self.background = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        for artist in self.lines + self.annotations:
+            self.ax.draw_artist(artist)
+
+    def update(self, *values):
+        self.values[self.count % self.capacity] = values
+        self.count += 1
+        if time.perf_counter() - self.last_refresh >= self.interval:
+            self.refresh()
+            # Count from the end of the redraw so a slow backend can't take every tick
+            self.last_refresh = time.perf_counter()
+
+    def history(self, max_points=None):
+        # Ticks and values still in the ring buffer, oldest first, thinned to
+        # about max_points but always ending at the newest tick
+        size = min(self.count, self.capacity)
+        stride = 1 if not max_points else -(-size // max_points)
+        ticks = np.arange(self.count - 1, self.count - size - 1, -stride)[::-1]
+        return ticks, self.values[ticks % self.capacity]
+
+    def refresh(self):
+        if self.count == 0:
+            return
+        ticks, values = self.history(MAX_POINTS)
+        for column, line in enumerate(self.lines):
+            line.set_data(ticks, values[:, column])
+        for annotation, value in zip(self.annotations, values[-1]):
+            annotation.xy = (ticks[-1], value)
+            annotation.set_text(str(int(value)))
+            annotation.set_visible(True)
+
+        canvas = self.figure.canvas
+        if self.rescale(ticks, values) or self.background is None:
+            canvas.draw()
+        else:
+            canvas.restore_region(self.background)
+            self.draw_artists()
+            canvas.blit(self.figure.bbox)
+        canvas.flush_events()
+
+    def rescale(self, ticks, values):
+        # Only touch the limits when the data has left them
+        xmin, xmax = self.ax.get_xlim()
+        ymin, ymax = self.ax.get_ylim()
+        changed = False
+        if ticks[-1] > xmax or ticks[0] > xmin + self.capacity * (HEADROOM - 1):
+            self.ax.set_xlim(ticks[0], ticks[0] + max(ticks[-1] - ticks[0], 1) * HEADROOM)
+            changed = True
+        top = values.max()
+        if top > ymax:
+            self.ax.set_ylim(ymin, top * HEADROOM)
+            changed = True
+        return changed
+
+    def finish(self):
+        # Hand the lines back to normal drawing so a final plt.show() keeps them
+        self.refresh()
+        for artist in self.lines + self.annotations:
+            artist.set_animated(False)
+        self.figure.canvas.draw_idle()
@@ -1,6 +1,9 @@
+import warnings
+
 import numpy as np
-from scipy.integrate import odeint
-import matplotlib.pyplot as plt
+
+# scipy and matplotlib are imported inside the functions that use them, so
+# that reading the parameters (as sweep.py does) stays cheap
 
 # Define the system of differential equations
 def system(conditions, t, a, b, c, d, e, f, g):
@@ -18,6 +21,7 @@ d = 0.02 # sheep birth from grass
 e = 0.05 # sheep consumption rate by wolves
 f = 0.08 # wolf death rate
 g = 0.02 # wolf birth rate from sheep 
+PARAM_NAMES = ('a', 'b', 'c', 'd', 'e', 'f', 'g')
 
 # Initial conditions
 x0 = 200
@@ -26,16 +30,304 @@ z0 = 50
 initial_conditions = [x0, y0, z0]
 
 t0 = 500
-t = np.linspace(0, t0, t0*500)
-
-solution = odeint(system, initial_conditions, t, args=(a, b, c, d, e, f, g))
-
-plt.plot(t, solution[:, 0], label='x(t)')
-plt.plot(t, solution[:, 1], label='y(t)')
-plt.plot(t, solution[:, 2], label='z(t)')
-plt.legend(loc='best')
-plt.xlabel('t')
-plt.ylabel('values')
-plt.title('Solution of the differential equations')
-plt.grid(True)
-plt.show()
+PLOT_POINTS = 5000
+CHUNK = 1000  # time units integrated per solve_ivp call in integrate_chunks()
+ODEINT_TOLERANCE = 1.49012e-8  # odeint's default rtol and atol
+BATCH_SETS = 128  # parameter sets per coupled system in solve_batch()
+BATCH_MXSTEP = 500  # odeint's default step limit, also for a coupled group
+BLOWUP = 1e6  # growth over the initial conditions taken for a set diverging
+NEGATIVE = -1.0  # a population below this is a set running away, not rounding
+
+def parameters(**overrides):
+    # The module parameters a..g as a tuple, with any of them replaced
+    values = {name: globals()[name] for name in PARAM_NAMES}
+    unknown = set(overrides) - set(values)
+    if unknown:
+        raise TypeError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    values.update(overrides)
+    return tuple(values[name] for name in PARAM_NAMES)
+
+def solve(t, conditions=None, params=None):
+    if conditions is None:
+        conditions = initial_conditions
+    if params is None:
+        params = parameters()
+    from scipy.integrate import odeint
+    return odeint(system, conditions, t, args=tuple(params))
+
+# K parameter sets integrated together as one 3K-dimensional system.
+# state holds K rows of (x, y, z) flattened, params is a (K, 7) array of a..g
+def batch_system(t, state, params):
+    a, b, c, d, e, f, g = params.T
+    x, y, z = state.reshape(-1, 3).T
+    derivatives = np.empty((len(x), 3))
+    derivatives[:, 0] = a * x - b * x * y
+    derivatives[:, 1] = -(c * y) + (d * x * y) - (e * y * z)
+    derivatives[:, 2] = -f * z + g * y * z
+    return derivatives.reshape(-1)
+
+def jacobian_blocks(state, params):
+    # d(x, y, z)' / d(x, y, z), one 3x3 block per parameter set
+    a, b, c, d, e, f, g = params.T
+    x, y, z = state.reshape(-1, 3).T
+    blocks = np.zeros((len(x), 3, 3))
+    blocks[:, 0, 0] = a - b * y
+    blocks[:, 0, 1] = -b * x
+    blocks[:, 1, 0] = d * y
+    blocks[:, 1, 1] = -c + d * x - e * z
+    blocks[:, 1, 2] = -e * y
+    blocks[:, 2, 1] = g * z
+    blocks[:, 2, 2] = -f + g * y
+    return blocks
+
+def parameter_jacobian_blocks(state, params):
+    # d(x, y, z)' / d(a..g), one 3x7 block per parameter set
+    x, y, z = state.reshape(-1, 3).T
+    blocks = np.zeros((len(x), 3, 7))
+    blocks[:, 0, 0] = x
+    blocks[:, 0, 1] = -x * y
+    blocks[:, 1, 2] = -y
+    blocks[:, 1, 3] = x * y
+    blocks[:, 1, 4] = -y * z
+    blocks[:, 2, 5] = -z
+    blocks[:, 2, 6] = y * z
+    return blocks
+
+def batch_jacobian(t, state, params):
+    # Block diagonal, one 3x3 block per parameter set
+    blocks = jacobian_blocks(state, params)
+    k = len(blocks)
+    from scipy.sparse import bsr_matrix
+    return bsr_matrix((blocks, np.arange(k), np.arange(k + 1)), shape=(3 * k, 3 * k))
+
+def batch_banded_jacobian(state, t, params):
+    # The same Jacobian in odeint's banded layout (ml = mu = 2): entry [i, j]
+    # is stored at row i - j + 2, column j
+    blocks = jacobian_blocks(state, params)
+    k = len(blocks)
+    band = np.zeros((5, 3 * k))
+    for i in range(3):
+        for j in range(3):
+            band[i - j + 2, j::3] = blocks[:, i, j]
+    return band
+
+def coupled_system(params):
+    # batch_system and batch_banded_jacobian in odeint's argument order for a
+    # fixed group. odeint calls the derivatives thousands of times on a few
+    # hundred numbers, where numpy's per-call overhead is most of the cost,
+    # so the rates are kept as base + cross * (y, x, y) - e * z with the
+    # columns that depend only on params stacked once
+    a, b, c, d, e, f, g = params.T
+    base = np.stack([a, -c, -f], axis=1)
+    cross = np.stack([-b, d, g], axis=1)
+    partner = np.array([1, 0, 1])
+
+    def derivatives(state, t):
+        xyz = state.reshape(-1, 3)
+        rates = xyz[:, partner] * cross
+        rates += base
+        rates[:, 1] -= e * xyz[:, 2]
+        rates *= xyz
+        return rates.reshape(-1)
+
+    def jacobian(state, t):
+        return batch_banded_jacobian(state, t, params)
+    return derivatives, jacobian
+
+def solve_batch(t, params, conditions=None, method='LSODA', rtol=None, atol=None, sets=BATCH_SETS):
+    # Integrates K parameter sets and returns a (K, len(t), 3) array, sets at
+    # a time as one 3 * sets dimensional system. LSODA goes through odeint
+    # like solve(); other solve_ivp methods such as BDF or Radau get the
+    # sparse block Jacobian. rtol and atol mean what they do for one set
+    # (odeint's 1.49012e-8 by default). The coupled sets share their steps,
+    # so a set can be carried along with a looser error than it would get
+    # alone; each group is given them divided by sqrt(sets), which is enough
+    # to keep every set about as close as solving it alone. A group gets
+    # odeint's step limit between outputs as one set would, so that a set
+    # stalling it shows up early; solve_group() takes such sets out, and they
+    # come back as solve() or solve_ivp() alone would give them, NaN from a
+    # failed solve_ivp on (with a warning).
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    k = len(params)
+    if conditions is None:
+        conditions = initial_conditions
+    conditions = np.broadcast_to(np.asarray(conditions, dtype=float), (k, 3))
+    rtol, atol = rtol or ODEINT_TOLERANCE, atol or ODEINT_TOLERANCE
+    groups = []
+    for first in range(0, k, sets):
+        group = slice(first, min(first + sets, k))
+        states, redo = solve_group(t, params[group], conditions[group], method, rtol, atol)
+        for i in np.flatnonzero(redo):
+            states[i] = solve_one(t, params[group][i], conditions[group][i], method, rtol, atol)
+        groups.append(states)
+    return groups[0] if len(groups) == 1 else np.concatenate(groups)
+
+def solve_group(t, params, conditions, method, rtol, atol):
+    # The group's states and which of its sets went wrong in the coupled
+    # solve. A set that diverges or stalls it would take the others down with
+    # it, so they are kept up to the first time it went wrong and carried on
+    # from there without it; solve_batch() redoes the sets that went wrong
+    # on their own from the start
+    k = len(params)
+    culprits = np.zeros(k, dtype=bool)
+    solution = None
+    pending = [(np.arange(k), 0)]  # sets to carry on together from a row of t
+    while pending:
+        sets, row = pending.pop()
+        if len(sets) <= 1:
+            culprits[sets] = True
+            continue
+        start = conditions[sets] if row == 0 else solution[sets, row]
+        states = integrate_group(t[row:], params[sets], start, method, rtol / np.sqrt(len(sets)),
+                                 atol / np.sqrt(len(sets)))
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            growth = np.abs(states).max(axis=2) / np.abs(conditions[sets]).max(axis=1)[:, np.newaxis]
+        wrong = ~(growth <= BLOWUP) | (states.min(axis=2) < NEGATIVE)
+        rows = states.shape[1]
+        if wrong.any():
+            rows = int(np.argmax(wrong.any(axis=0)))
+            culprits[sets[wrong[:, rows]]] = True
+            pending.append((sets[~wrong[:, rows]], row + max(rows - 1, 0)))
+        elif row + rows < len(t):
+            # A stall does not say which set caused it, so each half carries
+            # on as a group of its own, down to that set alone
+            pending.extend((half, row + rows - 1) for half in np.array_split(sets, 2))
+        elif row == 0:
+            return states, culprits
+        if solution is None:
+            solution = np.full((k, len(t), 3), np.nan)
+        solution[sets, row:row + rows] = states[:, :rows]
+    if solution is None:
+        solution = np.full((k, len(t), 3), np.nan)
+    return solution, culprits
+
+def integrate_group(t, params, conditions, method, rtol, atol):
+    # (k, rows, 3) states at as many of the times t as the solver got to
+    # and no warning of its own, as solve_group() goes on from a failure
+    k = len(params)
+    from scipy.integrate import ODEintWarning, odeint, solve_ivp
+    if method == 'LSODA':
+        derivatives, jacobian = coupled_system(params)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', ODEintWarning)
+            solution, info = odeint(derivatives, conditions.reshape(-1), t, Dfun=jacobian, ml=2, mu=2,
+                                    rtol=rtol, atol=atol, mxstep=BATCH_MXSTEP, full_output=True)
+        rows = len(t)
+        if info['message'] != 'Integration successful.':
+            # tcur is only filled in up to the failure
+            rows = 1 + int(np.argmin(np.append(info['tcur'] >= t[1:], False)))
+        return solution[:rows].reshape(rows, k, 3).transpose(1, 0, 2)
+
+    options = {'jac': batch_jacobian} if method in ('BDF', 'Radau') else {}
+    result = solve_ivp(batch_system, (t[0], t[-1]), conditions.reshape(-1), method=method, t_eval=t,
+                       args=(params,), rtol=rtol, atol=atol, **options)
+    return result.y.reshape(k, 3, -1).transpose(0, 2, 1)
+
+def solve_one(t, params, conditions, method, rtol, atol):
+    # One set alone, as solve() does it; a solve_ivp method that fails leaves
+    # NaN from there on, with a warning as odeint gives
+    from scipy.integrate import odeint, solve_ivp
+    if method == 'LSODA':
+        return odeint(system, conditions, t, args=tuple(params), rtol=rtol, atol=atol)
+    result = solve_ivp(rhs(params), (t[0], t[-1]), conditions, method=method, t_eval=t, rtol=rtol, atol=atol)
+    solution = np.full((len(t), 3), np.nan)
+    solution[:result.y.shape[1]] = result.y.T
+    if not result.success:
+        warnings.warn(f"Integration failed at t={result.t[-1] if len(result.t) else t[0]}: {result.message}",
+                      RuntimeWarning)
+    return solution
+
+def rhs(params=None):
+    # system() with the solve_ivp argument order
+    if params is None:
+        params = parameters()
+    return lambda t, conditions: system(conditions, t, *params)
+
+def extinction_event(species, threshold=1.0):
+    # Stops the integration once x, y or z (species 0, 1, 2) drops below threshold
+    def event(t, conditions):
+        return conditions[species] - threshold
+    event.terminal = True
+    event.direction = -1
+    return event
+
+def maximum_event(species, params=None):
+    # Fires at local maxima of one species, where its derivative turns negative
+    f = rhs(params)
+    def event(t, conditions):
+        return f(t, conditions)[species]
+    event.direction = -1
+    return event
+
+def solve_adaptive(t_end, conditions=None, params=None, events=None, method='LSODA', rtol=1.49012e-8, atol=1.49012e-8):
+    # Only the solver's own steps are kept; result.sol(t) evaluates the
+    # continuous solution at any t in [0, t_end]
+    if conditions is None:
+        conditions = initial_conditions
+    from scipy.integrate import solve_ivp
+    return solve_ivp(rhs(params), (0, t_end), conditions, method=method, dense_output=True,
+                     events=events, rtol=rtol, atol=atol)
+
+def first_sample(t, dt):
+    # Index of the first multiple of dt at or after t, forgiving rounding, so
+    # that chunks meeting at t neither repeat nor skip a sample
+    return int(np.ceil(t / dt - 1e-9))
+
+def decimate(result, dt):
+    # Every dt from the first time of result, and its last time even off that grid
+    start, end = result.t[0], result.t[-1]
+    t = np.append(start + np.arange(first_sample(end - start, dt)) * dt, end)
+    return t, result.sol(t).T
+
+def integrate_chunks(t_end, dt, conditions=None, params=None, events=None, chunk=CHUNK, **options):
+    # Yields (t, solution, event_times) one chunk at a time with samples every dt,
+    # so memory stays bounded however long the horizon. Stops early when a
+    # terminal event fires. The last chunk also has a sample at the end, t_end
+    # or the time of the event, even off the dt grid.
+    if conditions is None:
+        conditions = initial_conditions
+    events = events or []
+    start = 0.0
+    while start < t_end:
+        stop = min(start + chunk, t_end)
+        result = solve_adaptive(stop - start, conditions, params, events, **options)
+        result.t = result.t + start
+        end = result.t[-1] if result.status == 1 else stop
+        t = np.arange(first_sample(start, dt), first_sample(end, dt)) * dt
+        if result.status == 1 or stop >= t_end:
+            t = np.append(t, end)
+        solution = result.sol(t - start).T if len(t) else np.empty((0, 3))
+        event_times = [times + start for times in result.t_events] if events else []
+        yield t, solution, event_times
+        if result.status == 1:
+            return
+        conditions = result.y[:, -1]
+        start = stop
+
+def estimate_period(t_end, species=0, conditions=None, params=None, transient=0.5, **options):
+    # Mean spacing of the maxima after the transient fraction of the horizon;
+    # only the maxima times are kept
+    maxima = []
+    for _, _, (times,) in integrate_chunks(t_end, t_end, conditions, params, [maximum_event(species, params)], **options):
+        maxima.extend(times[times >= transient * t_end])
+    if len(maxima) < 2:
+        return None
+    return float(np.diff(maxima).mean())
+
+def main():
+    import matplotlib.pyplot as plt
+    result = solve_adaptive(t0)
+    t, solution = decimate(result, t0 / PLOT_POINTS)
+
+    plt.plot(t, solution[:, 0], label='x(t)')
+    plt.plot(t, solution[:, 1], label='y(t)')
+    plt.plot(t, solution[:, 2], label='z(t)')
+    plt.legend(loc='best')
+    plt.xlabel('t')
+    plt.ylabel('values')
+    plt.title('Solution of the differential equations')
+    plt.grid(True)
+    plt.show()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import numpy as np
+
+# Candidates fetched per query before falling back to a radius search for ties
+K_CANDIDATES = 4
+TIE_TOLERANCE = 1e-9
+
+
+def wrap_offset(d, width):
+    # Same pick as min(d, d - width, d + width, key=abs), first wins on ties
+    a, b, c = np.abs(d), np.abs(d - width), np.abs(d + width)
+    return np.where((a <= b) & (a <= c), d, np.where(b <= c, d - width, d + width))
+
+
+def on_torus(x, width):
+    x = np.mod(x, width)
+    # np.mod can round tiny negatives up to width itself
+    return np.where(x >= width, x - width, x)
+
+
+def nearest(points_x, points_y, targets_x, targets_y, width):
+    # For every point, the index of the closest target on the torus and the
+    # wrapped offset to it. Ties go to the lowest target index, like the
+    # strict '<' scans in Sheep.move and Wolf.move. Index is -1 without targets.
+    points_x = np.asarray(points_x, dtype=float)
+    points_y = np.asarray(points_y, dtype=float)
+    targets_x = np.asarray(targets_x, dtype=float)
+    targets_y = np.asarray(targets_y, dtype=float)
+    n = len(points_x)
+    index = np.full(n, -1, dtype=np.intp)
+    dx = np.zeros(n)
+    dy = np.zeros(n)
+    if n == 0 or len(targets_x) == 0:
+        return index, dx, dy
+
+    # Only SEEK_TARGETS runs get here; scipy.spatial alone takes longer to import than the model
+    from scipy.spatial import cKDTree
+    tree = cKDTree(np.column_stack([on_torus(targets_x, width), on_torus(targets_y, width)]), boxsize=width)
+    queries = np.column_stack([on_torus(points_x, width), on_torus(points_y, width)])
+    k = min(K_CANDIDATES, len(targets_x))
+    dist, candidates = tree.query(queries, k=k)
+    if k == 1:
+        dist, candidates = dist[:, None], candidates[:, None]
+
+    # Re-rank the candidates with exactly the arithmetic of the brute-force scan
+    cdx = wrap_offset(targets_x[candidates] - points_x[:, None], width)
+    cdy = wrap_offset(targets_y[candidates] - points_y[:, None], width)
+    exact = np.sqrt(cdx ** 2 + cdy ** 2)
+    order = np.lexsort((candidates, exact), axis=1)[:, 0]
+    rows = np.arange(n)
+    index[:] = candidates[rows, order]
+    dx[:] = cdx[rows, order]
+    dy[:] = cdy[rows, order]
+
+    # When every candidate ties with the best one there may be more beyond k
+    if k < len(targets_x):
+        crowded = np.flatnonzero(dist[:, -1] <= dist[:, 0] * (1 + TIE_TOLERANCE) + TIE_TOLERANCE)
+        for row in crowded:
+            radius = dist[row, 0] * (1 + TIE_TOLERANCE) + TIE_TOLERANCE
+            found = np.array(sorted(tree.query_ball_point(queries[row], radius)), dtype=np.intp)
+            fdx = wrap_offset(targets_x[found] - points_x[row], width)
+            fdy = wrap_offset(targets_y[found] - points_y[row], width)
+            best = np.argmin(np.sqrt(fdx ** 2 + fdy ** 2))
+            index[row], dx[row], dy[row] = found[best], fdx[best], fdy[best]
+    return index, dx, dy
+
+
+def grass_centers(alive, cell_size):
+    # Live cells in the i-then-j order Sheep.move visits them
+    cells = np.flatnonzero(alive.reshape(-1))
+    grid_size = alive.shape[1]
+    return cells, (cells // grid_size) * cell_size + cell_size // 2, (cells % grid_size) * cell_size + cell_size // 2
+
+
+def nearest_grass(sheep_x, sheep_y, alive, cell_size, width):
+    # Flat index into alive (or -1) of the grass each sheep would head for
+    cells, centers_x, centers_y = grass_centers(alive, cell_size)
+    index, dx, dy = nearest(sheep_x, sheep_y, centers_x, centers_y, width)
+    found = index >= 0
+    index[found] = cells[index[found]]
+    return index, dx, dy
+
+
+def nearest_sheep(wolf_x, wolf_y, sheep_x, sheep_y, width):
+    return nearest(wolf_x, wolf_y, sheep_x, sheep_y, width)
+
+
+def step_towards(x, y, dx, dy, has_target, cell_size, multiplier, width):
+    # One move along (dx, dy) as in Sheep.move; animals without a target stay put
+    angle = np.arctan2(dy, dx)
+    new_x = np.where(has_target, (x + (np.cos(angle) * cell_size) * multiplier) % width, x)
+    new_y = np.where(has_target, (y + (np.sin(angle) * cell_size) * multiplier) % width, y)
+    return new_x, new_y
@@ -0,0 +1,324 @@
+import bisect
+import collections
+import contextlib
+import csv
+import os
+import sys
+import threading
+import time
+
+from tickKernel import run_tick
+
+# Per-tick instrumentation. A Profiler attached as sim.profiler times every
+# entry of Simulation.PHASES and counts the events the phase methods return;
+# other code (drawing, the graph) adds its own timers with profiler.phase().
+# A tick's record stays open until the next tick starts or the profiler is
+# closed, so whatever runs after a tick (counting, the graph, drawing the
+# frame) is charged to it. The jit and loop engines run the tick in one go
+# and count nothing; sinks report counters some ticks lack as missing rather
+# than as zero. A simulation without a profiler pays one attribute check per
+# step.
+
+# Counter names for what each phase method returns
+EVENTS = {
+    'graze': ('grass_eaten',),
+    'predation': ('sheep_eaten',),
+    'cull': ('sheep_died', 'wolves_starved'),
+    'reproduce': ('sheep_born', 'wolves_born'),
+}
+# Every counter a numpy-engine tick records
+COUNTERS = tuple(name for names in EVENTS.values() for name in names) + ('sheep_starved',)
+# Histogram bin edges in seconds: half-octaves from 1 us to about 30 s
+BINS = [1e-6 * 2 ** (i / 2) for i in range(50)]
+NULL_PHASE = contextlib.nullcontext()
+
+
+def null_phase(name):
+    # Stands in for Profiler.phase when profiling is off
+    return NULL_PHASE
+
+
+class Timer:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        times = self.profiler.times
+        times[self.name] = times.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+class Profiler:
+    # sinks get record(tick, times, counters) once per tick, times being
+    # seconds per phase, and close() at the end; sampler is an optional
+    # Sampler running for the profiler's lifetime
+    def __init__(self, *sinks, sampler=None):
+        self.sinks = list(sinks)
+        self.sampler = sampler
+        self.times = {}
+        self.counters = {}
+        self.timers = {}
+        self.tick = None  # tick of the open record
+        if sampler is not None:
+            sampler.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def phase(self, name):
+        # Context manager adding its time to name; timers are reused
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = Timer(self, name)
+        return timer
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def step(self, sim):
+        # Simulation.step, timed; first closes the previous tick's record.
+        # What was timed before the first tick goes into that tick's.
+        if self.tick is not None:
+            self.flush()
+        if sim.uses_kernel():
+            # The compiled and loop kernels run the tick in one go
+            with self.phase('kernel'):
+                run_tick(sim, sim.engine)
+        else:
+            for phase in sim.PHASES:
+                with self.phase(phase):
+                    events = getattr(sim, phase)()
+                if phase in EVENTS:
+                    if not isinstance(events, tuple):
+                        events = (events,)
+                    for name, value in zip(EVENTS[phase], events):
+                        self.count(name, value)
+            # Eaten sheep leave in cull() together with the starved ones
+            self.count('sheep_starved', self.counters['sheep_died'] - self.counters['sheep_eaten'])
+        sim.tick += 1
+        self.tick = sim.tick
+
+    def flush(self):
+        # Sends the open record, if anything was measured since the last one
+        if not self.times and not self.counters:
+            return
+        for sink in self.sinks:
+            sink.record(self.tick if self.tick is not None else 0, self.times, self.counters)
+        self.times = {}
+        self.counters = {}
+
+    def close(self):
+        self.flush()
+        if self.sampler is not None:
+            self.sampler.stop()
+        for sink in self.sinks:
+            sink.close()
+
+
+class HistogramSink:
+    # Keeps a histogram of the time per tick of every phase and the counter
+    # totals in memory; summary() gives mean and percentiles. Prints the
+    # summary to stream on close if one is given.
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.ticks = 0
+        self.histograms = {}
+        self.totals = {}
+        self.counters = {}
+        self.counted = {}  # ticks that reported each counter
+
+    def record(self, tick, times, counters):
+        self.ticks += 1
+        for name, seconds in times.items():
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = [0] * (len(BINS) + 1)
+                self.totals[name] = 0.0
+            histogram[bisect.bisect(BINS, seconds)] += 1
+            self.totals[name] += seconds
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+            self.counted[name] = self.counted.get(name, 0) + 1
+
+    def percentile(self, name, q):
+        # Upper edge of the bin holding the q-th percentile (0 to 100)
+        histogram = self.histograms[name]
+        rank = q / 100 * sum(histogram)
+        seen = 0
+        for i, n in enumerate(histogram):
+            seen += n
+            if n and seen >= rank:
+                return BINS[i] if i < len(BINS) else float('inf')
+        return 0.0
+
+    def summary(self):
+        # name: (ticks timed, mean, p50, p95, p99 seconds), largest total first
+        rows = {}
+        for name in sorted(self.totals, key=self.totals.get, reverse=True):
+            timed = sum(self.histograms[name])
+            rows[name] = (timed, self.totals[name] / timed,
+                          self.percentile(name, 50), self.percentile(name, 95), self.percentile(name, 99))
+        return rows
+
+    def report(self, stream):
+        total = sum(self.totals.values())
+        print(f"{self.ticks} ticks, {total:.3f} s timed", file=stream)
+        print(f"{'phase':>14} {'share':>6} {'mean ms':>9} {'p50 <':>9} {'p95 <':>9} {'p99 <':>9}", file=stream)
+        for name, (timed, mean, p50, p95, p99) in self.summary().items():
+            share = self.totals[name] / total if total else 0.0
+            print(f"{name:>14} {share:6.1%} {mean * 1e3:9.3f} {p50 * 1e3:9.3f} {p95 * 1e3:9.3f} {p99 * 1e3:9.3f}",
+                  file=stream)
+        for name in sorted(set(COUNTERS) | set(self.counters)):
+            print(f"{name:>14} {counter_text(self.counters.get(name), self.counted.get(name, 0), self.ticks)}",
+                  file=stream)
+
+    def close(self):
+        if self.stream is not None:
+            self.report(self.stream)
+
+
+class CsvSink:
+    # One tick,kind,name,value row per timer ('time', seconds) and counter
+    # ('count') of every tick; long rather than wide because phases such as
+    # drawing do not happen every tick
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(('tick', 'kind', 'name', 'value'))
+
+    def record(self, tick, times, counters):
+        self.writer.writerows((tick, 'time', name, f"{seconds:.9f}") for name, seconds in times.items())
+        self.writer.writerows((tick, 'count', name, value) for name, value in counters.items())
+
+    def close(self):
+        self.file.close()
+
+
+class ConsoleSink:
+    # Every `every` ticks prints the mean milliseconds per tick of each phase
+    # and the counter totals over those ticks
+    def __init__(self, every=100, stream=None):
+        self.every = every
+        self.stream = stream
+        self.ticks = 0
+        self.tick = None
+        self.times = {}
+        self.counters = {}
+        self.counted = {}
+
+    def record(self, tick, times, counters):
+        for name, seconds in times.items():
+            self.times[name] = self.times.get(name, 0.0) + seconds
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+            self.counted[name] = self.counted.get(name, 0) + 1
+        self.ticks += 1
+        self.tick = tick
+        if self.ticks == self.every:
+            self.print()
+
+    def print(self):
+        if not self.ticks:
+            return
+        phases = ' '.join(f"{name}={seconds / self.ticks * 1e3:.2f}ms" for name, seconds in self.times.items())
+        counters = ' '.join(f"{name}={counter_text(self.counters.get(name), self.counted.get(name, 0), self.ticks)}"
+                            for name in dict.fromkeys(COUNTERS + tuple(self.counters)))
+        print(f"tick {self.tick}: {phases} | {counters}", file=self.stream or sys.stdout)
+        self.ticks = 0
+        self.times = {}
+        self.counters = {}
+        self.counted = {}
+
+    def close(self):
+        # The last, partial window
+        self.print()
+
+
+class Sampler:
+    # Statistical profile of one thread (default: the creating one): a
+    # background thread looks at its stack every interval seconds, so the
+    # cost does not grow with the number of calls
+    def __init__(self, interval=0.005, thread_id=None, stream=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stream = stream
+        self.samples = 0
+        self.own = collections.Counter()  # samples with the function on top
+        self.total = collections.Counter()  # samples with the function anywhere on the stack
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+        if self.stream is not None:
+            self.report(self.stream)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.own[function_name(frame.f_code)] += 1
+            seen = set()
+            while frame is not None:
+                seen.add(function_name(frame.f_code))
+                frame = frame.f_back
+            self.total.update(seen)
+
+    def top(self, n=20):
+        # (function, own share, total share), most own samples first
+        samples = max(self.samples, 1)
+        return [(name, own / samples, self.total[name] / samples) for name, own in self.own.most_common(n)]
+
+    def report(self, stream, n=20):
+        print(f"{self.samples} samples every {self.interval * 1e3:g} ms", file=stream)
+        print(f"{'own':>6} {'total':>6}  function", file=stream)
+        for name, own, total in self.top(n):
+            print(f"{own:6.1%} {total:6.1%}  {name}", file=stream)
+
+
+def counter_text(total, counted, ticks):
+    # A counter total, marked when not every tick reported it
+    if not counted:
+        return 'missing'
+    if counted < ticks:
+        return f"{total} ({counted} of {ticks} ticks)"
+    return str(total)
+
+
+def function_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})"
+
+
+def open_profiler(spec, every=100, sampling=False):
+    # spec is None (no profiling), 'console', 'histogram' or a .csv path;
+    # summaries go to stdout
+    if spec is None:
+        return None
+    if spec == 'console':
+        sink = ConsoleSink(every)
+    elif spec == 'histogram':
+        sink = HistogramSink(sys.stdout)
+    elif spec.endswith('.csv'):
+        sink = CsvSink(spec)
+    else:
+        raise ValueError(f"Unknown profile sink {spec!r}")
+    return Profiler(sink, sampler=Sampler(stream=sys.stdout) if sampling else None)
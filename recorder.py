@@ -0,0 +1,187 @@
+import json
+import os
+
+import numpy as np
+
+from simulation import Simulation
+
+# Per-tick columns and their on-disk types
+COLUMNS = {
+    'tick': np.int64,
+    'sheep': np.int64,
+    'wolves': np.int64,
+    'grass': np.int64,
+    'sheep_energy_mean': np.float64,
+    'sheep_energy_var': np.float64,
+    'wolf_energy_mean': np.float64,
+    'wolf_energy_var': np.float64,
+}
+INDEX = 'index.json'
+
+
+def energy_stats(energy):
+    if len(energy) == 0:
+        return float('nan'), float('nan')
+    return float(energy.mean()), float(energy.var())
+
+
+def write_atomic(path, save):
+    # Readers never see half a file: write beside it, then rename over
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as file:
+        save(file)
+    os.replace(tmp, path)
+
+
+class Recorder:
+    # Appends per-tick population rows to a directory of fixed-size chunks.
+    # Compressed chunks are .npz files; uncompressed ones are one .npy file per
+    # column, which Recording can memory-map. index.json lists finished chunks,
+    # so a crash loses at most the rows still buffered. An existing recording
+    # is only added to with append=True.
+    def __init__(self, path, chunk_size=65536, compress=True, snapshot_every=None, append=False):
+        self.path = path
+        index_path = os.path.join(path, INDEX)
+        exists = os.path.exists(index_path)
+        if exists and not append:
+            raise FileExistsError(f"{path} already holds a recording; pass append=True to add to it")
+        os.makedirs(os.path.join(path, 'chunks'), exist_ok=True)
+        os.makedirs(os.path.join(path, 'snapshots'), exist_ok=True)
+        if exists:
+            with open(index_path) as file:
+                self.index = json.load(file)
+        else:
+            self.index = {'columns': list(COLUMNS), 'chunk_size': chunk_size, 'compress': compress,
+                          'chunks': [], 'snapshots': []}
+        self.chunk_size = self.index['chunk_size']
+        self.compress = self.index['compress']
+        self.snapshot_every = snapshot_every
+        self.buffer = {name: np.empty(self.chunk_size, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, sim):
+        sheep_mean, sheep_var = energy_stats(sim.sheep_energy)
+        wolf_mean, wolf_var = energy_stats(sim.wolf_energy)
+        sheep, wolves, grass = sim.counts()
+        self.append(tick=sim.tick, sheep=sheep, wolves=wolves, grass=grass,
+                    sheep_energy_mean=sheep_mean, sheep_energy_var=sheep_var,
+                    wolf_energy_mean=wolf_mean, wolf_energy_var=wolf_var)
+        if self.snapshot_every and sim.tick % self.snapshot_every == 0:
+            self.snapshot(sim)
+
+    def append(self, **row):
+        for name in COLUMNS:
+            self.buffer[name][self.rows] = row[name]
+        self.rows += 1
+        if self.rows == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows == 0:
+            return
+        number = len(self.index['chunks'])
+        data = {name: column[:self.rows] for name, column in self.buffer.items()}
+        if self.compress:
+            name = f'{number:08d}.npz'
+            write_atomic(os.path.join(self.path, 'chunks', name), lambda file: np.savez_compressed(file, **data))
+        else:
+            name = f'{number:08d}'
+            for column, values in data.items():
+                write_atomic(os.path.join(self.path, 'chunks', f'{name}.{column}.npy'), lambda file: np.save(file, values))
+        self.index['chunks'].append({'name': name, 'rows': self.rows})
+        self.rows = 0
+        self.save_index()
+
+    def snapshot(self, sim):
+        name = f'{sim.tick:012d}.npz'
+        state = {field: getattr(sim, field) for field in Simulation.STATE_ARRAYS}
+        write_atomic(os.path.join(self.path, 'snapshots', name), lambda file: np.savez_compressed(file, **state))
+        self.index['snapshots'].append({'tick': int(sim.tick), 'name': name})
+        self.save_index()
+
+    def save_index(self):
+        write_atomic(os.path.join(self.path, INDEX), lambda file: file.write(json.dumps(self.index).encode()))
+
+    def close(self):
+        self.flush()
+
+
+class Column:
+    # One column across all chunks; slicing only loads the chunks it touches
+    def __init__(self, recording, name):
+        self.recording = recording
+        self.name = name
+        self.starts = np.cumsum([0] + [chunk['rows'] for chunk in recording.index['chunks']])
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def chunks(self):
+        for number in range(len(self.starts) - 1):
+            yield self.recording.load_chunk(number, self.name)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += len(self)
+            number = int(np.searchsorted(self.starts, key, side='right')) - 1
+            return self.recording.load_chunk(number, self.name)[key - self.starts[number]]
+        start, stop, step = key.indices(len(self))
+        if start >= stop:
+            return np.empty(0, dtype=COLUMNS[self.name])
+        first = int(np.searchsorted(self.starts, start, side='right')) - 1
+        last = int(np.searchsorted(self.starts, stop - 1, side='right')) - 1
+        parts = [self.recording.load_chunk(number, self.name) for number in range(first, last + 1)]
+        values = np.concatenate(parts) if len(parts) > 1 else np.asarray(parts[0])
+        offset = self.starts[first]
+        return values[start - offset:stop - offset:step]
+
+
+class Recording:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, INDEX)) as file:
+            self.index = json.load(file)
+        self.columns = self.index['columns']
+
+    def __len__(self):
+        return sum(chunk['rows'] for chunk in self.index['chunks'])
+
+    def __getitem__(self, name):
+        if name not in self.columns:
+            raise KeyError(name)
+        return Column(self, name)
+
+    def load_chunk(self, number, column):
+        name = self.index['chunks'][number]['name']
+        if self.index['compress']:
+            with np.load(os.path.join(self.path, 'chunks', name)) as data:
+                return data[column]
+        return np.load(os.path.join(self.path, 'chunks', f'{name}.{column}.npy'), mmap_mode='r')
+
+    def snapshot_ticks(self):
+        return [entry['tick'] for entry in self.index['snapshots']]
+
+    def snapshot(self, tick):
+        for entry in self.index['snapshots']:
+            if entry['tick'] == tick:
+                with np.load(os.path.join(self.path, 'snapshots', entry['name'])) as data:
+                    return {field: data[field] for field in data.files}
+        raise KeyError(f"No snapshot at tick {tick}")
+
+    def to_memmap(self, column, path):
+        # Consolidates one column into a single .npy that np.load(mmap_mode='r') can map
+        values = self[column]
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=COLUMNS[column], shape=(len(values),))
+        start = 0
+        for chunk in values.chunks():
+            out[start:start + len(chunk)] = chunk
+            start += len(chunk)
+        out.flush()
+        return np.load(path, mmap_mode='r')
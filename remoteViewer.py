@@ -0,0 +1,114 @@
+import argparse
+import threading
+
+import wolfSheepGrass as ui
+from batch import load_params
+from simServer import FRAME, PORT, Connection
+from viewport import Viewport
+
+# Usage: python remoteViewer.py [--host 127.0.0.1] [--port 8765] [--set NAME=VALUE ...]
+# The pygame window of wolfSheepGrass.py, watching a simServer.py run
+# instead of stepping its own: START/STOP and RESET become commands to the
+# server, and --set changes the server's constants on connect. Any number
+# of viewers can watch the same run.
+#
+# wolfSheepGrass.main() is not a client of an in-process server: it keeps
+# its own loop because its recorder, frame log, autosave and profiler hook
+# into every tick, which the server's frames skip. So the event handling,
+# chart reset on a new run and draw_world call are repeated here; a change
+# to one loop's controls needs making in the other.
+FPS = 60
+
+
+class Receiver(threading.Thread):
+    # Reads the server's messages as they come and keeps the newest frame and status
+    def __init__(self, connection):
+        super().__init__(daemon=True)
+        self.connection = connection
+        self.frame = None
+        self.status = None
+        self.closed = False
+
+    def run(self):
+        try:
+            while True:
+                kind, message = self.connection.receive()
+                if kind == FRAME:
+                    self.frame = message
+                else:
+                    self.status = message
+        except (EOFError, OSError, ValueError):
+            self.closed = True
+
+
+def main(host='127.0.0.1', port=PORT, params=None):
+    ui.load_display()
+    from gridRenderer import GridRenderer
+    pygame = ui.pygame
+    pygame.init()
+    window = pygame.display.set_mode((ui.WIDTH, ui.HEIGHT))
+    pygame.display.set_caption(f"Sheep, Wolves, and Grass Simulation ({host}:{port})")
+    ui.renderer = GridRenderer(ui.CELL_SIZE, ui.GREEN, ui.BROWN)
+
+    connection = Connection(host, port)
+    if params:
+        connection.send('set', params=params)
+    receiver = Receiver(connection)
+    receiver.start()
+
+    clock = pygame.time.Clock()
+    status = frame = None
+    world = None
+    last_tick = None
+    redraw = False
+    simrunning = True
+    while simrunning and not receiver.closed:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                simrunning = False
+            elif ui.viewport is not None and ui.handle_view_event(event):
+                redraw = True
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and status is not None:
+                button = ui.button_at(event.pos)
+                if button == 'start':
+                    connection.send('stop' if status['running'] else 'start')
+                elif button == 'reset':
+                    connection.send('reset')
+
+        if receiver.status is not status:
+            status = receiver.status
+            ui.running = status['running']
+            config = status['config']
+            if (config['WIDTH'], config['GRID_SIZE']) != world:
+                # A new world size; start over with the whole world in view
+                world = (config['WIDTH'], config['GRID_SIZE'])
+                ui.viewport = Viewport(world[0], world[1], (0, 0, ui.WIDTH, ui.HEIGHT - ui.UI_HEIGHT))
+            redraw = True
+        if receiver.frame is not frame:
+            frame = receiver.frame
+            if last_tick is not None and frame.tick < last_tick:
+                ui.chart.reset()
+            if frame.tick != last_tick:
+                ui.update_graph(*frame.counts())
+            last_tick = frame.tick
+            redraw = True
+        if redraw and frame is not None and ui.viewport is not None:
+            ui.draw_world(window, frame)
+            pygame.display.flip()
+            redraw = False
+        clock.tick(FPS)
+
+    connection.close()
+    pygame.quit()
+    ui.chart.finish()
+    ui.plt.show()
+    ui.plt.ioff()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch and control a simServer.py run.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE', help="change a constant on the server")
+    args = parser.parse_args()
+    main(args.host, args.port, load_params(None, args.set))
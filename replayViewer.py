@@ -0,0 +1,130 @@
+import argparse
+
+import wolfSheepGrass as ui
+from frameLog import FrameLog
+from viewport import Viewport
+
+# Usage: python replayViewer.py run000.frames [--speed 100]
+# Plays back a frame log written with FRAME_LOG_DIR (see frameLog.py) in the
+# pygame window of wolfSheepGrass.py, without running the model. START/STOP
+# plays and pauses and RESET rewinds. Clicking or dragging the bar above the
+# buttons seeks; ',' and '.' step one frame, '[' and ']' halve and double
+# the speed. Fast speeds skip frames rather than slowing down.
+FPS = 60
+SPEED = 100  # recorded ticks per second, the pace of the live window
+MAX_SPEED = 1 << 20
+BAR = (20, ui.HEIGHT - ui.UI_HEIGHT + 15, ui.WIDTH - 40, 16)  # x, y, width, height
+BAR_COLOR = (120, 120, 120)
+TEXT_COLOR = (0, 0, 0)
+
+
+def bar_position(x, frames):
+    fraction = min(max((x - BAR[0]) / BAR[2], 0.0), 1.0)
+    return round(fraction * (frames - 1))
+
+
+def on_bar(pos):
+    return BAR[0] <= pos[0] <= BAR[0] + BAR[2] and BAR[1] <= pos[1] <= BAR[1] + BAR[3]
+
+
+def draw_bar(window, position, frames, tick, speed):
+    pygame = ui.pygame
+    pygame.draw.rect(window, BAR_COLOR, BAR)
+    done = BAR[2] * position // max(frames - 1, 1)
+    pygame.draw.rect(window, ui.BUTTON_COLOR, (BAR[0], BAR[1], done, BAR[3]))
+    font = pygame.font.SysFont(None, 24)
+    window.blit(font.render(f"Tick {tick}", True, TEXT_COLOR), (BAR[0], ui.START_BUTTON_POS[1] + 12))
+    window.blit(font.render(f"{speed} ticks/s", True, TEXT_COLOR), (ui.RESET_BUTTON_POS[0] + ui.BUTTON_WIDTH + 30,
+                                                                    ui.START_BUTTON_POS[1] + 12))
+
+
+def main(path, speed=SPEED):
+    log = FrameLog(path)
+    if len(log) == 0:
+        raise SystemExit(f"{path} has no frames")
+    counts = log.counts()
+    ui.load_display()
+    from gridRenderer import GridRenderer
+    pygame = ui.pygame
+    pygame.init()
+    window = pygame.display.set_mode((ui.WIDTH, ui.HEIGHT))
+    pygame.display.set_caption(f"Sheep, Wolves, and Grass Simulation ({path})")
+    ui.renderer = GridRenderer(ui.CELL_SIZE, ui.GREEN, ui.BROWN)
+    ui.viewport = Viewport(log.config['WIDTH'], log.config['GRID_SIZE'], (0, 0, ui.WIDTH, ui.HEIGHT - ui.UI_HEIGHT))
+    ui.running = False
+
+    clock = pygame.time.Clock()
+    position = 0.0  # fractional frame, so slow speeds still advance
+    charted = -1  # last frame the chart has
+    shown = None
+    scrubbing = False
+    simrunning = True
+    while simrunning:
+        target = None
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                simrunning = False
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and on_bar(event.pos):
+                scrubbing = True
+                target = bar_position(event.pos[0], len(log))
+            elif event.type == pygame.MOUSEMOTION and scrubbing:
+                target = bar_position(event.pos[0], len(log))
+            elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                scrubbing = False
+            elif ui.handle_view_event(event):
+                shown = None
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                button = ui.button_at(event.pos)
+                if button == 'start':
+                    ui.running = not ui.running
+                    if ui.running and int(position) == len(log) - 1:
+                        target = 0
+                elif button == 'reset':
+                    ui.running = False
+                    target = 0
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                ui.running = not ui.running
+            elif event.type == pygame.KEYDOWN and event.key in (pygame.K_COMMA, pygame.K_PERIOD):
+                ui.running = False
+                target = int(position) + (1 if event.key == pygame.K_PERIOD else -1)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_RIGHTBRACKET:
+                speed = min(speed * 2, MAX_SPEED)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_LEFTBRACKET:
+                speed = max(speed // 2, 1)
+
+        elapsed = clock.tick(FPS) / 1000
+        if target is not None:
+            position = float(min(max(target, 0), len(log) - 1))
+        elif ui.running and not scrubbing:
+            position = min(position + speed * elapsed, len(log) - 1)
+            if position == len(log) - 1:
+                ui.running = False
+        i = int(position)
+        if i < charted:
+            ui.chart.reset()
+            charted = -1
+        # Only the chart sees every frame passed over; the model is decoded
+        # from the nearest keyframe when that is closer
+        for row in counts[max(charted + 1, i + 1 - ui.chart.capacity):i + 1]:
+            ui.update_graph(*row)
+        charted = i
+        if (i, ui.running, speed) != shown:
+            frame = log.frame(i)
+            ui.draw_world(window, frame)
+            draw_bar(window, i, len(log), frame.tick, speed)
+            pygame.display.flip()
+            shown = (i, ui.running, speed)
+
+    log.close()
+    pygame.quit()
+    ui.chart.finish()
+    ui.plt.show()
+    ui.plt.ioff()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play back a recorded run.")
+    parser.add_argument('path', help="a .frames file written by frameLog.FrameRecorder")
+    parser.add_argument('--speed', type=int, default=SPEED, help="recorded ticks per second")
+    args = parser.parse_args()
+    main(args.path, args.speed)
@@ -0,0 +1,72 @@
+import time
+
+MAX_SKIPPED_FRAMES = 5  # draw at least this often even while behind
+
+
+class Scheduler:
+    # Decides how many simulation ticks run in each rendered frame:
+    #   ticks_per_frame  K ticks every frame (1 is the old lockstep loop)
+    #   frame_budget     as many ticks as fit in this many seconds per frame
+    #   tick_rate        fixed timestep, ticks per wall-clock second
+    #   render_every     turbo, only draw once every N ticks
+    def __init__(self, step, ticks_per_frame=1, frame_budget=None, tick_rate=None, render_every=1,
+                 max_ticks_per_frame=1000, clock=time.perf_counter):
+        self.step = step
+        self.ticks_per_frame = ticks_per_frame
+        self.frame_budget = frame_budget
+        self.tick_rate = tick_rate
+        self.render_every = max(render_every, 1)
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.clock = clock
+        self.ticks = 0
+        self.skipped_frames = 0
+        self.rendered_tick = 0
+        self.resume()
+
+    def resume(self):
+        # Forget time spent paused so the fixed timestep doesn't try to catch up
+        self.accumulator = 0.0
+        self.last_time = None
+
+    def frame(self):
+        # Runs this frame's ticks; returns True if the frame should be drawn
+        start = self.clock()
+        behind = False
+        if self.frame_budget is not None:
+            self.run_tick()
+            while self.clock() - start < self.frame_budget:
+                self.run_tick()
+        elif self.tick_rate is not None:
+            if self.last_time is not None:
+                self.accumulator += start - self.last_time
+            self.last_time = start
+            due = int(self.accumulator * self.tick_rate)
+            self.accumulator -= due / self.tick_rate
+            if due > self.max_ticks_per_frame:
+                # Too far behind to catch up; drop the backlog
+                behind = True
+                due = self.max_ticks_per_frame
+                self.accumulator = 0.0
+            for _ in range(due):
+                self.run_tick()
+            if self.clock() - start > 1.0 / self.tick_rate * max(due, 1):
+                behind = True
+        else:
+            for _ in range(self.ticks_per_frame):
+                self.run_tick()
+
+        return self.should_render(behind)
+
+    def run_tick(self):
+        self.step()
+        self.ticks += 1
+
+    def should_render(self, behind):
+        if self.ticks // self.render_every == self.rendered_tick // self.render_every:
+            return False
+        if behind and self.skipped_frames < MAX_SKIPPED_FRAMES:
+            self.skipped_frames += 1
+            return False
+        self.skipped_frames = 0
+        self.rendered_tick = self.ticks
+        return True
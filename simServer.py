@@ -0,0 +1,345 @@
+import argparse
+import json
+import socket
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+from grassField import GrassField
+from scheduler import Scheduler
+from simulation import SETUP_CONSTANTS, Config, Simulation
+
+# Usage: python simServer.py [--port 8765] [--start] [--tick-rate 30] [--set NAME=VALUE ...]
+# Runs a simulation headless and streams it to viewers (remoteViewer.py) on
+# localhost. The simulation steps in its own thread and never waits for a
+# viewer: each viewer is sent the newest frame whenever its socket has room,
+# so a slow one just skips frames.
+#
+# Every message is a 4-byte little-endian length, a type byte and a payload.
+# The server sends FRAME and STATUS (JSON: running, tick, seed, config);
+# viewers send COMMAND (JSON), one of
+#   {"cmd": "start"}   {"cmd": "stop"}   {"cmd": "reset", "seed": 3}
+#   {"cmd": "set", "params": {"GRASS_ENERGY_GAIN": 5}}
+# "set" applies live, except for constants that shape the world (see
+# RESET_PARAMS), which start a new run. A FRAME payload is FRAME_HEADER, the
+# zlib-compressed packed alive mask of GrassField, then x, y (float32) and
+# energy (int32) of the sheep and then of the wolves. The mask is XORed with
+# the one the viewer was sent last unless the keyframe flag is set.
+#
+# asyncio is imported where the server uses it, so that remoteViewer's
+# Connection does not pay for it.
+FRAME, STATUS, COMMAND = 1, 2, 3
+MESSAGE_HEADER = struct.Struct('<IB')
+# tick, sheep, wolves, grass count, grid cells along x and y, flags, compressed mask bytes
+FRAME_HEADER = struct.Struct('<qIIIIIBI')
+KEYFRAME = 1
+PORT = 8765
+FPS = 30  # frames published per second at most
+WRITE_BUFFER = 1 << 20  # bytes queued for a viewer before it counts as slow
+RESET_PARAMS = SETUP_CONSTANTS
+
+
+def pack_message(kind, payload):
+    return MESSAGE_HEADER.pack(len(payload) + 1, kind) + payload
+
+
+class Snapshot:
+    # What the simulation looked like at the end of a frame; shared by all
+    # viewers, so nothing in it is modified after publishing
+    def __init__(self, sim, index):
+        self.index = index
+        self.tick = sim.tick
+        self.counts = sim.counts()
+        self.bits = sim.grass.bits.copy()
+        self.shape = sim.grass.shape
+        self.animals = [(agents.x.astype(np.float32), agents.y.astype(np.float32), agents.energy.astype(np.int32))
+                        for agents in (sim.sheep, sim.wolves)]
+
+    def encode(self, base):
+        # FRAME message against the mask the viewer already has (None for a keyframe)
+        keyframe = base is None or base.shape != self.bits.shape
+        mask = self.bits if keyframe else np.bitwise_xor(self.bits, base)
+        grass = zlib.compress(mask.tobytes(), 1)
+        header = FRAME_HEADER.pack(self.tick, len(self.animals[0][0]), len(self.animals[1][0]), self.counts[2],
+                                   self.shape[0], self.shape[1], KEYFRAME if keyframe else 0, len(grass))
+        parts = [header, grass]
+        for columns in self.animals:
+            parts.extend(column.tobytes() for column in columns)
+        return pack_message(FRAME, b''.join(parts))
+
+
+class Frame:
+    # A decoded FRAME; looks enough like a Simulation (grass.region, sheep_x,
+    # ..., counts()) for wolfSheepGrass's drawing functions
+    region = GrassField.region
+
+    def __init__(self, payload, base):
+        tick, sheep, wolves, grass_count, gx, gy, flags, grass_bytes = FRAME_HEADER.unpack_from(payload)
+        self.tick = tick
+        self.grass_count = grass_count
+        self.shape = (gx, gy)
+        offset = FRAME_HEADER.size
+        mask = np.frombuffer(zlib.decompress(payload[offset:offset + grass_bytes]), dtype=np.uint8)
+        mask = mask.reshape(gx, -(-gy // 8))
+        self.bits = mask if flags & KEYFRAME else np.bitwise_xor(mask, base)
+        offset += grass_bytes
+        columns = []
+        for n, dtypes in ((sheep, (np.float32, np.float32, np.int32)), (wolves, (np.float32, np.float32, np.int32))):
+            for dtype in dtypes:
+                columns.append(np.frombuffer(payload, dtype=dtype, count=n, offset=offset))
+                offset += n * np.dtype(dtype).itemsize
+        self.sheep_x, self.sheep_y, self.sheep_energy, self.wolf_x, self.wolf_y, self.wolf_energy = columns
+
+    @property
+    def grass(self):
+        return self
+
+    def counts(self):
+        return len(self.sheep_x), len(self.wolf_x), self.grass_count
+
+
+class Viewer:
+    def __init__(self, writer):
+        import asyncio
+        self.writer = writer
+        self.wake = asyncio.Event()
+        self.base = None  # mask of the last frame sent
+        self.sent = -1  # index of the last snapshot sent
+        self.dropped = 0
+
+
+class SimServer:
+    # Owns the simulation; commands are applied between frames by run(), so
+    # the stepping thread never sees the simulation change under it
+    def __init__(self, config=None, seed=None, tick_rate=None, fps=FPS, running=False):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        self.config = config if config is not None else Config()
+        self.seed = seed
+        self.sim = Simulation(self.config, seed=seed)
+        self.tick_rate = tick_rate
+        self.interval = 1 / fps
+        self.running = running
+        self.scheduler = self.make_scheduler()
+        self.executor = ThreadPoolExecutor(1)
+        self.commands = []
+        self.changed = asyncio.Event()
+        self.viewers = set()
+        self.frames = 0
+        self.snapshot = Snapshot(self.sim, self.frames)
+
+    def make_scheduler(self):
+        # A fixed tick_rate, or as many ticks as fit in each frame
+        if self.tick_rate:
+            return Scheduler(self.sim.step, tick_rate=self.tick_rate)
+        return Scheduler(self.sim.step, frame_budget=self.interval)
+
+    def status(self):
+        return {'running': self.running, 'tick': self.sim.tick, 'seed': self.seed, 'config': self.config.as_dict()}
+
+    def advance(self):
+        # Runs in the executor: one frame's worth of ticks, then a snapshot
+        self.scheduler.frame()
+        return Snapshot(self.sim, self.frames + 1)
+
+    def publish(self, snapshot):
+        self.snapshot = snapshot
+        self.frames = snapshot.index
+        for viewer in self.viewers:
+            viewer.wake.set()
+
+    def broadcast_status(self):
+        message = pack_message(STATUS, json.dumps(self.status()).encode())
+        for viewer in self.viewers:
+            viewer.writer.write(message)
+
+    def apply(self, command):
+        # Anything that can fail is built before it replaces the current run
+        if not isinstance(command, dict):
+            raise TypeError("A command must be a JSON object")
+        cmd = command.get('cmd')
+        if cmd == 'start':
+            self.running = True
+            self.scheduler.resume()
+        elif cmd == 'stop':
+            self.running = False
+        elif cmd == 'reset':
+            seed = command.get('seed', self.seed)
+            if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int) or seed < 0):
+                raise ValueError(f"seed must be a non-negative integer, got {seed!r}")
+            self.restart(self.config, seed)
+        elif cmd == 'set':
+            params = command.get('params', {})
+            if not isinstance(params, dict):
+                raise TypeError("params must be a JSON object")
+            config = self.config.replace(**params)
+            if set(params) & set(RESET_PARAMS):
+                self.restart(config, self.seed)
+            else:
+                self.config = self.sim.config = config
+        else:
+            raise ValueError(f"Unknown command {cmd!r}")
+
+    def restart(self, config, seed):
+        sim = Simulation(config, seed=seed)
+        self.config, self.seed, self.sim = config, seed, sim
+        self.running = False
+        self.scheduler = self.make_scheduler()
+
+    def apply_commands(self):
+        commands, self.commands = self.commands, []
+        for command in commands:
+            try:
+                self.apply(command)
+            except Exception as error:
+                print(f"Ignoring {command!r}: {error!r}", file=sys.stderr)
+        self.broadcast_status()
+        self.publish(Snapshot(self.sim, self.frames + 1))
+
+    async def run(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.commands:
+                self.apply_commands()
+            if not self.running:
+                await self.changed.wait()
+                self.changed.clear()
+                continue
+            start = loop.time()
+            try:
+                self.publish(await loop.run_in_executor(self.executor, self.advance))
+            except Exception as error:
+                # Keep serving; the viewers see the run stopped where it failed
+                print(f"Stopped at tick {self.sim.tick}: {error!r}", file=sys.stderr)
+                self.running = False
+                self.broadcast_status()
+                continue
+            if self.tick_rate:
+                # The scheduler only runs the ticks that are due, so pace the frames
+                await asyncio.sleep(max(0.0, self.interval - (loop.time() - start)))
+
+    async def serve_viewer(self, reader, writer):
+        import asyncio
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER)
+        viewer = Viewer(writer)
+        self.viewers.add(viewer)
+        writer.write(pack_message(STATUS, json.dumps(self.status()).encode()))
+        viewer.wake.set()
+        sender = asyncio.create_task(self.send_frames(viewer))
+        try:
+            while True:
+                kind, payload = await read_message(reader)
+                if kind == COMMAND:
+                    self.commands.append(json.loads(payload))
+                    self.changed.set()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # Gone, or not speaking the protocol (bad length, JSON or UTF-8)
+            pass
+        finally:
+            self.viewers.discard(viewer)
+            sender.cancel()
+            writer.close()
+
+    async def send_frames(self, viewer):
+        # Always the newest snapshot; whatever was published while the
+        # previous one drained is skipped
+        import asyncio
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                await viewer.wake.wait()
+                viewer.wake.clear()
+                snapshot = self.snapshot
+                if snapshot.index == viewer.sent:
+                    continue
+                if viewer.sent >= 0:
+                    viewer.dropped += snapshot.index - viewer.sent - 1
+                message = await loop.run_in_executor(None, snapshot.encode, viewer.base)
+                viewer.writer.write(message)
+                viewer.base = snapshot.bits
+                viewer.sent = snapshot.index
+                await viewer.writer.drain()
+        except ConnectionError:
+            pass
+
+    async def serve(self, host='127.0.0.1', port=PORT):
+        import asyncio
+        server = await asyncio.start_server(self.serve_viewer, host, port)
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run())
+
+
+async def read_message(reader):
+    length, kind = MESSAGE_HEADER.unpack(await reader.readexactly(MESSAGE_HEADER.size))
+    if length == 0:
+        raise ValueError("Message without a type byte")
+    return kind, await reader.readexactly(length - 1)
+
+
+class Connection:
+    # Blocking viewer side of the protocol; frames are decoded in order,
+    # since each one's mask is relative to the one before
+    def __init__(self, host='127.0.0.1', port=PORT):
+        self.sock = socket.create_connection((host, port))
+        self.file = self.sock.makefile('rb')
+        self.bits = None
+
+    def send(self, cmd, **fields):
+        self.sock.sendall(pack_message(COMMAND, json.dumps({'cmd': cmd, **fields}).encode()))
+
+    def receive(self):
+        # (FRAME, Frame) or (STATUS, dict); EOFError once the server is gone
+        header = self.file.read(MESSAGE_HEADER.size)
+        if len(header) < MESSAGE_HEADER.size:
+            raise EOFError("Server closed the connection")
+        length, kind = MESSAGE_HEADER.unpack(header)
+        if length == 0:
+            raise ValueError("Message without a type byte")
+        payload = self.file.read(length - 1)
+        if kind == FRAME:
+            frame = Frame(payload, self.bits)
+            self.bits = frame.bits
+            return kind, frame
+        return kind, json.loads(payload)
+
+    def close(self):
+        # shutdown() first wakes a thread blocked in receive(); the file is
+        # left to it, as closing it would wait on the read in progress
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def main(argv=None):
+    import asyncio
+
+    from batch import load_params
+    parser = argparse.ArgumentParser(description="Run the simulation headless and stream it to remote viewers.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--config', help="JSON object of model constants")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE', help="override one constant")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--tick-rate', type=float, help="ticks per second, default as fast as possible")
+    parser.add_argument('--fps', type=float, default=FPS, help="frames published per second at most")
+    parser.add_argument('--start', action='store_true', help="run without waiting for a viewer's start")
+    args = parser.parse_args(argv)
+    try:
+        config = Config(**load_params(args.config, args.set))
+    except (OSError, ValueError, TypeError) as error:
+        parser.error(str(error))
+    server = SimServer(config, args.seed, args.tick_rate, args.fps, args.start)
+    print(f"Serving on {args.host}:{args.port}", file=sys.stderr)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+import math
+import numpy as np
+
+from agentStore import AgentStore
+from grassField import GrassField
+from nearest import nearest_grass, nearest_sheep, step_towards
+from tickKernel import run_tick, select_engine
+
+# Model constants, same defaults as wolfSheepGrass.py
+DEFAULTS = {
+    'WIDTH': 800,
+    'GRID_SIZE': 50,
+    'GRASS_ENERGY_GAIN': 4,
+    'SHEEP_ENERGY_GAIN': 20,
+    'SHEEP_ENERGY_MIN': 0,
+    'SHEEP_ENERGY_MAX': None,  # GRASS_ENERGY_GAIN * 2
+    'WOLF_ENERGY_MIN': 0,
+    'WOLF_ENERGY_MAX': None,  # SHEEP_ENERGY_GAIN * 2
+    'ENERGY_LOSS_PER_TICK': 1,
+    'SHEEP_REPRODUCTION_CHANCE': 0.04,
+    'WOLF_REPRODUCTION_CHANCE': 0.05,
+    'DEAD_TO_LIVE': 30,
+    'MOVEMENT_MULTIPLIER': 1,
+    'INITIAL_WOLVES': 50,
+    'INITIAL_SHEEP': 100,
+    'SEEK_TARGETS': False,  # Sheep.move / Wolf.move instead of move_freely
+}
+# Constants that end up in the int64 energy columns, grid indices or counts
+INTEGER_CONSTANTS = ('WIDTH', 'GRID_SIZE', 'GRASS_ENERGY_GAIN', 'SHEEP_ENERGY_GAIN', 'SHEEP_ENERGY_MIN',
+                     'SHEEP_ENERGY_MAX', 'WOLF_ENERGY_MIN', 'WOLF_ENERGY_MAX', 'ENERGY_LOSS_PER_TICK',
+                     'DEAD_TO_LIVE', 'INITIAL_WOLVES', 'INITIAL_SHEEP')
+# Constants that only take effect when a run is set up: they size the grid,
+# place the first animals or are held by GrassField
+SETUP_CONSTANTS = ('WIDTH', 'GRID_SIZE', 'INITIAL_SHEEP', 'INITIAL_WOLVES', 'DEAD_TO_LIVE')
+
+
+def coerce(name, value):
+    # Plain Python values of the right kind, so that e.g. 4.0 or np.int64(4)
+    # from a sweep works and 4.5 fails here rather than in the first tick
+    if name == 'SEEK_TARGETS':
+        return bool(value)
+    if isinstance(value, (bool, np.bool_)) or not isinstance(value, (int, float, np.integer, np.floating)):
+        raise TypeError(f"{name} must be a number, got {value!r}")
+    if name not in INTEGER_CONSTANTS:
+        return float(value)
+    if not float(value).is_integer():
+        raise ValueError(f"{name} must be a whole number, got {value!r}")
+    return int(value)
+
+
+class Config:
+    def __init__(self, **params):
+        unknown = set(params) - set(DEFAULTS)
+        if unknown:
+            raise TypeError(f"Unknown model constants: {', '.join(sorted(unknown))}")
+        values = dict(DEFAULTS)
+        values.update(params)
+        for name, value in values.items():
+            if value is not None:
+                values[name] = coerce(name, value)
+        if values['GRID_SIZE'] < 1:
+            raise ValueError(f"GRID_SIZE must be at least 1, got {values['GRID_SIZE']}")
+        if values['WIDTH'] < values['GRID_SIZE']:
+            # CELL_SIZE would be 0, which nothing can move or draw on
+            raise ValueError(f"WIDTH ({values['WIDTH']}) must be at least GRID_SIZE ({values['GRID_SIZE']})")
+        if values['SHEEP_ENERGY_MAX'] is None:
+            values['SHEEP_ENERGY_MAX'] = values['GRASS_ENERGY_GAIN'] * 2
+        if values['WOLF_ENERGY_MAX'] is None:
+            values['WOLF_ENERGY_MAX'] = values['SHEEP_ENERGY_GAIN'] * 2
+        self.__dict__.update(values)
+
+    @classmethod
+    def from_module(cls, module, **params):
+        # Picks up the model constants of e.g. wolfSheepGrass or testGraphy
+        values = {name: getattr(module, name) for name in DEFAULTS if hasattr(module, name)}
+        values.update(params)
+        return cls(**values)
+
+    def replace(self, **params):
+        values = self.as_dict()
+        values.update(params)
+        return Config(**values)
+
+    @property
+    def CELL_SIZE(self):
+        return self.WIDTH // self.GRID_SIZE
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in DEFAULTS}
+
+    def __repr__(self):
+        args = ', '.join(f"{k}={v!r}" for k, v in self.as_dict().items())
+        return f"Config({args})"
+
+    def __eq__(self, other):
+        return isinstance(other, Config) and self.as_dict() == other.as_dict()
+
+
+class Simulation:
+    # Arrays that together with tick, rng and config make up the whole state
+    STATE_ARRAYS = ('grass_bits', 'grass_ticks', 'sheep_x', 'sheep_y', 'sheep_energy', 'wolf_x', 'wolf_y', 'wolf_energy')
+    # The numpy engine's tick, one method each, in the order step() runs them
+    PHASES = ('regrow', 'move_sheep', 'graze', 'move_wolves', 'predation', 'cull', 'reproduce')
+    # Optional profiler.Profiler that times every step; None costs nothing
+    profiler = None
+
+    def __init__(self, config=None, seed=None, engine='numpy'):
+        self.config = config if config is not None else Config()
+        self.rng = np.random.default_rng(seed)
+        self.set_engine(engine)
+        self.setup()
+
+    @classmethod
+    def from_state(cls, config, rng, tick, arrays, engine='numpy'):
+        # Rebuilds a run from STATE_ARRAYS, e.g. out of a checkpoint. The grass
+        # arrays are used as they are; an unpacked 'alive' mask may stand in
+        # for 'grass_bits'.
+        sim = cls.__new__(cls)
+        sim.config = config
+        sim.rng = rng
+        sim.tick = tick
+        sim.set_engine(engine)
+        if 'grass_bits' in arrays:
+            sim.grass = GrassField.packed(arrays['grass_bits'], arrays['grass_ticks'], config.DEAD_TO_LIVE)
+        else:
+            sim.grass = GrassField(arrays['alive'], arrays['grass_ticks'], config.DEAD_TO_LIVE)
+        sim.sheep = AgentStore.from_arrays(arrays['sheep_x'], arrays['sheep_y'], arrays['sheep_energy'])
+        sim.wolves = AgentStore.from_arrays(arrays['wolf_x'], arrays['wolf_y'], arrays['wolf_energy'])
+        return sim
+
+    def setup(self):
+        c = self.config
+        rng = self.rng
+
+        self.grass = GrassField.random(c.GRID_SIZE, c.DEAD_TO_LIVE, rng)
+
+        self.sheep = AgentStore.from_arrays(
+            rng.uniform(0, c.WIDTH, c.INITIAL_SHEEP),
+            rng.uniform(0, c.WIDTH, c.INITIAL_SHEEP),
+            rng.integers(c.SHEEP_ENERGY_MIN, c.SHEEP_ENERGY_MAX + 1, c.INITIAL_SHEEP))
+
+        self.wolves = AgentStore.from_arrays(
+            rng.uniform(0, c.WIDTH, c.INITIAL_WOLVES),
+            rng.uniform(0, c.WIDTH, c.INITIAL_WOLVES),
+            rng.integers(c.WOLF_ENERGY_MIN, c.WOLF_ENERGY_MAX + 1, c.INITIAL_WOLVES))
+
+        self.tick = 0
+
+    @property
+    def alive(self):
+        return self.grass.alive
+
+    @property
+    def grass_bits(self):
+        return self.grass.bits
+
+    @property
+    def grass_ticks(self):
+        return self.grass.ticks
+
+    # Live animals; views into the stores, valid until the next step()
+    @property
+    def sheep_x(self):
+        return self.sheep.x
+
+    @property
+    def sheep_y(self):
+        return self.sheep.y
+
+    @property
+    def sheep_energy(self):
+        return self.sheep.energy
+
+    @property
+    def wolf_x(self):
+        return self.wolves.x
+
+    @property
+    def wolf_y(self):
+        return self.wolves.y
+
+    @property
+    def wolf_energy(self):
+        return self.wolves.energy
+
+    def set_engine(self, engine):
+        # See tickKernel.ENGINES; can be switched between ticks
+        self.engine = select_engine(engine)
+
+    def counts(self):
+        return len(self.sheep), len(self.wolves), self.grass_count()
+
+    def grass_count(self):
+        # Same scale as count_grass() in wolfSheepGrass.py
+        return self.grass.grass_count()
+
+    def cells(self, x, y):
+        c = self.config
+        gx = (x // c.CELL_SIZE).astype(np.intp) % c.GRID_SIZE
+        gy = (y // c.CELL_SIZE).astype(np.intp) % c.GRID_SIZE
+        return gx * c.GRID_SIZE + gy
+
+    def uses_kernel(self):
+        # The kernel only knows move_freely
+        return self.engine != 'numpy' and not self.config.SEEK_TARGETS
+
+    def step(self):
+        if self.profiler is not None:
+            # Times the same work phase by phase, see profiler.py
+            self.profiler.step(self)
+            return
+        if self.uses_kernel():
+            run_tick(self, self.engine)
+        else:
+            for phase in self.PHASES:
+                getattr(self, phase)()
+        self.tick += 1
+
+    def regrow(self):
+        self.grass.update()
+
+    def move_sheep(self):
+        c = self.config
+        if c.SEEK_TARGETS:
+            self.sheep.x[:], self.sheep.y[:] = self.seek_grass()
+        else:
+            self.move_freely(self.sheep)
+        self.sheep.energy[:] -= c.ENERGY_LOSS_PER_TICK
+
+    def move_wolves(self):
+        c = self.config
+        if c.SEEK_TARGETS:
+            self.wolves.x[:], self.wolves.y[:] = self.seek_sheep()
+        else:
+            self.move_freely(self.wolves)
+        self.wolves.energy[:] -= c.ENERGY_LOSS_PER_TICK
+
+    def cull(self):
+        # Remove eaten animals and animals with no energy; returns how many
+        # sheep and wolves went
+        sheep, wolves = len(self.sheep), len(self.wolves)
+        self.sheep.compact(self.sheep.energy >= 0)
+        self.wolves.compact(self.wolves.energy >= 0)
+        return sheep - len(self.sheep), wolves - len(self.wolves)
+
+    def reproduce(self):
+        # Returns the sheep and wolves born
+        c = self.config
+        return (self.sheep.reproduce(c.SHEEP_REPRODUCTION_CHANCE, c.WIDTH, c.WIDTH, self.rng),
+                self.wolves.reproduce(c.WOLF_REPRODUCTION_CHANCE, c.WIDTH, c.WIDTH, self.rng))
+
+    def run(self, n_ticks):
+        counts = np.empty((n_ticks, 3), dtype=np.int64)
+        for i in range(n_ticks):
+            self.step()
+            counts[i] = self.counts()
+        return counts
+
+    def move_freely(self, agents):
+        c = self.config
+        angle = self.rng.uniform(0, 2 * math.pi, len(agents))
+        agents.x[:] = (agents.x + np.cos(angle) * c.CELL_SIZE) % c.WIDTH
+        agents.y[:] = (agents.y + np.sin(angle) * c.CELL_SIZE) % c.WIDTH
+
+    # All sheep look at the grass as it stood at the start of the move, rather
+    # than seeing cells eaten by sheep earlier in the list
+    def seek_grass(self):
+        c = self.config
+        x, y = self.sheep_x, self.sheep_y
+        target, dx, dy = nearest_grass(x, y, self.alive, c.CELL_SIZE, c.WIDTH)
+        # Sheep.move aims at (x + dx, y + dy), so take the offset from there
+        return step_towards(x, y, (x + dx) - x, (y + dy) - y, target >= 0,
+                            c.CELL_SIZE, c.MOVEMENT_MULTIPLIER, c.WIDTH)
+
+    def seek_sheep(self):
+        c = self.config
+        target, dx, dy = nearest_sheep(self.wolf_x, self.wolf_y, self.sheep_x, self.sheep_y, c.WIDTH)
+        return step_towards(self.wolf_x, self.wolf_y, dx, dy, target >= 0,
+                            c.CELL_SIZE, c.MOVEMENT_MULTIPLIER, c.WIDTH)
+
+    def graze(self):
+        # Returns the number of cells eaten
+        ate = self.grass.graze(self.cells(self.sheep_x, self.sheep_y))
+        self.sheep_energy[ate] += self.config.GRASS_ENERGY_GAIN
+        return int(np.count_nonzero(ate))
+
+    def predation(self):
+        # Returns the number of sheep eaten
+        if len(self.wolf_x) == 0 or len(self.sheep_x) == 0:
+            return 0
+        sheep_cells = self.cells(self.sheep_x, self.sheep_y)
+        wolf_cells = self.cells(self.wolf_x, self.wolf_y)
+
+        # Wolves take turns in list order, each picking a random remaining sheep in
+        # its cell. That is the same as shuffling the sheep of every cell and handing
+        # the k-th sheep to the k-th wolf of that cell. Sorting by (cell, random key)
+        # lays out spatialHash.CellIndex's buckets, already shuffled, as runs of one
+        # array, so this needs no Python loop over the wolves; CellIndex itself
+        # serves the object loop in testGraphy.py.
+        sheep_order = np.lexsort((self.rng.random(len(sheep_cells)), sheep_cells))
+        sorted_cells = sheep_cells[sheep_order]
+        first_sheep = np.searchsorted(sorted_cells, wolf_cells, side='left')
+        n_sheep = np.searchsorted(sorted_cells, wolf_cells, side='right') - first_sheep
+
+        wolf_order = np.argsort(wolf_cells, kind='stable')
+        sorted_wolves = wolf_cells[wolf_order]
+        rank = np.empty(len(wolf_cells), dtype=np.intp)
+        rank[wolf_order] = np.arange(len(wolf_cells)) - np.searchsorted(sorted_wolves, sorted_wolves, side='left')
+
+        hunters = rank < n_sheep
+        if not hunters.any():
+            return 0
+        eaten = sheep_order[first_sheep[hunters] + rank[hunters]]
+        self.wolf_energy[hunters] += self.config.SHEEP_ENERGY_GAIN
+        # Eaten sheep go out with the starved ones in step()
+        self.sheep_energy[eaten] = -1
+        return len(eaten)
@@ -0,0 +1,28 @@
+import random
+
+
+class CellIndex:
+    # Buckets animals by grid cell, rebuilt once per tick
+    def __init__(self, animals, cell_size):
+        self.cell_size = cell_size
+        self.buckets = {}
+        for animal in animals:
+            self.buckets.setdefault(self.key(animal.x, animal.y), []).append(animal)
+
+    def key(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    def in_cell(self, x, y):
+        return self.buckets.get(self.key(x, y), [])
+
+    def pop_random(self, x, y, rng=random):
+        bucket = self.buckets.get(self.key(x, y))
+        if not bucket:
+            return None
+        # Swap the chosen animal to the end so removal is O(1)
+        i = rng.randrange(len(bucket))
+        bucket[i], bucket[-1] = bucket[-1], bucket[i]
+        return bucket.pop()
@@ -0,0 +1,154 @@
+import itertools
+import json
+import os
+import zlib
+
+import numpy as np
+
+import lv
+from simulation import INTEGER_CONSTANTS, Config, Simulation
+
+ABM_SPECIES = ('sheep', 'wolves', 'grass')
+ODE_SPECIES = ('grass', 'sheep', 'wolves')  # x, y, z in lv.system
+ODE_INITIAL = ('x0', 'y0', 'z0')
+
+
+def cartesian(space):
+    # {'GRASS_ENERGY_GAIN': [2, 4], 'DEAD_TO_LIVE': [20, 30]} -> list of points
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def latin_hypercube(bounds, n, seed=0):
+    # {'a': (0.01, 0.1), ...} -> n points, one per stratum along every axis.
+    # Whole-number model constants are rounded, so strata may share a value.
+    rng = np.random.default_rng(seed)
+    points = [{} for _ in range(n)]
+    for name, (low, high) in bounds.items():
+        strata = (rng.permutation(n) + rng.random(n)) / n
+        for point, u in zip(points, strata):
+            value = float(low + u * (high - low))
+            point[name] = round(value) if name in INTEGER_CONSTANTS else value
+    return points
+
+
+def point_key(model, point):
+    # numpy scalars, e.g. from np.linspace grids, key like the plain numbers
+    return json.dumps([model, point], sort_keys=True, default=plain)
+
+
+def plain(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{value!r} is not JSON serializable")
+
+
+def extinction_time(series, times, threshold):
+    below = np.flatnonzero(series < threshold)
+    return float(times[below[0]]) if len(below) else None
+
+
+def oscillation_period(series, times):
+    # Mean spacing of upward crossings through the mean of the second half,
+    # which skips the initial transient
+    half = len(series) // 2
+    tail, tail_times = series[half:], times[half:]
+    centered = tail - tail.mean()
+    up = np.flatnonzero((centered[:-1] < 0) & (centered[1:] >= 0))
+    if len(up) < 2:
+        return None
+    return float(np.diff(tail_times[up]).mean())
+
+
+def summarize(series, times, species, threshold):
+    metrics = {}
+    for column, name in enumerate(species):
+        values = series[:, column].astype(float)
+        metrics[f'extinction_time_{name}'] = extinction_time(values, times, threshold)
+        metrics[f'mean_{name}'] = float(values.mean())
+        metrics[f'period_{name}'] = oscillation_period(values, times)
+    return metrics
+
+
+def evaluate_abm(point, n_ticks, base_seed):
+    params = dict(point)
+    seed = params.pop('seed', None)
+    if seed is None:
+        # Depends only on the point, so a resumed sweep redraws the same runs
+        seed = [base_seed, zlib.crc32(point_key('abm', point).encode())]
+    sim = Simulation(Config(**params), seed=seed)
+    series = np.empty((n_ticks + 1, 3), dtype=np.int64)
+    series[0] = sim.counts()
+    series[1:] = sim.run(n_ticks)
+    return summarize(series, np.arange(n_ticks + 1), ABM_SPECIES, threshold=1)
+
+
+def evaluate_ode(point, t_end, n_points, threshold):
+    params = dict(point)
+    conditions = [params.pop(name, default) for name, default in zip(ODE_INITIAL, lv.initial_conditions)]
+    times = np.linspace(0, t_end, n_points)
+    series = lv.solve(times, conditions, lv.parameters(**params))
+    return summarize(series, times, ODE_SPECIES, threshold)
+
+
+def evaluate(model, point, settings):
+    if model == 'abm':
+        return evaluate_abm(point, settings.get('n_ticks', 1000), settings.get('base_seed', 0))
+    if model == 'ode':
+        return evaluate_ode(point, settings.get('t_end', lv.t0), settings.get('n_points', 5000),
+                            settings.get('threshold', 1.0))
+    raise ValueError(f"Unknown model {model!r}, expected 'abm' or 'ode'")
+
+
+def load_results(path):
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted write; that point reruns
+                continue
+            results[record['key']] = record
+    return results
+
+
+def run_sweep(model, points, path, workers=None, **settings):
+    # Evaluates every point not yet recorded in path (JSON lines), appending
+    # each result as soon as it finishes. Rerun with the same arguments to resume.
+    done = load_results(path)
+    pending = [point for point in points if point_key(model, point) not in done]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    with open(path, 'a+') as file:
+        file.seek(0, os.SEEK_END)
+        if file.tell() > 0:
+            file.seek(file.tell() - 1)
+            if file.read(1) != '\n':
+                # Don't glue the next record onto a cut-off line
+                file.write('\n')
+
+        def record(point, metrics):
+            key = point_key(model, point)
+            done[key] = {'key': key, 'model': model, 'params': point, 'metrics': metrics}
+            file.write(json.dumps(done[key], default=plain) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+        if workers <= 1:
+            for point in pending:
+                record(point, evaluate(model, point, settings))
+        else:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(evaluate, model, point, settings): point for point in pending}
+                for future in as_completed(futures):
+                    record(futures[future], future.result())
+
+    return [done[point_key(model, point)] for point in points]
@@ -1,17 +1,9 @@
-import pygame
 import random
 import math
-import matplotlib.pyplot as plt
-
-# Initialize matplotlib plot
-plt.ion()  # Turn on interactive mode
-figure, ax = plt.subplots()
-sheep_counts = []
-wolf_counts = []
-grass_counts = []
-ax.set_title('Population over Time')
-ax.set_xlabel('Ticks')
-ax.set_ylabel('Population')
+import numpy as np
+from spatialHash import CellIndex
+from grassField import GrassField
+from agentStore import AgentStore, AgentView
 
 WIDTH, HEIGHT = 800, 800  
 GRID_SIZE = 50
@@ -25,6 +17,7 @@ DEAD_TO_LIVE = 30
 MOVEMENT_MULTIPLIER = 1
 INITIAL_WOLVES = 50
 INITIAL_SHEEP = 100
+SEED = None  # seeds the NumPy generator for grass and births
 
 # Constants for energy levels
 GRASS_ENERGY_GAIN = 4
@@ -35,17 +28,14 @@ WOLF_ENERGY_MIN = 0
 WOLF_ENERGY_MAX = SHEEP_ENERGY_GAIN * 2
 ENERGY_LOSS_PER_TICK = 1
 
+renderer = None
+# Loaded by load_display() when main() starts; the model imports without them
+pygame = None
+plt = None
+chart = None
+
 def update_graph(sheep_count, wolf_count, grass_count):
-    grass_counts.append(grass_count)
-    sheep_counts.append(sheep_count)
-    wolf_counts.append(wolf_count)
-    ax.clear()
-    ax.plot(sheep_counts, label='Sheep')
-    ax.plot(wolf_counts, label='Wolves')
-    ax.plot(grass_counts, label ='Grass')
-    ax.legend()
-    plt.draw()
-    plt.pause(0.001)  # Pause to ensure the plot updates
+    chart.update(sheep_count, wolf_count, grass_count)
 
 
 def draw_status_box(window, sheep_count, wolf_count, grass_count):
@@ -69,27 +59,13 @@ def draw_status_box(window, sheep_count, wolf_count, grass_count):
     window.blit(wolf_text, (box_x + 5, box_y + 30))
     window.blit(grass_text, (box_x + 5, box_y + 55))
 
-def reproduce_sheep(sheep_list):
-    newborn_sheep = []
-    for parent in sheep_list:
-        if random.random() < SHEEP_REPRODUCTION_CHANCE:
-            # Set the child's energy to half of the parent's
-            child_energy = parent.energy // 2
-            newborn_sheep.append(Sheep(random.uniform(0, WIDTH), random.uniform(0, HEIGHT), child_energy))
-            # Halve the parent's energy
-            parent.energy = child_energy
-    return newborn_sheep
-
-def reproduce_wolves(wolf_list):
-    newborn_wolves = []
-    for parent in wolf_list:
-        if random.random() < WOLF_REPRODUCTION_CHANCE:
-            # Set the child's energy to half of the parent's
-            child_energy = parent.energy // 2
-            newborn_wolves.append(Wolf(random.uniform(0, WIDTH), random.uniform(0, HEIGHT), child_energy))
-            # Halve the parent's energy
-            parent.energy = child_energy
-    return newborn_wolves
+# Births for the whole store at once: a parent and its child each get half
+# the parent's energy, and the children are appended to the store
+def reproduce_sheep(sheep, rng):
+    return sheep.reproduce(SHEEP_REPRODUCTION_CHANCE, WIDTH, HEIGHT, rng)
+
+def reproduce_wolves(wolves, rng):
+    return wolves.reproduce(WOLF_REPRODUCTION_CHANCE, WIDTH, HEIGHT, rng)
 
 def count_grass(grid):
     count = 0
@@ -212,36 +188,53 @@ class Wolf(Animal):
             self.x = self.x % WIDTH
             self.y = self.y % HEIGHT
 
-def draw_grid(window, grid):
-    for i in range(GRID_SIZE):
-        for j in range(GRID_SIZE):
-            rect = pygame.Rect(i * CELL_SIZE, j * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-            color = GREEN if grid[i][j].is_alive else BROWN
-            pygame.draw.rect(window, color, rect)
+def draw_grid(window, alive):
+    renderer.draw_grass(window, alive)
 
-def draw_animals(window, animals):
-    font = pygame.font.SysFont(None, 15)  # You can choose another font and size
+# Sheep and Wolf methods acting on a row of an AgentStore
+class SheepView(AgentView, Sheep):
+    pass
 
-    for animal in animals:
-        color = WHITE if isinstance(animal, Sheep) else (0, 0, 0)  # Wolves are black
-        pygame.draw.circle(window, color, (int(animal.x), int(animal.y)), CELL_SIZE // 4)
+class WolfView(AgentView, Wolf):
+    pass
 
-        # Render the energy level and display it next to the animal
-        energy_text = font.render(str(animal.energy), True, (255, 255, 255))
-        window.blit(energy_text, (animal.x + CELL_SIZE // 2, animal.y - CELL_SIZE // 2))
+def draw_animals(window, sheep, wolves):
+    # Energy levels are displayed next to the animals
+    renderer.draw_animals(window, sheep.x, sheep.y, WHITE, sheep.energy)
+    renderer.draw_animals(window, wolves.x, wolves.y, (0, 0, 0), wolves.energy)  # Wolves are black
+
+        
+def load_display():
+    global pygame
+    global plt
+    global chart
+    import pygame
+    import matplotlib.pyplot as plt
+    from liveChart import LiveChart
+    # Initialize matplotlib plot
+    plt.ion()  # Turn on interactive mode
+    chart = LiveChart(['Sheep', 'Wolves', 'Grass'], annotate=False)
 
         
 def main():
+    global renderer
+    load_display()
+    from gridRenderer import GridRenderer
     pygame.init()
     window = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Sheep, Wolves, and Grass Simulation")   
+    renderer = GridRenderer(CELL_SIZE, GREEN, BROWN)
 
-    # Initialize grid
-    grid = [[Cell(random.choice([True, False])) for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
+    rng = np.random.default_rng(SEED)
+
+    # Initialize grass
+    grass = GrassField.random(GRID_SIZE, DEAD_TO_LIVE, rng)
 
     # Initialize animals
-    sheep = [Sheep(random.uniform(0, WIDTH), random.uniform(0, HEIGHT)) for _ in range(INITIAL_SHEEP)]
-    wolves = [Wolf(random.uniform(0, WIDTH), random.uniform(0, HEIGHT)) for _ in range(INITIAL_WOLVES)]
+    sheep = AgentStore(INITIAL_SHEEP, view=SheepView)
+    sheep.extend(Sheep(random.uniform(0, WIDTH), random.uniform(0, HEIGHT)) for _ in range(INITIAL_SHEEP))
+    wolves = AgentStore(INITIAL_WOLVES, view=WolfView)
+    wolves.extend(Wolf(random.uniform(0, WIDTH), random.uniform(0, HEIGHT)) for _ in range(INITIAL_WOLVES))
 
     clock = pygame.time.Clock()
 
@@ -251,56 +244,55 @@ def main():
             if event.type == pygame.QUIT:
                 running = False
 
-        # Update grid for grass growth
-        for row in grid:
-            for cell in row:
-                cell.update()
+        # Update grass growth
+        grass.update()
 
         # Move animals
         for s in sheep:
             s.move_freely()
             s.lose_energy()
-            grid_x, grid_y = int(s.x // CELL_SIZE), int(s.y // CELL_SIZE)
-            if grid[grid_x][grid_y].is_alive:
-                grid[grid_x][grid_y].is_alive = False
-                grid[grid_x][grid_y].tick_count = 0
-                s.eat_grass()
+
+        # Sheep graze in list order, the first one on a live cell eats it
+        cells = (sheep.x // CELL_SIZE).astype(np.intp) * GRID_SIZE + (sheep.y // CELL_SIZE).astype(np.intp)
+        for i in np.flatnonzero(grass.graze(cells)):
+            sheep[i].eat_grass()
 
         for w in wolves:
             w.move_freely()
             w.lose_energy()
 
-    # Check for sheep-wolf collisions
+        # Check for sheep-wolf collisions
+        sheep_by_cell = CellIndex(sheep, CELL_SIZE)
+        eaten = np.zeros(len(sheep), dtype=bool)
         for w in wolves:
-            # Find all sheep in the same cell as this wolf
-            sheep_in_same_cell = [s for s in sheep if int(s.x // CELL_SIZE) == int(w.x // CELL_SIZE) and int(s.y // CELL_SIZE) == int(w.y // CELL_SIZE)]
-
-            if sheep_in_same_cell:
-                chosen_sheep = random.choice(sheep_in_same_cell)  # Randomly select one sheep
+            # Randomly select one sheep in the same cell as this wolf
+            chosen_sheep = sheep_by_cell.pop_random(w.x, w.y)
+            if chosen_sheep is not None:
                 w.eat_sheep()  # The wolf eats the sheep
-                sheep.remove(chosen_sheep)  # Remove the eaten sheep from the list
+                eaten[chosen_sheep.index] = True
+
+        # Remove eaten sheep and animals with no energy
+        sheep.compact((sheep.energy >= 0) & ~eaten)
+        wolves.compact(wolves.energy >= 0)
 
-        # Remove animals with no energy
-        sheep = [s for s in sheep if s.energy >= 0]
-        wolves = [w for w in wolves if w.energy >= 0]
-            
-        sheep += reproduce_sheep(sheep)
-        wolves += reproduce_wolves(wolves)
+        reproduce_sheep(sheep, rng)
+        reproduce_wolves(wolves, rng)
 
-        grass_count = count_grass(grid)
+        grass_count = grass.grass_count()
 
         update_graph(len(sheep), len(wolves), grass_count)
 
         # Update the screen
         window.fill((0, 0, 0))
-        draw_grid(window, grid)
-        draw_animals(window, sheep + wolves)
+        draw_grid(window, grass.alive)
+        draw_animals(window, sheep, wolves)
         #draw_status_box(window, len(sheep), len(wolves),grass_count)
 
         pygame.display.flip()
         clock.tick(150)
 
     pygame.quit()
+    chart.finish()
     plt.ioff()  # Turn off interactive mode
     plt.show()  # Show the final plot before exiting
 
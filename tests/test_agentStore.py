@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from agentStore import MIN_CAPACITY, AgentStore, AgentView
+
+
+def numbered(n):
+    # Energy doubles as an id, so order can be checked after a compact
+    return AgentStore.from_arrays(np.arange(n) * 1.5, np.arange(n) * 2.5, np.arange(n))
+
+
+def test_compact_keeps_survivors_in_list_order():
+    store = numbered(10)
+    keep = np.array([True, False, False, True, True, False, True, False, False, True])
+    store.compact(keep)
+    assert len(store) == 5
+    np.testing.assert_array_equal(store.energy, [0, 3, 4, 6, 9])
+    np.testing.assert_array_equal(store.x, np.array([0, 3, 4, 6, 9]) * 1.5)
+    np.testing.assert_array_equal(store.y, np.array([0, 3, 4, 6, 9]) * 2.5)
+
+
+def test_compact_to_nothing_then_add_again():
+    store = numbered(4)
+    capacity = store.capacity
+    store.compact(np.zeros(4, dtype=bool))
+    assert len(store) == 0 and list(store) == []
+    store.add([7.0], [8.0], [9])
+    assert (store[0].x, store[0].y, store[0].energy) == (7.0, 8.0, 9)
+    assert store.capacity == capacity
+
+
+def test_reserve_doubles_and_keeps_the_live_rows():
+    store = numbered(MIN_CAPACITY)
+    assert store.capacity == MIN_CAPACITY
+    store.add([0.5], [0.5], [MIN_CAPACITY])
+    assert store.capacity == 2 * MIN_CAPACITY
+    np.testing.assert_array_equal(store.energy, np.arange(MIN_CAPACITY + 1))
+    # A batch bigger than doubling would give grows the buffers to fit it exactly
+    store.add(np.zeros(5 * MIN_CAPACITY), np.zeros(5 * MIN_CAPACITY), np.zeros(5 * MIN_CAPACITY))
+    assert store.capacity == 6 * MIN_CAPACITY + 1
+    np.testing.assert_array_equal(store.energy[:MIN_CAPACITY + 1], np.arange(MIN_CAPACITY + 1))
+    assert store.nbytes() == 24 * store.capacity
+
+
+class Grazer:
+    def eat_grass(self):
+        self.energy += 4
+
+
+class GrazerView(AgentView, Grazer):
+    pass
+
+
+def test_views_read_and_write_their_row():
+    store = AgentStore.from_arrays([1.0, 2.0], [3.0, 4.0], [5, 6], view=GrazerView)
+    store[-1].eat_grass()
+    store[0].x = 9.5
+    np.testing.assert_array_equal(store.energy, [5, 10])
+    np.testing.assert_array_equal(store.x, [9.5, 2.0])
+    assert [animal.energy for animal in store] == [5, 10]
+    with pytest.raises(IndexError):
+        store[2]
+
+
+@pytest.mark.parametrize('chance, births', [(0.0, 0), (1.0, 6)])
+def test_reproduce_at_chance_0_and_1(chance, births):
+    store = numbered(6)
+    assert store.reproduce(chance, 100, 50, np.random.default_rng(0)) == births
+    assert len(store) == 6 + births
+    np.testing.assert_array_equal(store.energy[:6], np.arange(6) // 2 if births else np.arange(6))
+
+
+def test_births_halve_the_parent_and_are_appended_in_parent_order():
+    store = AgentStore.from_arrays(np.zeros(200), np.zeros(200), np.arange(200) + 7)
+    births = store.reproduce(0.3, 100, 50, np.random.default_rng(1))
+    parents = np.random.default_rng(1).random(200) < 0.3
+    assert births == np.count_nonzero(parents) > 0
+    # Odd energies round down for both, as parent.energy // 2 does
+    expected = np.where(parents, (np.arange(200) + 7) // 2, np.arange(200) + 7)
+    np.testing.assert_array_equal(store.energy[:200], expected)
+    np.testing.assert_array_equal(store.energy[200:], expected[parents])
+    assert ((0 <= store.x[200:]) & (store.x[200:] < 100)).all()
+    assert ((0 <= store.y[200:]) & (store.y[200:] < 50)).all()
+
+
+def test_reproduce_is_repeatable_for_a_seed():
+    first, second = numbered(100), numbered(100)
+    first.reproduce(0.5, 10, 10, np.random.default_rng(2))
+    second.reproduce(0.5, 10, 10, np.random.default_rng(2))
+    for name in ('x', 'y', 'energy'):
+        np.testing.assert_array_equal(getattr(first, name), getattr(second, name))
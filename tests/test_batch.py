@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+
+import numpy as np
+import pytest
+
+import batch
+from ensemble import run_ensemble
+from simulation import Config
+
+CONFIG = Config(WIDTH=200, GRID_SIZE=20, INITIAL_SHEEP=60, INITIAL_WOLVES=15)
+
+
+def test_abm_rows_match_the_ensemble_counts():
+    rows = list(batch.abm_rows(CONFIG, 4, 30, run=2, stop_on_extinction=False))
+    expected = run_ensemble(CONFIG, [4], 30, workers=1)[0]
+    assert [row['tick'] for row in rows] == list(range(31))
+    assert {row['run'] for row in rows} == {2}
+    np.testing.assert_array_equal([[row['sheep'], row['wolves'], row['grass']] for row in rows], expected)
+
+
+def test_abm_rows_stop_at_the_first_extinct_row():
+    config = CONFIG.replace(INITIAL_WOLVES=0)
+    assert [row['tick'] for row in batch.abm_rows(config, 0, 10)] == [0]
+    assert len(list(batch.abm_rows(config, 0, 10, stop_on_extinction=False))) == 11
+
+
+def test_ode_rows_stop_where_a_species_reaches_the_threshold():
+    rows = list(batch.ode_rows(batch.lv.parameters(), batch.lv.initial_conditions, 50, 1.0))
+    assert rows[0]['t'] == 0
+    assert min(rows[-1]['grass'], rows[-1]['sheep'], rows[-1]['wolves']) == pytest.approx(1.0)
+    assert all(min(row['grass'], row['sheep'], row['wolves']) > 1.0 for row in rows[:-1])
+
+
+def test_replicates_in_workers_give_each_run_the_same_rows():
+    seeds = [1, 2, 3]
+    serial = list(batch.replicate_rows(CONFIG, seeds, 20, workers=1))
+    parallel = list(batch.replicate_rows(CONFIG, seeds, 20, workers=2))
+    for run in range(len(seeds)):
+        assert [row for row in parallel if row['run'] == run] == [row for row in serial if row['run'] == run]
+
+
+@pytest.mark.parametrize('writer', [batch.write_csv, batch.write_jsonl])
+def test_writers_take_rows_one_at_a_time(writer):
+    consumed = []
+
+    def rows():
+        for tick in range(3):
+            consumed.append(tick)
+            yield {'tick': tick, 'sheep': 10 - tick}
+
+    file = io.StringIO()
+    writer(rows(), file)
+    assert consumed == [0, 1, 2]
+    lines = file.getvalue().splitlines()
+    if writer is batch.write_csv:
+        assert list(csv.DictReader(lines)) == [{'tick': str(t), 'sheep': str(10 - t)} for t in range(3)]
+    else:
+        assert [json.loads(line) for line in lines] == [{'tick': t, 'sheep': 10 - t} for t in range(3)]
+
+
+def test_main_streams_a_config_file_with_overrides(tmp_path):
+    config = tmp_path / 'params.json'
+    config.write_text(json.dumps({'WIDTH': 200, 'GRID_SIZE': 20, 'INITIAL_SHEEP': 60}))
+    output = tmp_path / 'runs.jsonl'
+    assert batch.main(['abm', '--config', str(config), '--set', 'INITIAL_WOLVES=15', '--seed', '4',
+                       '--ticks', '30', '--run-to-end', '--output', str(output)]) == 0
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert rows == list(batch.abm_rows(CONFIG, 4, 30, stop_on_extinction=False))
+
+
+def test_main_writes_ode_rows_as_csv_to_stdout(capsys):
+    batch.main(['ode', '--t-end', '3', '--dt', '1', '--run-to-end'])
+    rows = list(csv.DictReader(capsys.readouterr().out.splitlines()))
+    assert [float(row['t']) for row in rows] == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize('argv', [['abm', '--set', 'GRID_SIZE'], ['abm', '--set', 'NO_SUCH_CONSTANT=1'],
+                                  ['abm', '--config', 'missing.json']])
+def test_main_reports_bad_parameters_as_usage_errors(argv):
+    with pytest.raises(SystemExit) as error:
+        batch.main(argv)
+    assert error.value.code == 2
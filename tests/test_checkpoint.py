@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from checkpoint import fork, load_checkpoint, save_checkpoint
+from simulation import Config, Simulation
+
+
+@pytest.fixture
+def saved(tmp_path):
+    sim = Simulation(Config(WIDTH=200, GRID_SIZE=20, INITIAL_SHEEP=40, INITIAL_WOLVES=10), seed=3)
+    for _ in range(20):
+        sim.step()
+    path = tmp_path / 'run.ckpt'
+    save_checkpoint(sim, str(path))
+    return sim, str(path)
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+@pytest.mark.parametrize('engine', ['numpy', 'loop'])
+def test_a_loaded_checkpoint_carries_on_bit_for_bit(tmp_path, mmap, engine):
+    sim = Simulation(Config(WIDTH=200, GRID_SIZE=21, INITIAL_SHEEP=40, INITIAL_WOLVES=10), seed=3, engine=engine)
+    sim.run(15)
+    path = str(tmp_path / 'run.ckpt')
+    save_checkpoint(sim, path)
+    loaded = load_checkpoint(path, mmap=mmap)
+    assert (loaded.tick, loaded.engine, loaded.config) == (sim.tick, sim.engine, sim.config)
+    for copy in (sim, loaded):
+        copy.run(25)
+    for name in Simulation.STATE_ARRAYS:
+        original, restored = getattr(sim, name), getattr(loaded, name)
+        assert original.dtype == restored.dtype
+        np.testing.assert_array_equal(restored, original, err_msg=name)
+    assert loaded.rng.bit_generator.state == sim.rng.bit_generator.state
+
+
+def test_fork_changes_constants_read_every_tick(saved):
+    sim, path = saved
+    forked = fork(path, 2, seed=1, GRASS_ENERGY_GAIN=7)
+    assert [copy.config for copy in forked] == [sim.config.replace(GRASS_ENERGY_GAIN=7)] * 2
+
+
+@pytest.mark.parametrize('name', ['DEAD_TO_LIVE', 'GRID_SIZE', 'INITIAL_SHEEP'])
+def test_fork_refuses_constants_built_into_the_state(saved, name):
+    _, path = saved
+    with pytest.raises(ValueError, match=name):
+        fork(path, 1, **{name: 5})
@@ -0,0 +1,13 @@
+import pytest
+
+from simulation import Config
+
+
+@pytest.mark.parametrize('params', [{'GRID_SIZE': 10000}, {'WIDTH': 49, 'GRID_SIZE': 50}, {'GRID_SIZE': 0}])
+def test_config_rejects_cells_narrower_than_a_pixel(params):
+    with pytest.raises(ValueError):
+        Config(**params)
+
+
+def test_config_accepts_one_pixel_cells():
+    assert Config(WIDTH=50, GRID_SIZE=50).CELL_SIZE == 1
@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+import pytest
+
+import wolfSheepGrass as legacy
+from benchmarks.engines import welch_t
+from simulation import Config, Simulation
+from tickKernel import COMPILED
+
+REPLICATES = 8
+TICKS = 200
+WARMUP = 50  # ticks left out of each replicate's mean
+MAX_T = 4.0
+
+
+def legacy_counts(seed, ticks):
+    # The original main loop over wolfSheepGrass's Cell, Sheep and Wolf
+    random.seed(seed)
+    size, width, cell = legacy.GRID_SIZE, legacy.WORLD_WIDTH, legacy.CELL_SIZE
+    grid = [[legacy.Cell(random.choice([True, False])) for _ in range(size)] for _ in range(size)]
+    sheep = [legacy.Sheep(random.uniform(0, width), random.uniform(0, width)) for _ in range(legacy.INITIAL_SHEEP)]
+    wolves = [legacy.Wolf(random.uniform(0, width), random.uniform(0, width)) for _ in range(legacy.INITIAL_WOLVES)]
+    counts = np.empty((ticks, 3))
+    for tick in range(ticks):
+        for row in grid:
+            for grass in row:
+                grass.update()
+        for s in sheep:
+            s.move_freely()
+            s.lose_energy()
+            grass = grid[int(s.x // cell)][int(s.y // cell)]
+            if grass.is_alive:
+                grass.is_alive = False
+                grass.tick_count = 0
+                s.eat_grass()
+        for w in wolves:
+            w.move_freely()
+            w.lose_energy()
+        for w in wolves:
+            same_cell = [s for s in sheep if int(s.x // cell) == int(w.x // cell) and int(s.y // cell) == int(w.y // cell)]
+            if same_cell:
+                w.eat_sheep()
+                sheep.remove(random.choice(same_cell))
+        sheep = [s for s in sheep if s.energy >= 0]
+        wolves = [w for w in wolves if w.energy >= 0]
+        sheep += legacy.reproduce_sheep(sheep)
+        wolves += legacy.reproduce_wolves(wolves)
+        counts[tick] = len(sheep), len(wolves), legacy.count_grass(grid)
+    return counts
+
+
+@pytest.fixture(scope='module')
+def legacy_means():
+    return np.array([legacy_counts(1000 + seed, TICKS)[WARMUP:].mean(axis=0) for seed in range(REPLICATES)])
+
+
+@pytest.mark.parametrize('engine', ['numpy', 'loop', pytest.param(
+    'jit', marks=pytest.mark.skipif(not COMPILED, reason="numba is not installed"))])
+def test_engine_matches_the_legacy_model_statistically(legacy_means, engine):
+    # Mean sheep, wolves and grass after the warm-up, compared over replicates
+    config = Config.from_module(legacy, WIDTH=legacy.WORLD_WIDTH)
+    means = np.array([Simulation(config, seed=seed, engine=engine).run(TICKS)[WARMUP:].mean(axis=0)
+                      for seed in range(REPLICATES)])
+    t = welch_t(means, legacy_means)
+    assert np.abs(t).max() < MAX_T, f"{engine} differs from the legacy model: t = {t}"
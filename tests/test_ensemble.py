@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from ensemble import run_ensemble
+from simulation import Config
+
+
+@pytest.mark.parametrize('seeds', [0, []])
+def test_run_ensemble_needs_a_replicate(seeds):
+    with pytest.raises(ValueError, match='at least one replicate'):
+        run_ensemble(seeds=seeds, n_ticks=2)
+
+
+def test_run_ensemble_is_the_same_for_any_number_of_workers():
+    config = Config(WIDTH=200, GRID_SIZE=20, INITIAL_SHEEP=30, INITIAL_WOLVES=10)
+    serial = run_ensemble(config, seeds=4, n_ticks=30, workers=1, base_seed=5)
+    assert serial.shape == (4, 31, 3)
+    np.testing.assert_array_equal(run_ensemble(config, seeds=4, n_ticks=30, workers=3, base_seed=5), serial)
+    # Replicates differ from each other, and explicit seeds are honoured
+    assert not (serial[0] == serial[1]).all()
+    np.testing.assert_array_equal(run_ensemble(config, seeds=[7, 8], n_ticks=30, workers=2),
+                                  run_ensemble(config, seeds=[7, 8], n_ticks=30, workers=1))
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from frameLog import TRAILER, FrameLog, FrameRecorder, to_fixed
+from simulation import Config, Simulation
+
+TICKS = 23
+KEYFRAME_EVERY = 5
+
+
+def snapshot(sim):
+    # The live state as a frame stores it
+    width = sim.config.WIDTH
+    return sim.tick, sim.grass.bits.copy(), [(to_fixed(agents.x, width), to_fixed(agents.y, width),
+                                              agents.energy.astype(np.int32)) for agents in (sim.sheep, sim.wolves)]
+
+
+def assert_frame(frame, expected):
+    tick, bits, animals = expected
+    assert frame.tick == tick
+    np.testing.assert_array_equal(frame.bits, bits)
+    for stored, live in zip(frame.animals, animals):
+        for column, expected_column in zip(stored, live):
+            np.testing.assert_array_equal(column, expected_column)
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    sim = Simulation(Config(WIDTH=400, GRID_SIZE=40, INITIAL_SHEEP=120, INITIAL_WOLVES=30), seed=7)
+    path = str(tmp_path / 'run000.frames')
+    states = []
+    with FrameRecorder(path, keyframe_every=KEYFRAME_EVERY) as recorder:
+        recorder.record(sim)
+        states.append(snapshot(sim))
+        for _ in range(TICKS):
+            sim.step()
+            recorder.record(sim)
+            states.append(snapshot(sim))
+    return path, states
+
+
+def test_frame_log_round_trip(recorded):
+    path, states = recorded
+    log = FrameLog(path)
+    assert len(log) == len(states)
+    assert list(log.keyframes) == list(range(0, len(states), KEYFRAME_EVERY))
+    # Forward through keyframes and deltas, then seeking back across keyframes
+    for i in list(range(len(states))) + [len(states) - 1, 12, 3, 10, 9, 0, 22]:
+        assert_frame(log.frame(i), states[i])
+    log.close()
+
+
+@pytest.mark.parametrize('cut', [False, True])
+def test_frame_log_without_trailer(recorded, cut):
+    # A crashed run leaves no index, and maybe half of its last record
+    path, states = recorded
+    with open(path, 'rb') as file:
+        data = file.read()
+    end, _ = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+    last = FrameLog(path).index['offset'][-1]
+    with open(path, 'wb') as file:
+        file.write(data[:(last + end) // 2 if cut else end])
+    log = FrameLog(path)
+    assert len(log) == len(states) - cut
+    for i in (len(log) - 1, 4, 16):
+        assert_frame(log.frame(i), states[i])
+    log.close()
+
+
+def test_frame_recorder_never_overwrites(recorded):
+    path, _ = recorded
+    sim = Simulation(Config(WIDTH=400, GRID_SIZE=40, INITIAL_SHEEP=10, INITIAL_WOLVES=5), seed=1)
+    with pytest.raises(FileExistsError):
+        FrameRecorder(path).record(sim)
+
+
+def test_a_new_session_numbers_its_runs_after_the_old_ones(tmp_path, monkeypatch):
+    import wolfSheepGrass
+    monkeypatch.setattr(wolfSheepGrass, 'FRAME_LOG_DIR', str(tmp_path))
+    monkeypatch.setattr(wolfSheepGrass, 'RECORD_DIR', str(tmp_path / 'missing'))
+    assert wolfSheepGrass.next_run() == 0
+    (tmp_path / 'run000.frames').touch()
+    (tmp_path / 'run002.frames').touch()
+    assert wolfSheepGrass.next_run() == 3
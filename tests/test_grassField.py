@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+import grassField
+from grassField import GrassField
+
+DEAD_TO_LIVE = 5
+
+
+def naive_field(rows, columns, seed):
+    rng = np.random.default_rng(seed)
+    alive = rng.random((rows, columns)) < 0.5
+    ticks = np.where(alive, 0, rng.integers(0, DEAD_TO_LIVE, size=alive.shape))
+    return alive, ticks
+
+
+def naive_update(alive, ticks):
+    # Cell.update for every cell
+    ticks = ticks + ~alive
+    regrown = ticks >= DEAD_TO_LIVE
+    ticks[regrown] = 0
+    return alive | regrown, ticks
+
+
+def naive_graze(alive, ticks, cells):
+    # The sequential loop: the first sheep on a live cell eats it
+    alive, ticks = alive.copy(), ticks.copy()
+    ate = np.zeros(len(cells), dtype=bool)
+    for sheep, cell in enumerate(cells):
+        x, y = divmod(int(cell), alive.shape[1])
+        if alive[x, y]:
+            alive[x, y] = False
+            ticks[x, y] = 0
+            ate[sheep] = True
+    return alive, ticks, ate
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # A few rows per chunk, so update() and packed() cross chunk edges
+    monkeypatch.setattr(grassField, 'CHUNK_CELLS', 40)
+
+
+@pytest.mark.parametrize('columns', [1, 7, 8, 13, 21])
+def test_packing_round_trips_widths_that_are_not_a_multiple_of_8(columns):
+    alive, ticks = naive_field(11, columns, seed=columns)
+    field = GrassField(alive, ticks, DEAD_TO_LIVE)
+    assert field.bits.shape == (11, -(-columns // 8))
+    assert field.alive.shape == (11, columns)
+    np.testing.assert_array_equal(field.alive, alive)
+    assert field.count == np.count_nonzero(alive)
+    assert GrassField.packed(field.bits, field.ticks, DEAD_TO_LIVE).count == field.count
+
+
+@pytest.mark.parametrize('x0, x1, y0, y1, step', [(0, 11, 0, 21, 1), (3, 9, 5, 19, 1), (2, 3, 9, 10, 1),
+                                                  (0, 11, 3, 20, 2), (1, 10, 0, 21, 3)])
+def test_region_matches_slicing_the_unpacked_mask(x0, x1, y0, y1, step):
+    alive, ticks = naive_field(11, 21, seed=1)
+    field = GrassField(alive, ticks, DEAD_TO_LIVE)
+    np.testing.assert_array_equal(field.region(x0, x1, y0, y1, step), alive[x0:x1:step, y0:y1:step])
+
+
+def test_update_and_graze_match_the_cell_by_cell_rules():
+    alive, ticks = naive_field(13, 19, seed=2)
+    field = GrassField(alive, ticks, DEAD_TO_LIVE)
+    rng = np.random.default_rng(3)
+    for _ in range(12):
+        alive, ticks = naive_update(alive, ticks)
+        field.update()
+        # Many more sheep than cells, so most live cells have several takers
+        cells = rng.integers(0, alive.size, size=300)
+        alive, ticks, ate = naive_graze(alive, ticks, cells)
+        np.testing.assert_array_equal(field.graze(cells), ate)
+
+        np.testing.assert_array_equal(field.alive, alive)
+        np.testing.assert_array_equal(field.ticks, ticks)
+        assert field.count == np.count_nonzero(alive)
+        assert field.grass_count() == np.count_nonzero(alive) // 4
+
+
+def test_random_starts_live_cells_at_zero_and_dead_ones_below_dead_to_live():
+    field = GrassField.random(30, DEAD_TO_LIVE, np.random.default_rng(4))
+    alive = field.alive
+    assert field.count == np.count_nonzero(alive)
+    assert not field.ticks[alive].any()
+    assert field.ticks.max() < DEAD_TO_LIVE
+    assert 0.3 < alive.mean() < 0.7
+
+
+def test_timers_widen_past_255_ticks():
+    assert GrassField(np.zeros((2, 2)), np.zeros((2, 2)), 255).ticks.dtype == np.uint8
+    assert GrassField(np.zeros((2, 2)), np.zeros((2, 2)), 256).ticks.dtype == np.uint16
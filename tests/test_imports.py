@@ -0,0 +1,10 @@
+import pytest
+
+from benchmarks.imports import BUDGET, MODULES, measure
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_import_stays_within_budget(module):
+    numpy_time, own, heavy = measure(module, repeats=3)
+    assert not heavy, f"{module} loads {heavy}"
+    assert own <= BUDGET * numpy_time, f"{module} takes {own * 1e3:.1f} ms on top of numpy's {numpy_time * 1e3:.1f} ms"
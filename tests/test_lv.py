@@ -0,0 +1,87 @@
+import warnings
+
+import numpy as np
+import pytest
+from scipy.integrate import odeint
+
+import lv
+
+
+def draw(n, spread, seed=0):
+    # n parameter sets within +-spread of the defaults
+    rng = np.random.default_rng(seed)
+    return np.array(lv.parameters()) * rng.uniform(1 - spread, 1 + spread, (n, 7))
+
+
+def loop(t, params, **options):
+    with warnings.catch_warnings():
+        # Some sets are too stiff for odeint's default step limit
+        warnings.simplefilter('ignore')
+        return np.stack([odeint(lv.system, lv.initial_conditions, t, args=tuple(p), **options) for p in params])
+
+
+def test_solve_batch_is_as_accurate_per_set_as_the_loop():
+    t = np.linspace(0, 100, 1001)
+    params = draw(64, 0.1)
+    reference = loop(t, params, rtol=1e-12, atol=1e-12, mxstep=100000)
+    scale = np.abs(reference).max(axis=(1, 2))
+    batch_error = np.abs(lv.solve_batch(t, params) - reference).max(axis=(1, 2)) / scale
+    loop_error = np.abs(loop(t, params) - reference).max(axis=(1, 2)) / scale
+    assert (batch_error <= loop_error).all()
+
+
+def test_solve_batch_keeps_the_sets_beside_one_that_blows_up():
+    # Over t0 some of these sets stall or run away in the coupled system; the
+    # others must come out as well as they do alone
+    t = np.linspace(0, lv.t0, 2001)
+    params = draw(64, 0.1)
+    looped = loop(t, params)
+    fine = np.isfinite(looped).all(axis=(1, 2)) & (looped.min(axis=(1, 2)) >= -1e-6)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        batch = lv.solve_batch(t, params)
+    assert fine.any()
+    assert np.isfinite(batch[fine]).all()
+    assert (batch[fine] >= -1e-6).all()
+
+
+@pytest.mark.parametrize('method', ['LSODA', 'BDF', 'Radau', 'RK45'])
+def test_solve_batch_keeps_the_others_when_one_set_fails(method):
+    # Sheep that feed the grass blow up within a time unit
+    t = np.linspace(0, 20, 201)
+    params = draw(8, 0.1)
+    params[3, 1] = -0.1
+    reference = loop(t, params, rtol=1e-12, atol=1e-12, mxstep=100000)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        batch = lv.solve_batch(t, params, method=method)
+    assert not (np.abs(batch[3]) < 1e6).all()
+    others = np.arange(8) != 3
+    np.testing.assert_allclose(batch[others], reference[others], rtol=1e-3, atol=1)
+
+
+def test_solve_batch_matches_solve_for_one_set():
+    t = np.linspace(0, 50, 501)
+    np.testing.assert_allclose(lv.solve_batch(t, [lv.parameters()])[0], lv.solve(t), rtol=1e-5, atol=1e-6)
+
+
+def test_integrate_chunks_samples_every_dt_through_t_end():
+    chunks = list(lv.integrate_chunks(25, 0.5, chunk=10))
+    t = np.concatenate([times for times, _, _ in chunks])
+    np.testing.assert_allclose(t, np.arange(51) * 0.5)
+    (t, solution, _), = lv.integrate_chunks(25, 0.5)
+    assert t[-1] == 25
+    np.testing.assert_allclose(solution[-1], lv.solve_adaptive(25).y[:, -1])
+
+
+def test_integrate_chunks_ends_on_the_event():
+    events = [lv.extinction_event(2, threshold=40)]
+    t, solution, (times,) = list(lv.integrate_chunks(lv.t0, 1.0, events=events))[-1]
+    assert t[-1] == times[0] < lv.t0
+    assert solution[-1, 2] == pytest.approx(40)
+
+
+def test_decimate_keeps_the_last_time():
+    t, solution = lv.decimate(lv.solve_adaptive(10), 3)
+    np.testing.assert_allclose(t, [0, 3, 6, 9, 10])
+    assert solution.shape == (5, 3)
@@ -0,0 +1,109 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+import wolfSheepGrass as wsg
+from nearest import nearest_grass, nearest_sheep, step_towards
+
+WIDTH = wsg.WORLD_WIDTH
+CELL = wsg.CELL_SIZE
+GRID = wsg.GRID_SIZE
+
+
+def wrap(d):
+    return min(d, d - WIDTH, d + WIDTH, key=abs)
+
+
+# The scans of Sheep.move and Wolf.move, returning the target they settle on
+def scan_grass(x, y, alive):
+    closest, best = float('inf'), (-1, 0.0, 0.0)
+    for i in range(GRID):
+        for j in range(GRID):
+            if alive[i, j]:
+                dx = wrap((i * CELL + CELL // 2) - x)
+                dy = wrap((j * CELL + CELL // 2) - y)
+                dist = math.sqrt(dx ** 2 + dy ** 2)
+                if dist < closest:
+                    closest, best = dist, (i * GRID + j, dx, dy)
+    return best
+
+
+def scan_sheep(x, y, sheep_x, sheep_y):
+    closest, best = float('inf'), (-1, 0.0, 0.0)
+    for index, (sx, sy) in enumerate(zip(sheep_x, sheep_y)):
+        dx, dy = wrap(sx - x), wrap(sy - y)
+        dist = math.sqrt(dx ** 2 + dy ** 2)
+        if dist < closest:
+            closest, best = dist, (index, dx, dy)
+    return best
+
+
+def world(seed, density):
+    rng = np.random.default_rng(seed)
+    alive = rng.random((GRID, GRID)) < density
+    # Points anywhere, hugging the edges, and on the cell lattice where
+    # several grass centres (and sheep below) are exactly as far away
+    x = np.concatenate([rng.uniform(0, WIDTH, 60), rng.uniform(-2, 2, 20) % WIDTH,
+                        rng.integers(0, GRID, 40) * float(CELL)])
+    y = np.concatenate([rng.uniform(0, WIDTH, 60), rng.uniform(WIDTH - 2, WIDTH, 20),
+                        rng.integers(0, GRID, 40) * float(CELL)])
+    return alive, x, y
+
+
+def check(found, expected):
+    index, dx, dy = found
+    for row, (want_index, want_dx, want_dy) in enumerate(expected):
+        assert index[row] == want_index
+        assert dx[row] == want_dx and dy[row] == want_dy
+
+
+@pytest.mark.parametrize('seed, density', [(0, 0.5), (1, 0.05), (2, 0.002), (3, 0.0)])
+def test_nearest_grass_matches_the_scan(seed, density):
+    alive, x, y = world(seed, density)
+    check(nearest_grass(x, y, alive, CELL, WIDTH), [scan_grass(px, py, alive) for px, py in zip(x, y)])
+
+
+@pytest.mark.parametrize('seed, n_sheep', [(0, 200), (1, 5), (2, 1), (3, 0)])
+def test_nearest_sheep_matches_the_scan(seed, n_sheep):
+    _, x, y = world(seed, 0)
+    rng = np.random.default_rng(seed + 100)
+    # Sheep on lattice points and in duplicate pairs give exact ties
+    lattice, scattered = n_sheep // 2, n_sheep - n_sheep // 2
+    sheep_x = np.concatenate([rng.integers(0, GRID, lattice) * float(CELL), rng.uniform(0, WIDTH, scattered)])
+    sheep_y = np.concatenate([rng.integers(0, GRID, lattice) * float(CELL), rng.uniform(0, WIDTH, scattered)])
+    sheep_x, sheep_y = np.concatenate([sheep_x, sheep_x[:3]]), np.concatenate([sheep_y, sheep_y[:3]])
+    check(nearest_sheep(x, y, sheep_x, sheep_y, WIDTH), [scan_sheep(px, py, sheep_x, sheep_y) for px, py in zip(x, y)])
+
+
+def test_equidistant_targets_go_to_the_first():
+    # A wolf halfway between two sheep across the wrap, and one on a cell
+    # corner with four live grass centres around it
+    index, dx, _ = nearest_sheep([0.0], [100.0], [WIDTH - 10.0, 10.0], [100.0, 100.0], WIDTH)
+    assert index[0] == scan_sheep(0.0, 100.0, [WIDTH - 10.0, 10.0], [100.0, 100.0])[0] == 0
+    assert dx[0] == -10.0
+    alive = np.zeros((GRID, GRID), dtype=bool)
+    alive[[0, 0, GRID - 1, GRID - 1], [0, GRID - 1, 0, GRID - 1]] = True
+    check(nearest_grass([0.0], [0.0], alive, CELL, WIDTH), [scan_grass(0.0, 0.0, alive)])
+
+
+def test_moves_match_sheep_and_wolf_move():
+    alive, x, y = world(4, 0.1)
+    random.seed(4)
+    grid = [[wsg.Cell(bool(alive[i, j])) for j in range(GRID)] for i in range(GRID)]
+    sheep = [wsg.Sheep(px, py, 0) for px, py in zip(x, y)]
+    target, dx, dy = nearest_grass(x, y, alive, CELL, WIDTH)
+    moved_x, moved_y = step_towards(x, y, (x + dx) - x, (y + dy) - y, target >= 0, CELL, wsg.MOVEMENT_MULTIPLIER, WIDTH)
+    for animal in sheep:
+        animal.move(grid)
+    np.testing.assert_allclose(moved_x, [s.x for s in sheep], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(moved_y, [s.y for s in sheep], rtol=0, atol=1e-9)
+
+    wolves = [wsg.Wolf(px, py, 0) for px, py in zip(y, x)]
+    target, dx, dy = nearest_sheep(y, x, moved_x, moved_y, WIDTH)
+    wolf_x, wolf_y = step_towards(y, x, dx, dy, target >= 0, CELL, wsg.MOVEMENT_MULTIPLIER, WIDTH)
+    for wolf in wolves:
+        wolf.move(sheep)
+    np.testing.assert_allclose(wolf_x, [w.x for w in wolves], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(wolf_y, [w.y for w in wolves], rtol=0, atol=1e-9)
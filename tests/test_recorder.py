@@ -0,0 +1,27 @@
+import pytest
+
+from recorder import Recorder, Recording
+from simulation import Config, Simulation
+
+
+def record(path, ticks, **options):
+    sim = Simulation(Config(WIDTH=200, GRID_SIZE=20, INITIAL_SHEEP=30, INITIAL_WOLVES=8), seed=2)
+    with Recorder(path, chunk_size=4, **options) as recorder:
+        for _ in range(ticks):
+            sim.step()
+            recorder.record(sim)
+
+
+def test_recorder_refuses_an_existing_recording(tmp_path):
+    path = str(tmp_path / 'run000')
+    record(path, 6)
+    with pytest.raises(FileExistsError):
+        record(path, 3)
+    assert list(Recording(path)['tick'][:]) == list(range(1, 7))
+
+
+def test_recorder_appends_when_asked(tmp_path):
+    path = str(tmp_path / 'run000')
+    record(path, 6)
+    record(path, 3, append=True)
+    assert list(Recording(path)['tick'][:]) == list(range(1, 7)) + [1, 2, 3]
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from simServer import FRAME, FRAME_HEADER, KEYFRAME, MESSAGE_HEADER, STATUS, Connection, Frame, SimServer, Snapshot
+from simulation import Config, Simulation
+
+CONFIG = Config(WIDTH=200, GRID_SIZE=21, INITIAL_SHEEP=40, INITIAL_WOLVES=10)
+
+
+def payload(message):
+    length, kind = MESSAGE_HEADER.unpack_from(message)
+    assert kind == FRAME and length == len(message) - MESSAGE_HEADER.size + 1
+    return message[MESSAGE_HEADER.size:]
+
+
+def flags(message):
+    return FRAME_HEADER.unpack_from(payload(message))[6]
+
+
+def assert_frame_matches(frame, sim):
+    np.testing.assert_array_equal(frame.bits, sim.grass.bits)
+    np.testing.assert_array_equal(frame.region(0, sim.grass.shape[0], 0, sim.grass.shape[1]), sim.alive)
+    assert frame.tick == sim.tick and frame.counts() == sim.counts()
+    np.testing.assert_array_equal(frame.sheep_x, sim.sheep_x.astype(np.float32))
+    np.testing.assert_array_equal(frame.wolf_energy, sim.wolf_energy)
+
+
+def test_a_chain_of_xor_deltas_rebuilds_every_frame():
+    sim = Simulation(CONFIG, seed=1)
+    sent = received = None
+    for index in range(10):
+        snapshot = Snapshot(sim, index)
+        message = snapshot.encode(sent)
+        assert flags(message) == (KEYFRAME if index == 0 else 0)
+        received = Frame(payload(message), None if received is None else received.bits)
+        assert_frame_matches(received, sim)
+        sent = snapshot.bits
+        sim.run(3)
+
+
+def test_a_skipped_frame_is_fine_as_long_as_the_base_is_what_was_sent():
+    sim = Simulation(CONFIG, seed=2)
+    first = Snapshot(sim, 0)
+    base = Frame(payload(first.encode(None)), None).bits
+    sim.run(5)
+    Snapshot(sim, 1)  # published but never sent
+    sim.run(5)
+    assert_frame_matches(Frame(payload(Snapshot(sim, 2).encode(first.bits)), base), sim)
+
+
+def test_a_new_grid_size_is_sent_as_a_keyframe():
+    base = Snapshot(Simulation(CONFIG, seed=3), 0).bits
+    sim = Simulation(CONFIG.replace(GRID_SIZE=40), seed=3)
+    message = Snapshot(sim, 1).encode(base)
+    assert flags(message) == KEYFRAME
+    assert_frame_matches(Frame(payload(message), base), sim)
+
+
+def test_set_applies_live_unless_it_reshapes_the_world():
+    server = SimServer(CONFIG, seed=4)
+    server.sim.run(5)
+    sim = server.sim
+    server.apply({'cmd': 'set', 'params': {'GRASS_ENERGY_GAIN': 7}})
+    assert server.sim is sim and sim.config.GRASS_ENERGY_GAIN == 7 and sim.tick == 5
+    server.apply({'cmd': 'set', 'params': {'GRID_SIZE': 25}})
+    assert server.sim is not sim and server.sim.tick == 0
+    assert server.sim.config.GRID_SIZE == 25 and server.sim.config.GRASS_ENERGY_GAIN == 7
+    for command in ({'cmd': 'fly'}, {'cmd': 'reset', 'seed': -1}, {'cmd': 'set', 'params': []}, []):
+        with pytest.raises((TypeError, ValueError)):
+            server.apply(command)
+
+
+def test_a_viewer_follows_the_run_over_a_socket():
+    server = SimServer(CONFIG, seed=5, running=True)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    address = []
+
+    async def serve():
+        listener = await asyncio.start_server(server.serve_viewer, '127.0.0.1', 0)
+        address.append(listener.sockets[0].getsockname()[1])
+        started.set()
+        async with listener:
+            await asyncio.gather(listener.serve_forever(), server.run())
+
+    task = loop.create_task(serve())
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert started.wait(10)
+    connection = Connection('127.0.0.1', address[0])
+    try:
+        kind, status = connection.receive()
+        assert kind == STATUS and status['seed'] == 5
+        ticks = []
+        while len(ticks) < 5:
+            kind, frame = connection.receive()
+            if kind == FRAME:
+                ticks.append(frame.tick)
+                assert frame.bits.shape == (21, 3)
+        assert ticks == sorted(ticks) and ticks[-1] > ticks[0]
+    finally:
+        connection.close()
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(10)
+        server.executor.shutdown()
+        loop.close()
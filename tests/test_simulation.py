@@ -0,0 +1,94 @@
+import numpy as np
+
+from simulation import Config, Simulation
+
+CONFIG = Config(WIDTH=80, GRID_SIZE=8)  # cells are 10 pixels
+
+
+def make_sim(sheep=(), wolves=(), alive=None, grass_ticks=None, seed=0):
+    # sheep and wolves are (x, y, energy) rows; the grass is all alive unless given
+    size = CONFIG.GRID_SIZE
+    sheep, wolves = np.array(sheep, dtype=float).reshape(-1, 3), np.array(wolves, dtype=float).reshape(-1, 3)
+    arrays = {
+        'alive': np.ones((size, size), dtype=bool) if alive is None else alive,
+        'grass_ticks': np.zeros((size, size), dtype=np.uint8) if grass_ticks is None else grass_ticks,
+        'sheep_x': sheep[:, 0], 'sheep_y': sheep[:, 1], 'sheep_energy': sheep[:, 2].astype(np.int64),
+        'wolf_x': wolves[:, 0], 'wolf_y': wolves[:, 1], 'wolf_energy': wolves[:, 2].astype(np.int64),
+    }
+    return Simulation.from_state(CONFIG, np.random.default_rng(seed), 0, arrays)
+
+
+def test_step_runs_the_phases_in_order():
+    sim = make_sim([(5, 5, 4)], [(45, 45, 4)])
+    ran = []
+    for phase in Simulation.PHASES:
+        setattr(sim, phase, lambda phase=phase: ran.append(phase))
+    sim.step()
+    assert ran == list(Simulation.PHASES)
+    assert sim.tick == 1
+
+
+def test_only_the_first_sheep_on_a_live_cell_grazes():
+    alive = np.ones((8, 8), dtype=bool)
+    alive[4, 4] = False
+    sim = make_sim([(15, 25, 2), (12, 28, 2), (45, 45, 2), (35, 5, 2)], alive=alive)
+    assert sim.graze() == 2
+    np.testing.assert_array_equal(sim.sheep_energy, [2 + CONFIG.GRASS_ENERGY_GAIN, 2, 2, 2 + CONFIG.GRASS_ENERGY_GAIN])
+    assert not sim.alive[1, 2] and not sim.alive[3, 0]
+    assert sim.grass.count == 64 - 3
+
+
+def test_moving_costs_energy_and_wraps_around():
+    sim = make_sim([(1, 79, 3)] * 50)
+    sim.move_sheep()
+    assert (sim.sheep_energy == 3 - CONFIG.ENERGY_LOSS_PER_TICK).all()
+    assert ((sim.sheep_x >= 0) & (sim.sheep_x < 80) & (sim.sheep_y >= 0) & (sim.sheep_y < 80)).all()
+    dx = (sim.sheep_x - 1 + 40) % 80 - 40
+    dy = (sim.sheep_y - 79 + 40) % 80 - 40
+    np.testing.assert_allclose(np.hypot(dx, dy), CONFIG.CELL_SIZE)
+
+
+def test_cull_drops_animals_below_zero_energy_in_order():
+    sim = make_sim([(1, 1, 3), (2, 2, -1), (3, 3, 0), (4, 4, 5)], [(5, 5, -2), (6, 6, 1)])
+    assert sim.cull() == (1, 1)
+    np.testing.assert_array_equal(sim.sheep_x, [1, 3, 4])
+    np.testing.assert_array_equal(sim.sheep_energy, [3, 0, 5])
+    np.testing.assert_array_equal(sim.wolf_x, [6])
+
+
+def test_dead_grass_regrows_after_dead_to_live_ticks():
+    alive = np.ones((8, 8), dtype=bool)
+    alive[0, 0] = alive[0, 1] = False
+    ticks = np.zeros((8, 8), dtype=np.uint8)
+    ticks[0, 0] = CONFIG.DEAD_TO_LIVE - 1
+    sim = make_sim(alive=alive, grass_ticks=ticks)
+    sim.regrow()
+    assert sim.alive[0, 0] and sim.grass_ticks[0, 0] == 0
+    assert not sim.alive[0, 1] and sim.grass_ticks[0, 1] == 1
+    assert sim.grass.count == 63
+
+
+def test_a_wolf_eats_one_sheep_of_its_cell():
+    sim = make_sim([(12, 12, 5), (15, 18, 6), (55, 55, 7)], [(11, 19, 2), (75, 75, 2)])
+    assert sim.predation() == 1
+    np.testing.assert_array_equal(sim.wolf_energy, [2 + CONFIG.SHEEP_ENERGY_GAIN, 2])
+    assert np.count_nonzero(sim.sheep_energy[:2] == -1) == 1
+    sim.cull()
+    assert len(sim.sheep) == 2 and sim.sheep_energy[-1] == 7
+
+
+def test_wolves_take_the_sheep_of_their_cell_in_list_order():
+    sim = make_sim([(12, 12, 5), (15, 18, 5)], [(11, 19, 1), (50, 50, 1), (13, 13, 2), (14, 14, 3)])
+    assert sim.predation() == 2
+    np.testing.assert_array_equal(sim.wolf_energy, [1 + CONFIG.SHEEP_ENERGY_GAIN, 1, 2 + CONFIG.SHEEP_ENERGY_GAIN, 3])
+    sim.cull()
+    assert len(sim.sheep) == 0
+
+
+def test_a_wolf_picks_its_sheep_at_random():
+    eaten_first = 0
+    for seed in range(400):
+        sim = make_sim([(12, 12, 5), (15, 18, 5)], [(11, 19, 1)], seed=seed)
+        sim.predation()
+        eaten_first += sim.sheep_energy[0] < 0
+    assert 160 < eaten_first < 240
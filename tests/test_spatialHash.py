@@ -0,0 +1,15 @@
+import random
+from types import SimpleNamespace
+
+from spatialHash import CellIndex
+
+
+def test_pop_random_hands_out_every_animal_of_a_cell_once():
+    animals = [SimpleNamespace(x=x, y=y) for x, y in ((1, 1), (5, 9), (9, 2), (15, 3), (31, 31))]
+    index = CellIndex(animals, cell_size=10)
+    assert len(index) == 5
+    popped = [index.pop_random(4, 4, random.Random(0)) for _ in range(4)]
+    assert popped[3] is None
+    assert sorted(map(id, popped[:3])) == sorted(map(id, animals[:3]))
+    assert index.in_cell(19, 0) == [animals[3]]
+    assert len(index) == 2
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from simulation import Config, Simulation
+from tiledSimulation import TiledSimulation, tile_edges
+
+CONFIG = Config(WIDTH=480, GRID_SIZE=48, INITIAL_SHEEP=300, INITIAL_WOLVES=60)
+TILES = (3, 2)
+TICKS = 15
+
+
+def tiled_run(workers):
+    sim = Simulation(CONFIG, seed=5)
+    with TiledSimulation(sim, TILES, workers, seed=1) as tiled:
+        counts = tiled.run(TICKS)
+        return counts, tiled.to_simulation()
+
+
+@pytest.fixture(scope='module')
+def in_process():
+    return tiled_run(0)
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_a_run_does_not_depend_on_the_number_of_workers(in_process, workers):
+    counts, sim = tiled_run(workers)
+    np.testing.assert_array_equal(counts, in_process[0])
+    assert sim.tick == in_process[1].tick == TICKS
+    for name in Simulation.STATE_ARRAYS:
+        np.testing.assert_array_equal(getattr(sim, name), getattr(in_process[1], name), err_msg=name)
+
+
+def test_counts_add_up_to_the_gathered_state(in_process):
+    counts, sim = in_process
+    assert tuple(counts[-1]) == sim.counts()
+    # Animals are still alive and moving; a frozen run would hide a broken hand-over
+    assert counts[-1, 0] > 0 and counts[-1, 1] > 0
+    assert not np.array_equal(counts[0], counts[-1])
+
+
+def test_tile_edges_keep_y_tiles_on_whole_bytes():
+    np.testing.assert_array_equal(tile_edges(48, 2, align=8), [0, 24, 48])
+    np.testing.assert_array_equal(tile_edges(50, 3, align=8), [0, 16, 32, 50])
+    with pytest.raises(ValueError):
+        tile_edges(16, 3, align=8)
+
+
+def test_seeking_targets_is_refused():
+    with pytest.raises(ValueError):
+        TiledSimulation(Simulation(CONFIG.replace(SEEK_TARGETS=True), seed=0), TILES, workers=0)
@@ -0,0 +1,161 @@
+import importlib.util
+import math
+import warnings
+
+import numpy as np
+
+# 'numpy' is Simulation's vectorized step, 'jit' is tick() below compiled by
+# Numba and 'loop' is the same tick() run as plain Python, which is slow but
+# lets the kernel be checked without Numba
+ENGINES = ('numpy', 'jit', 'loop')
+# Numba itself is only imported once the jit engine first runs
+COMPILED = importlib.util.find_spec('numba') is not None
+compiled_tick = None
+
+
+def select_engine(engine):
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {', '.join(ENGINES)}")
+    if engine == 'jit' and not COMPILED:
+        warnings.warn("Numba is not installed, using the numpy engine", RuntimeWarning)
+        return 'numpy'
+    return engine
+
+
+def tick(bits, row_bytes, ticks, dead_to_live, sheep_x, sheep_y, sheep_energy, n_sheep, wolf_x, wolf_y, wolf_energy, n_wolves,
+         width, cell_size, grid_size, energy_loss, grass_gain, sheep_gain, sheep_chance, wolf_chance, rng):
+    # One whole tick over the flattened GrassField arrays and the animal
+    # buffers, in the order of the original main loop. The animal buffers need room for
+    # 2 * n animals, since every survivor may give birth. Returns the new
+    # sheep and wolf counts and the change in live grass cells.
+
+    # Grass regrowth
+    grass_change = 0
+    for gx in range(grid_size):
+        for gy in range(grid_size):
+            byte = gx * row_bytes + (gy >> 3)
+            bit = 128 >> (gy & 7)
+            if not bits[byte] & bit:
+                cell = gx * grid_size + gy
+                ticks[cell] += 1
+                if ticks[cell] >= dead_to_live:
+                    bits[byte] |= bit
+                    ticks[cell] = 0
+                    grass_change += 1
+
+    # Sheep move and graze, first come first served
+    sheep_cell = np.empty(n_sheep, dtype=np.intp)
+    for i in range(n_sheep):
+        angle = 2 * math.pi * rng.random()
+        sheep_x[i] = (sheep_x[i] + math.cos(angle) * cell_size) % width
+        sheep_y[i] = (sheep_y[i] + math.sin(angle) * cell_size) % width
+        sheep_energy[i] -= energy_loss
+        gx = int(sheep_x[i] // cell_size) % grid_size
+        gy = int(sheep_y[i] // cell_size) % grid_size
+        sheep_cell[i] = gx * grid_size + gy
+        byte = gx * row_bytes + (gy >> 3)
+        bit = 128 >> (gy & 7)
+        if bits[byte] & bit:
+            bits[byte] ^= bit
+            ticks[gx * grid_size + gy] = 0
+            sheep_energy[i] += grass_gain
+            grass_change -= 1
+
+    for i in range(n_wolves):
+        angle = 2 * math.pi * rng.random()
+        wolf_x[i] = (wolf_x[i] + math.cos(angle) * cell_size) % width
+        wolf_y[i] = (wolf_y[i] + math.sin(angle) * cell_size) % width
+        wolf_energy[i] -= energy_loss
+
+    # Bucket the sheep by cell, then each wolf in turn eats a random sheep
+    # still left in its cell, swapping it past the end of the bucket
+    start = np.zeros(grid_size * grid_size + 1, dtype=np.intp)
+    for i in range(n_sheep):
+        start[sheep_cell[i] + 1] += 1
+    for cell in range(grid_size * grid_size):
+        start[cell + 1] += start[cell]
+    left = np.zeros(grid_size * grid_size, dtype=np.intp)
+    bucket = np.empty(n_sheep, dtype=np.intp)
+    for i in range(n_sheep):
+        cell = sheep_cell[i]
+        bucket[start[cell] + left[cell]] = i
+        left[cell] += 1
+    eaten = np.zeros(n_sheep, dtype=np.bool_)
+    for i in range(n_wolves):
+        cell = (int(wolf_x[i] // cell_size) % grid_size) * grid_size + int(wolf_y[i] // cell_size) % grid_size
+        k = left[cell]
+        if k > 0:
+            chosen = start[cell] + int(rng.random() * k)
+            last = start[cell] + k - 1
+            prey = bucket[chosen]
+            bucket[chosen] = bucket[last]
+            bucket[last] = prey
+            left[cell] = k - 1
+            eaten[prey] = True
+            wolf_energy[i] += sheep_gain
+
+    # Remove eaten animals and animals with no energy, keeping list order
+    kept = 0
+    for i in range(n_sheep):
+        if sheep_energy[i] >= 0 and not eaten[i]:
+            sheep_x[kept] = sheep_x[i]
+            sheep_y[kept] = sheep_y[i]
+            sheep_energy[kept] = sheep_energy[i]
+            kept += 1
+    n_sheep = kept
+    kept = 0
+    for i in range(n_wolves):
+        if wolf_energy[i] >= 0:
+            wolf_x[kept] = wolf_x[i]
+            wolf_y[kept] = wolf_y[i]
+            wolf_energy[kept] = wolf_energy[i]
+            kept += 1
+    n_wolves = kept
+
+    # Births; parent and child each keep half the energy
+    born = n_sheep
+    for i in range(n_sheep):
+        if rng.random() < sheep_chance:
+            child_energy = sheep_energy[i] // 2
+            sheep_energy[i] = child_energy
+            sheep_x[born] = rng.random() * width
+            sheep_y[born] = rng.random() * width
+            sheep_energy[born] = child_energy
+            born += 1
+    n_sheep = born
+    born = n_wolves
+    for i in range(n_wolves):
+        if rng.random() < wolf_chance:
+            child_energy = wolf_energy[i] // 2
+            wolf_energy[i] = child_energy
+            wolf_x[born] = rng.random() * width
+            wolf_y[born] = rng.random() * width
+            wolf_energy[born] = child_energy
+            born += 1
+    n_wolves = born
+
+    return n_sheep, n_wolves, grass_change
+
+
+def compile_tick():
+    global compiled_tick
+    if compiled_tick is None:
+        from numba import njit
+        compiled_tick = njit(cache=True)(tick)
+    return compiled_tick
+
+
+def run_tick(sim, engine):
+    # Advances sim by one tick with the kernel, in place
+    c = sim.config
+    sheep, wolves = sim.sheep, sim.wolves
+    sheep.reserve(2 * len(sheep))
+    wolves.reserve(2 * len(wolves))
+    kernel = compile_tick() if engine == 'jit' else tick
+    sheep.n, wolves.n, grass_change = kernel(
+        sim.grass.bits.reshape(-1), sim.grass.bits.shape[1], np.asarray(sim.grass.ticks).reshape(-1), c.DEAD_TO_LIVE,
+        sheep.columns['x'], sheep.columns['y'], sheep.columns['energy'], len(sheep),
+        wolves.columns['x'], wolves.columns['y'], wolves.columns['energy'], len(wolves),
+        float(c.WIDTH), float(c.CELL_SIZE), c.GRID_SIZE, c.ENERGY_LOSS_PER_TICK,
+        c.GRASS_ENERGY_GAIN, c.SHEEP_ENERGY_GAIN, c.SHEEP_REPRODUCTION_CHANCE, c.WOLF_REPRODUCTION_CHANCE, sim.rng)
+    sim.grass.count += int(grass_change)
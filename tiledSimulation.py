@@ -0,0 +1,302 @@
+import os
+
+import numpy as np
+
+from agentStore import AgentStore
+from grassField import GrassField
+from simulation import Simulation
+
+# The world is cut into tiles of whole cells, each stepped as its own small
+# Simulation. A tile owns the animals standing on its cells, so grazing and
+# predation never look outside it; only animals that move (or are born) onto
+# another tile's cells have to be handed over between the two halves of a
+# tick. The grass of all tiles lives in shared memory and every tile writes
+# only its own rectangle of it. Each tile draws from its own RNG stream and
+# hand-overs are merged in tile order, so a run depends on the seed and the
+# tile layout but not on the number of worker processes.
+
+
+def tile_edges(grid_size, n, align=1):
+    # n + 1 cell boundaries, as even as steps of align allow
+    edges = [min(grid_size, round(grid_size * i / n / align) * align) for i in range(n)] + [grid_size]
+    if any(a >= b for a, b in zip(edges, edges[1:])):
+        raise ValueError(f"Cannot cut {grid_size} cells into {n} tiles of at least {align}")
+    return np.array(edges)
+
+
+class TileLayout:
+    # tiles = (along x, along y). Tile edges along y fall on multiples of 8
+    # cells so that no two tiles share a byte of the packed alive mask.
+    def __init__(self, config, tiles):
+        self.config = config
+        self.shape = tiles
+        self.x_edges = tile_edges(config.GRID_SIZE, tiles[0])
+        self.y_edges = tile_edges(config.GRID_SIZE, tiles[1], align=8)
+
+    def __len__(self):
+        return self.shape[0] * self.shape[1]
+
+    def bounds(self, index):
+        tx, ty = divmod(index, self.shape[1])
+        return (int(self.x_edges[tx]), int(self.x_edges[tx + 1]), int(self.y_edges[ty]), int(self.y_edges[ty + 1]))
+
+    def owner(self, x, y):
+        c = self.config
+        gx = (x // c.CELL_SIZE).astype(np.intp) % c.GRID_SIZE
+        gy = (y // c.CELL_SIZE).astype(np.intp) % c.GRID_SIZE
+        tx = np.searchsorted(self.x_edges, gx, side='right') - 1
+        ty = np.searchsorted(self.y_edges, gy, side='right') - 1
+        return tx * self.shape[1] + ty
+
+
+class Tile(Simulation):
+    # One tile of a tiled run; step() is split into move() and settle()
+    def __init__(self, config, bounds, grass, sheep, wolves, rng):
+        self.config = config
+        self.bounds = bounds
+        self.grass = grass
+        self.sheep = sheep
+        self.wolves = wolves
+        self.rng = rng
+        self.engine = 'numpy'
+        self.tick = 0
+
+    def cells(self, x, y):
+        # Cell index within the tile, as GrassField.graze expects
+        c = self.config
+        x0, x1, y0, y1 = self.bounds
+        gx = (x // c.CELL_SIZE).astype(np.intp) % c.GRID_SIZE - x0
+        gy = (y // c.CELL_SIZE).astype(np.intp) % c.GRID_SIZE - y0
+        return gx * (y1 - y0) + gy
+
+    def move(self):
+        self.regrow()
+        self.move_sheep()
+        self.move_wolves()
+
+    def emigrants(self, layout, index):
+        # Takes out the animals now standing on other tiles, as
+        # (owner, x, y, energy) for the sheep and for the wolves
+        leaving = []
+        for agents in (self.sheep, self.wolves):
+            owner = layout.owner(agents.x, agents.y)
+            away = owner != index
+            leaving.append((owner[away], agents.x[away], agents.y[away], agents.energy[away]))
+            agents.compact(~away)
+        return leaving
+
+    def settle(self, sheep, wolves):
+        # The rest of Simulation.PHASES once the newcomers are in
+        self.sheep.add(*sheep)
+        self.wolves.add(*wolves)
+        self.graze()
+        self.predation()
+        self.cull()
+        self.reproduce()
+        self.tick += 1
+        return len(self.sheep), len(self.wolves), self.grass.count
+
+
+class TileGroup:
+    # The tiles one worker steps; also used in-process when workers == 0
+    def __init__(self, config, tiles, grid, states):
+        from multiprocessing import shared_memory
+        self.layout = TileLayout(config, tiles)
+        # Workers share the creating process's resource tracker, so attaching
+        # here does not hand ownership of the blocks to this process
+        self.blocks = [shared_memory.SharedMemory(name=name) for name in grid['names']]
+        bits = np.ndarray(grid['bits_shape'], dtype=np.uint8, buffer=self.blocks[0].buf)
+        ticks = np.ndarray(grid['ticks_shape'], dtype=grid['ticks_dtype'], buffer=self.blocks[1].buf)
+        self.tiles = {}
+        for index, (sheep, wolves, rng_state) in states.items():
+            x0, x1, y0, y1 = self.layout.bounds(index)
+            grass = GrassField.packed(bits[x0:x1, y0 // 8:-(-y1 // 8)], ticks[x0:x1, y0:y1], config.DEAD_TO_LIVE)
+            rng = np.random.default_rng()
+            rng.bit_generator.state = rng_state
+            self.tiles[index] = Tile(config, (x0, x1, y0, y1), grass,
+                                     AgentStore.from_arrays(*sheep), AgentStore.from_arrays(*wolves), rng)
+
+    def handle(self, message):
+        command = message[0]
+        if command == 'move':
+            leaving = {}
+            for index, tile in self.tiles.items():
+                tile.move()
+                leaving[index] = tile.emigrants(self.layout, index)
+            return leaving
+        if command == 'settle':
+            incoming = message[1]
+            return {index: tile.settle(*incoming[index]) for index, tile in self.tiles.items()}
+        if command == 'state':
+            return {index: ((tile.sheep.x.copy(), tile.sheep.y.copy(), tile.sheep.energy.copy()),
+                            (tile.wolves.x.copy(), tile.wolves.y.copy(), tile.wolves.energy.copy()),
+                            tile.rng.bit_generator.state)
+                    for index, tile in self.tiles.items()}
+        raise ValueError(f"Unknown command {command!r}")
+
+    def close(self):
+        self.tiles.clear()
+        for block in self.blocks:
+            block.close()
+
+
+def serve(conn, config, tiles, grid, states):
+    group = TileGroup(config, tiles, grid, states)
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == 'close':
+                break
+            conn.send(group.handle(message))
+    finally:
+        group.close()
+        conn.close()
+
+
+def empty_animals():
+    return np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+
+
+def gather(parts):
+    # Concatenates (x, y, energy) tuples, keeping their order
+    if not parts:
+        return empty_animals()
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+class TiledSimulation:
+    # Steps sim split into tiles = (along x, along y) tiles spread over
+    # worker processes; workers=0 steps every tile in this process, which
+    # gives the same result. Only move_freely is supported.
+    def __init__(self, sim, tiles=(4, 4), workers=None, seed=None):
+        if sim.config.SEEK_TARGETS:
+            raise ValueError("Tiled runs only support SEEK_TARGETS=False")
+        self.config = sim.config
+        self.layout = TileLayout(sim.config, tiles)
+        self.tick = sim.tick
+        n_tiles = len(self.layout)
+        if workers is None:
+            workers = min(n_tiles, os.cpu_count() or 1)
+        if seed is None:
+            seed = int(sim.rng.integers(2 ** 63))
+
+        from multiprocessing import shared_memory
+        # Grass goes into shared memory, the animals to the tile they stand on
+        self.blocks = []
+        grid = {'names': [], 'bits_shape': sim.grass.bits.shape, 'ticks_shape': sim.grass.ticks.shape,
+                'ticks_dtype': sim.grass.ticks.dtype.str}
+        arrays = []
+        for source in (sim.grass.bits, sim.grass.ticks):
+            block = shared_memory.SharedMemory(create=True, size=max(source.nbytes, 1))
+            array = np.ndarray(source.shape, dtype=source.dtype, buffer=block.buf)
+            array[...] = source
+            self.blocks.append(block)
+            arrays.append(array)
+            grid['names'].append(block.name)
+        self.grass = GrassField.packed(arrays[0], arrays[1], sim.config.DEAD_TO_LIVE)
+
+        sheep_owner = self.layout.owner(sim.sheep_x, sim.sheep_y)
+        wolf_owner = self.layout.owner(sim.wolf_x, sim.wolf_y)
+        streams = np.random.SeedSequence(seed).spawn(n_tiles)
+        states = {}
+        for index in range(n_tiles):
+            mine, theirs = sheep_owner == index, wolf_owner == index
+            states[index] = ((sim.sheep_x[mine], sim.sheep_y[mine], sim.sheep_energy[mine]),
+                             (sim.wolf_x[theirs], sim.wolf_y[theirs], sim.wolf_energy[theirs]),
+                             np.random.default_rng(streams[index]).bit_generator.state)
+        self.sheep_count, self.wolf_count = len(sim.sheep), len(sim.wolves)
+
+        self.groups = [list(map(int, ids)) for ids in np.array_split(np.arange(n_tiles), max(workers, 1)) if len(ids)]
+        self.local = None
+        self.workers = []
+        if workers == 0:
+            self.local = TileGroup(self.config, tiles, grid, states)
+        else:
+            import multiprocessing
+            context = multiprocessing.get_context()
+            for ids in self.groups:
+                parent, child = context.Pipe()
+                process = context.Process(target=serve, args=(child, self.config, tiles, grid,
+                                                              {index: states[index] for index in ids}), daemon=True)
+                process.start()
+                child.close()
+                self.workers.append((process, parent))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def broadcast(self, messages):
+        # messages[i] goes to group i; returns the merged replies
+        if self.local is not None:
+            replies = [self.local.handle(message) for message in messages]
+        else:
+            for (_, conn), message in zip(self.workers, messages):
+                conn.send(message)
+            replies = [conn.recv() for _, conn in self.workers]
+        merged = {}
+        for reply in replies:
+            merged.update(reply)
+        return merged
+
+    def route(self, leaving):
+        # Newcomers for every tile, from the lowest source tile up
+        incoming = {index: ([], []) for index in range(len(self.layout))}
+        for source in sorted(leaving):
+            for kind, (owner, x, y, energy) in enumerate(leaving[source]):
+                order = np.argsort(owner, kind='stable')
+                owner = owner[order]
+                for dest in np.unique(owner):
+                    first, last = np.searchsorted(owner, [dest, dest + 1])
+                    part = order[first:last]
+                    incoming[int(dest)][kind].append((x[part], y[part], energy[part]))
+        return {index: (gather(sheep), gather(wolves)) for index, (sheep, wolves) in incoming.items()}
+
+    def step(self):
+        leaving = self.broadcast([('move',)] * len(self.groups))
+        incoming = self.route(leaving)
+        counts = self.broadcast([('settle', {index: incoming[index] for index in ids}) for ids in self.groups])
+        self.sheep_count = sum(sheep for sheep, _, _ in counts.values())
+        self.wolf_count = sum(wolves for _, wolves, _ in counts.values())
+        self.grass.count = sum(grass for _, _, grass in counts.values())
+        self.tick += 1
+
+    def counts(self):
+        return self.sheep_count, self.wolf_count, self.grass.grass_count()
+
+    def run(self, n_ticks):
+        counts = np.empty((n_ticks, 3), dtype=np.int64)
+        for i in range(n_ticks):
+            self.step()
+            counts[i] = self.counts()
+        return counts
+
+    def to_simulation(self):
+        # A plain Simulation of the current state, e.g. to draw or checkpoint;
+        # animals come out tile by tile. Its RNG continues from tile 0's.
+        states = self.broadcast([('state',)] * len(self.groups))
+        sheep = gather([states[index][0] for index in sorted(states)])
+        wolves = gather([states[index][1] for index in sorted(states)])
+        rng = np.random.default_rng()
+        rng.bit_generator.state = states[0][2]
+        arrays = {'grass_bits': self.grass.bits.copy(), 'grass_ticks': self.grass.ticks.copy(),
+                  'sheep_x': sheep[0], 'sheep_y': sheep[1], 'sheep_energy': sheep[2],
+                  'wolf_x': wolves[0], 'wolf_y': wolves[1], 'wolf_energy': wolves[2]}
+        return Simulation.from_state(self.config, rng, self.tick, arrays)
+
+    def close(self):
+        for process, conn in self.workers:
+            conn.send(('close',))
+            process.join()
+            conn.close()
+        self.workers = []
+        if self.local is not None:
+            self.local.close()
+            self.local = None
+        self.grass = None
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
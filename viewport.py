@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+
+MAX_CELL_PIXELS = 64  # furthest zoom in, screen pixels per grid cell
+
+
+class Viewport:
+    # Maps the part of a square world (world_width units, grid_size cells a
+    # side) around center onto the screen rect (left, top, width, height).
+    # scale is screen pixels per world unit; fit() shows the whole world.
+    def __init__(self, world_width, grid_size, rect):
+        self.world_width = world_width
+        self.grid_size = grid_size
+        self.cell_size = world_width / grid_size
+        self.rect = rect
+        self.fit()
+
+    def fit(self):
+        left, top, width, height = self.rect
+        self.min_scale = min(width, height) / self.world_width
+        self.max_scale = max(MAX_CELL_PIXELS / self.cell_size, self.min_scale)
+        self.scale = self.min_scale
+        self.center = (self.world_width / 2, self.world_width / 2)
+
+    def zoom(self, factor, screen_pos=None):
+        # The world point under screen_pos (default the middle) stays put
+        left, top, width, height = self.rect
+        if screen_pos is None:
+            screen_pos = (left + width / 2, top + height / 2)
+        wx, wy = self.to_world(*screen_pos)
+        self.scale = min(max(self.scale * factor, self.min_scale), self.max_scale)
+        self.center = (wx - (screen_pos[0] - left - width / 2) / self.scale,
+                       wy - (screen_pos[1] - top - height / 2) / self.scale)
+        self.clamp()
+
+    def pan(self, dx, dy):
+        # Drag by (dx, dy) screen pixels
+        self.center = (self.center[0] - dx / self.scale, self.center[1] - dy / self.scale)
+        self.clamp()
+
+    def clamp(self):
+        # Keep the view over the world, centred on any axis where it is wider
+        left, top, width, height = self.rect
+        center = []
+        for c, extent in zip(self.center, (width, height)):
+            half = extent / 2 / self.scale
+            if 2 * half >= self.world_width:
+                center.append(self.world_width / 2)
+            else:
+                center.append(min(max(c, half), self.world_width - half))
+        self.center = tuple(center)
+
+    def bounds(self):
+        # Visible world rectangle (x0, y0, x1, y1)
+        left, top, width, height = self.rect
+        half_w, half_h = width / 2 / self.scale, height / 2 / self.scale
+        return self.center[0] - half_w, self.center[1] - half_h, self.center[0] + half_w, self.center[1] + half_h
+
+    def to_screen(self, x, y):
+        left, top, width, height = self.rect
+        return (left + width / 2 + (np.asarray(x) - self.center[0]) * self.scale,
+                top + height / 2 + (np.asarray(y) - self.center[1]) * self.scale)
+
+    def to_world(self, sx, sy):
+        left, top, width, height = self.rect
+        return (self.center[0] + (sx - left - width / 2) / self.scale,
+                self.center[1] + (sy - top - height / 2) / self.scale)
+
+    def visible(self, x, y):
+        x0, y0, x1, y1 = self.bounds()
+        return (x >= x0) & (x < x1) & (y >= y0) & (y < y1)
+
+    def cells(self):
+        # Visible grid cells [gx0, gx1) x [gy0, gy1), and the step between
+        # cells worth drawing: when zoomed out below a pixel per cell, only
+        # every step-th cell is sampled for the overview
+        x0, y0, x1, y1 = self.bounds()
+        g = self.grid_size
+        gx0, gy0 = (min(max(int(v // self.cell_size), 0), g) for v in (x0, y0))
+        gx1, gy1 = (min(max(math.ceil(v / self.cell_size), 0), g) for v in (x1, y1))
+        step = max(1, int(1 / (self.scale * self.cell_size)))
+        return gx0, gx1, gy0, gy1, step
+
+    def cell_rect(self, gx0, gy0, nx, ny, step):
+        # Screen rect covering nx by ny sampled cells starting at (gx0, gy0)
+        sx, sy = self.to_screen(gx0 * self.cell_size, gy0 * self.cell_size)
+        pixels = step * self.cell_size * self.scale
+        return int(round(float(sx))), int(round(float(sy))), max(1, round(nx * pixels)), max(1, round(ny * pixels))
@@ -1,27 +1,44 @@
-import pygame
+import os
+import re
+import sys
 import random
 import math
-import matplotlib.pyplot as plt
-
-# Initialize matplotlib plot in interactive mode
-plt.ion()
-figure, ax = plt.subplots()
-sheep_counts = []
-wolf_counts = []
-grass_counts = []
-ax.set_title('Population over Time')
-ax.set_xlabel('Ticks')
-ax.set_ylabel('Population')
-line_sheep, = ax.plot(sheep_counts, label='Sheep')
-line_wolf, = ax.plot(wolf_counts, label='Wolves')
-line_grass, = ax.plot(grass_counts, label='Grass')
-ax.legend()
+from simulation import Config, Simulation
+from scheduler import Scheduler
+from recorder import Recorder
+from frameLog import FrameRecorder
+from checkpoint import AutoCheckpoint, load_checkpoint
+from viewport import Viewport
+from profiler import null_phase, open_profiler
 
 #PyGame Window
 SPEED = 100
+# Simulation ticks per frame; see scheduler.py
+TICKS_PER_FRAME = 1
+FRAME_BUDGET = None  # seconds of simulation per frame instead of TICKS_PER_FRAME
+TICK_RATE = None  # fixed ticks per second instead of TICKS_PER_FRAME
+RENDER_EVERY = 1  # turbo: only draw every Nth tick
+# Population recording; see recorder.py
+RECORD_DIR = None  # each run (and each RESET) writes to RECORD_DIR/runNNN
+SNAPSHOT_EVERY = None  # also save the full grid and animals every N ticks
+# Frame logs for replayViewer.py; see frameLog.py
+FRAME_LOG_DIR = None  # each run (and each RESET) writes FRAME_LOG_DIR/runNNN.frames
+RUN_NAME = re.compile(r'^run(\d+)(\.frames)?$')  # numbering carries on after the runs already there
+# Checkpoints; see checkpoint.py
+CHECKPOINT_DIR = None  # resume from the latest checkpoint here and save on exit
+CHECKPOINT_EVERY = 1000
+# Profiling; see profiler.py
+PROFILE = None  # 'console', 'histogram' or a .csv path to time every phase of the loop
+PROFILE_EVERY = 100  # ticks per line of the 'console' summary
+PROFILE_SAMPLING = False  # also run the sampling profiler and print its top functions on exit
+# Window; the world is drawn into the WIDTH x (HEIGHT - UI_HEIGHT) area above the buttons
 WIDTH, HEIGHT = 800, 900  
+# World, independent of the window; see viewport.py for panning and zooming
+WORLD_WIDTH = 800
 GRID_SIZE = 50
-CELL_SIZE = WIDTH // GRID_SIZE
+CELL_SIZE = WORLD_WIDTH // GRID_SIZE
+ZOOM_STEP = 1.25  # per mouse wheel notch or +/- key
+PAN_STEP = 100  # pixels per arrow key
 GREEN = (1, 100, 32)
 BROWN = (150, 75, 0)
 WHITE = (255, 255, 255)
@@ -50,6 +67,13 @@ INITIAL_WOLVES = 50
 INITIAL_SHEEP = 100
 
 running = False
+renderer = None
+viewport = None
+# Loaded by load_display() when the viewer starts, so that the model, its
+# constants and the legacy classes import without a display
+pygame = None
+plt = None
+chart = None
 
 def count_grass(grid):
     count = 0
@@ -60,29 +84,7 @@ def count_grass(grid):
     return count//4
 
 def update_graph(sheep_count, wolf_count, grass_count):
-    grass_counts.append(grass_count)
-    sheep_counts.append(sheep_count)
-    wolf_counts.append(wolf_count)
-    line_sheep.set_data(range(len(sheep_counts)), sheep_counts)
-    line_wolf.set_data(range(len(wolf_counts)), wolf_counts)
-    line_grass.set_data(range(len(grass_counts)), grass_counts)
-    
-    ax.relim()
-    ax.autoscale_view()
-
-    for line, count in zip([line_sheep, line_wolf, line_grass], [sheep_count, wolf_count, grass_count]):
-
-        if hasattr(line, 'annotation'):
-            line.annotation.remove()
-
-        line.annotation = ax.annotate(str(count),
-                                      xy=(len(sheep_counts) - 1, count),
-                                      xytext=(5, 5),  # Slight offset
-                                      textcoords="offset points",
-                                      bbox=dict(boxstyle="round,pad=0.3", edgecolor=line.get_color(), facecolor="white"))
-    
-    plt.draw()
-    plt.pause(0.001)  # Pause to ensure the plot updates
+    chart.update(sheep_count, wolf_count, grass_count)
 
 def draw_status_box(window, sheep_count, wolf_count, grass_count):
 
@@ -122,29 +124,66 @@ def draw_buttons(window, running):
     window.blit(start_text, (start_button.x + 23, start_button.y + 12))
     window.blit(reset_text, (reset_button.x + 22, reset_button.y + 12))
 
-def draw_grid(window, grid):
-    for i in range(GRID_SIZE):
-        for j in range(GRID_SIZE):
-            rect = pygame.Rect(i * CELL_SIZE, j * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-            color = GREEN if grid[i][j].is_alive else BROWN
-            pygame.draw.rect(window, color, rect)
-
-def draw_animals(window, animals):
-    font = pygame.font.SysFont(None, 15) 
-
-    for animal in animals:
-        color = WHITE if isinstance(animal, Sheep) else (0, 0, 0) 
-        pygame.draw.circle(window, color, (int(animal.x), int(animal.y)), CELL_SIZE // 4)
+def button_at(pos):
+    # 'start', 'reset' or None for a click at pos
+    for name, (bx, by) in (('start', START_BUTTON_POS), ('reset', RESET_BUTTON_POS)):
+        if bx <= pos[0] <= bx + BUTTON_WIDTH and by <= pos[1] <= by + BUTTON_HEIGHT:
+            return name
+    return None
+
+def draw_grid(window, grass):
+    # Only the visible cells are unpacked, every step-th one when zoomed out
+    gx0, gx1, gy0, gy1, step = viewport.cells()
+    alive = grass.region(gx0, gx1, gy0, gy1, step)
+    if alive.size == 0:
+        return
+    x, y, w, h = viewport.cell_rect(gx0, gy0, alive.shape[0], alive.shape[1], step)
+    renderer.draw_grass(window, alive, (x, y), (w, h))
+
+def draw_animals(window, sim):
+    # Energy labels only while a cell is at least CELL_SIZE pixels wide
+    labels = viewport.scale * viewport.cell_size >= CELL_SIZE
+    for x, y, energy, color in ((sim.sheep_x, sim.sheep_y, sim.sheep_energy, WHITE),
+                                (sim.wolf_x, sim.wolf_y, sim.wolf_energy, (0, 0, 0))):
+        shown = viewport.visible(x, y)
+        sx, sy = viewport.to_screen(x[shown], y[shown])
+        renderer.draw_animals(window, sx, sy, color, energy[shown] if labels else None)
+
+def draw_world(window, sim):
+    window.fill((0, 0, 0))
+    window.set_clip(viewport.rect)
+    draw_grid(window, sim.grass)
+    draw_animals(window, sim)
+    window.set_clip(None)
+    draw_buttons(window, running)
+
+def handle_view_event(event):
+    # Wheel or +/- zooms, dragging or the arrow keys pan, Home shows the whole world.
+    # Returns True if the view changed.
+    if event.type == pygame.MOUSEWHEEL:
+        viewport.zoom(ZOOM_STEP ** event.y, pygame.mouse.get_pos())
+    elif event.type == pygame.MOUSEMOTION and any(event.buttons) and event.pos[1] < HEIGHT - UI_HEIGHT:
+        viewport.pan(*event.rel)
+    elif event.type == pygame.KEYDOWN and event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+        viewport.zoom(ZOOM_STEP)
+    elif event.type == pygame.KEYDOWN and event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+        viewport.zoom(1 / ZOOM_STEP)
+    elif event.type == pygame.KEYDOWN and pygame.key.name(event.key) in PAN_KEYS:
+        viewport.pan(*PAN_KEYS[pygame.key.name(event.key)])
+    elif event.type == pygame.KEYDOWN and event.key == pygame.K_HOME:
+        viewport.fit()
+    else:
+        return False
+    return True
 
-        energy_text = font.render(str(animal.energy), True, (255, 255, 255))
-        window.blit(energy_text, (animal.x + CELL_SIZE // 2, animal.y - CELL_SIZE // 2))
+PAN_KEYS = {'left': (PAN_STEP, 0), 'right': (-PAN_STEP, 0), 'up': (0, PAN_STEP), 'down': (0, -PAN_STEP)}
 
 def reproduce_sheep(sheep_list):
     newborn_sheep = []
     for parent in sheep_list:
         if random.random() < SHEEP_REPRODUCTION_CHANCE:
             child_energy = parent.energy // 2
-            newborn_sheep.append(Sheep(random.uniform(0, WIDTH), random.uniform(0, WIDTH), child_energy))
+            newborn_sheep.append(Sheep(random.uniform(0, WORLD_WIDTH), random.uniform(0, WORLD_WIDTH), child_energy))
             # Halve the parent's energy
             parent.energy = child_energy
     return newborn_sheep
@@ -154,7 +193,7 @@ def reproduce_wolves(wolf_list):
     for parent in wolf_list:
         if random.random() < WOLF_REPRODUCTION_CHANCE:
             child_energy = parent.energy // 2
-            newborn_wolves.append(Wolf(random.uniform(0, WIDTH), random.uniform(0, WIDTH), child_energy))
+            newborn_wolves.append(Wolf(random.uniform(0, WORLD_WIDTH), random.uniform(0, WORLD_WIDTH), child_energy))
             # Halve the parent's energy
             parent.energy = child_energy
     return newborn_wolves
@@ -188,8 +227,8 @@ class Animal:
         self.y += math.sin(angle) * CELL_SIZE
 
         # Wrap around the screen
-        self.x = self.x % WIDTH
-        self.y = self.y % WIDTH
+        self.x = self.x % WORLD_WIDTH
+        self.y = self.y % WORLD_WIDTH
     
     def lose_energy(self):
         self.energy -= ENERGY_LOSS_PER_TICK
@@ -214,8 +253,8 @@ class Sheep(Animal):
                     dy = (j * CELL_SIZE + CELL_SIZE // 2) - self.y
 
                     # Consider wrap-around distance
-                    dx = min(dx, dx - WIDTH, dx + WIDTH, key=abs)
-                    dy = min(dy, dy - WIDTH, dy + WIDTH, key=abs)
+                    dx = min(dx, dx - WORLD_WIDTH, dx + WORLD_WIDTH, key=abs)
+                    dy = min(dy, dy - WORLD_WIDTH, dy + WORLD_WIDTH, key=abs)
 
                     dist = math.sqrt(dx**2 + dy**2)
                     if dist < closest_dist:
@@ -229,8 +268,8 @@ class Sheep(Animal):
             self.y += (math.sin(angle) * CELL_SIZE) * MOVEMENT_MULTIPLIER
 
             # Wrap around the screen
-            self.x = self.x % WIDTH
-            self.y = self.y % WIDTH
+            self.x = self.x % WORLD_WIDTH
+            self.y = self.y % WORLD_WIDTH
 
 class Wolf(Animal):
     def __init__(self, x, y, energy=None):
@@ -250,8 +289,8 @@ class Wolf(Animal):
             dy = sheep.y - self.y
 
             # Consider wrap-around distance
-            dx = min(dx, dx - WIDTH, dx + WIDTH, key=abs)
-            dy = min(dy, dy - WIDTH, dy + WIDTH, key=abs)
+            dx = min(dx, dx - WORLD_WIDTH, dx + WORLD_WIDTH, key=abs)
+            dy = min(dy, dy - WORLD_WIDTH, dy + WORLD_WIDTH, key=abs)
 
             dist = math.sqrt(dx**2 + dy**2)
             if dist < closest_dist:
@@ -263,118 +302,168 @@ class Wolf(Animal):
             dy = target_sheep.y - self.y
 
             # Consider wrap-around distance for movement
-            dx = min(dx, dx - WIDTH, dx + WIDTH, key=abs)
-            dy = min(dy, dy - WIDTH, dy + WIDTH, key=abs)
+            dx = min(dx, dx - WORLD_WIDTH, dx + WORLD_WIDTH, key=abs)
+            dy = min(dy, dy - WORLD_WIDTH, dy + WORLD_WIDTH, key=abs)
 
             angle = math.atan2(dy, dx)
             self.x += (math.cos(angle) * CELL_SIZE) * MOVEMENT_MULTIPLIER 
             self.y += (math.sin(angle) * CELL_SIZE) * MOVEMENT_MULTIPLIER
 
             # Wrap around the screen
-            self.x = self.x % WIDTH
-            self.y = self.y % WIDTH
+            self.x = self.x % WORLD_WIDTH
+            self.y = self.y % WORLD_WIDTH
 
 
 
-def setup(window):
+def setup(window, sim=None):
     global running
-    grid = [[Cell(random.choice([True, False])) for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
+    global viewport
+    if sim is None:
+        sim = Simulation(Config.from_module(sys.modules[__name__], WIDTH=WORLD_WIDTH))
+    # A resumed checkpoint brings its own world size
+    viewport = Viewport(sim.config.WIDTH, sim.config.GRID_SIZE, (0, 0, WIDTH, HEIGHT - UI_HEIGHT))
 
-    sheep = [Sheep(random.uniform(0, WIDTH), random.uniform(0, WIDTH)) for _ in range(INITIAL_SHEEP)]
-    wolves = [Wolf(random.uniform(0, WIDTH), random.uniform(0, WIDTH)) for _ in range(INITIAL_WOLVES)]
-    
-    window.fill((0, 0, 0))
-    draw_grid(window, grid)
-    draw_animals(window, sheep + wolves)
-    draw_buttons(window,running)
+    draw_world(window, sim)
     pygame.display.flip()
 
-    return grid, sheep, wolves
+    return sim
         
+def next_run():
+    # One past the highest run number in RECORD_DIR or FRAME_LOG_DIR, so a
+    # relaunch (or a resumed checkpoint) never writes into an earlier
+    # session's files
+    runs = [-1]
+    for directory in (RECORD_DIR, FRAME_LOG_DIR):
+        if directory is None or not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            match = RUN_NAME.match(name)
+            if match:
+                runs.append(int(match.group(1)))
+    return max(runs) + 1
+
+def start_recording(run):
+    if RECORD_DIR is None:
+        return None
+    return Recorder(os.path.join(RECORD_DIR, f"run{run:03d}"), snapshot_every=SNAPSHOT_EVERY)
+
+def start_frame_log(run, sim):
+    # Starts with the run as it stands, so replay opens on the first screen
+    if FRAME_LOG_DIR is None:
+        return None
+    os.makedirs(FRAME_LOG_DIR, exist_ok=True)
+    frames = FrameRecorder(os.path.join(FRAME_LOG_DIR, f"run{run:03d}.frames"))
+    frames.record(sim)
+    return frames
+
+def load_display():
+    global pygame
+    global plt
+    global chart
+    import pygame
+    import matplotlib.pyplot as plt
+    from liveChart import LiveChart
+    # Initialize matplotlib plot in interactive mode
+    plt.ion()
+    chart = LiveChart(['Sheep', 'Wolves', 'Grass'])
+
 def main():
     global running
-    global figure
-    global sheep_counts
-    global wolf_counts
-    global grass_counts
+    global renderer
+    load_display()
+    from gridRenderer import GridRenderer
     pygame.init()
     window = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Sheep, Wolves, and Grass Simulation")   
-
-    grid, sheep, wolves = setup(window)
+    renderer = GridRenderer(CELL_SIZE, GREEN, BROWN)
+
+    autosave = None
+    resumed = None
+    if CHECKPOINT_DIR is not None:
+        autosave = AutoCheckpoint(CHECKPOINT_DIR, CHECKPOINT_EVERY)
+        latest = autosave.latest()
+        if latest is not None:
+            resumed = load_checkpoint(latest)
+    profiler = open_profiler(PROFILE, PROFILE_EVERY, PROFILE_SAMPLING)
+    phase = profiler.phase if profiler is not None else null_phase
+    sim = setup(window, resumed)
+    sim.profiler = profiler
+    runs = next_run()
+    recorder = start_recording(runs)
+    frames = start_frame_log(runs, sim)
+
+    def tick():
+        # Grass regrowth, movement, grazing, predation, deaths and births
+        sim.step()
+        with phase('count'):
+            counts = sim.counts()
+        with phase('graph'):
+            update_graph(*counts)
+        with phase('record'):
+            if recorder is not None:
+                recorder.record(sim)
+            if frames is not None:
+                frames.record(sim)
+            if autosave is not None:
+                autosave(sim)
+
+    # remoteViewer.main repeats this loop for a run on a simServer; keep the two in step
+    scheduler = Scheduler(tick, TICKS_PER_FRAME, FRAME_BUDGET, TICK_RATE, RENDER_EVERY)
     clock = pygame.time.Clock()
     simrunning = True
+    redraw = False
     while simrunning:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 simrunning = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if START_BUTTON_POS[0] <= event.pos[0] <= START_BUTTON_POS[0] + BUTTON_WIDTH and START_BUTTON_POS[1] <= event.pos[1] <= START_BUTTON_POS[1] + BUTTON_HEIGHT:
+            elif handle_view_event(event):
+                redraw = True
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                button = button_at(event.pos)
+                if button == 'start':
                     running = not running
+                    scheduler.resume()
                     draw_buttons(window, running)
                     pygame.display.flip()
-                elif RESET_BUTTON_POS[0] <= event.pos[0] <= RESET_BUTTON_POS[0] + BUTTON_WIDTH and RESET_BUTTON_POS[1] <= event.pos[1] <= RESET_BUTTON_POS[1] + BUTTON_HEIGHT:
+                elif button == 'reset':
                     running = False
-                    sheep_counts = []
-                    wolf_counts = []
-                    grass_counts = []
-                    grid, sheep, wolves = setup(window)
+                    chart.reset()
+                    sim = setup(window)
+                    sim.profiler = profiler
+                    runs += 1
+                    if autosave is not None:
+                        # Ticks count from 0 again; the old run is abandoned
+                        autosave.clear()
+                    if recorder is not None:
+                        recorder.close()
+                        recorder = start_recording(runs)
+                    if frames is not None:
+                        frames.close()
+                        frames = start_frame_log(runs, sim)
     
         if running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-
-            for row in grid:
-                for cell in row:
-                    cell.update()
-
-            # Move animals
-            for s in sheep:
-                s.move_freely()
-                s.lose_energy()
-                grid_x, grid_y = int(s.x // CELL_SIZE), int(s.y // CELL_SIZE)
-                if grid[grid_x][grid_y].is_alive:
-                    grid[grid_x][grid_y].is_alive = False
-                    grid[grid_x][grid_y].tick_count = 0
-                    s.eat_grass()
-
-            for w in wolves:
-                w.move_freely()
-                w.lose_energy()
-
-            # Check for sheep-wolf collisions
-            for w in wolves:
-                # Find all sheep in the same cell as this wolf
-                sheep_in_same_cell = [s for s in sheep if int(s.x // CELL_SIZE) == int(w.x // CELL_SIZE) and int(s.y // CELL_SIZE) == int(w.y // CELL_SIZE)]
-
-                if sheep_in_same_cell:
-                    chosen_sheep = random.choice(sheep_in_same_cell)  # Randomly select one sheep
-                    w.eat_sheep()  # The wolf eats the sheep
-                    sheep.remove(chosen_sheep)  # Remove the eaten sheep from the list
-
-            # Remove animals with no energy
-            sheep = [s for s in sheep if s.energy >= 0]
-            wolves = [w for w in wolves if w.energy >= 0]
-                
-            sheep += reproduce_sheep(sheep)
-            wolves += reproduce_wolves(wolves)
-
-            grass_count = count_grass(grid)
-
-            update_graph(len(sheep), len(wolves), grass_count)
-
+            redraw = scheduler.frame() or redraw
+        if redraw:
             # Update the screen
-            window.fill((0, 0, 0))
-            draw_grid(window, grid)
-            draw_animals(window, sheep + wolves)
-            draw_buttons(window,running)
-            #draw_status_box(window, len(sheep), len(wolves),grass_count)
+            with phase('draw'):
+                draw_world(window, sim)
+                #draw_status_box(window, *sim.counts())
 
-            pygame.display.flip()
+                pygame.display.flip()
+            redraw = False
+        if running:
             clock.tick(SPEED)
 
+    if recorder is not None:
+        recorder.close()
+    if frames is not None:
+        frames.close()
+    if autosave is not None:
+        autosave.save(sim)
+    if profiler is not None:
+        profiler.close()
     pygame.quit()
+    chart.finish()
     plt.show()
     plt.ioff()  
 